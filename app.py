@@ -1,36 +1,238 @@
+import time
+_import_started = time.perf_counter()
 import os
+import io
+import json
+import threading
 import numpy as np
-import joblib
-import pickle
-from flask import Flask, render_template, request, jsonify
+import chatbot
+from datetime import datetime
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, stream_with_context, url_for
+from scoring import FEATURES, records_from_csv, score_batch, score_one
+from validation import ValidationError, partition_batch, validate_batch, validate_one
+from metrics import METRICS
+import profiling
+from profiling import PROFILE_HEADER, PROFILER
+from result_cache import ResultCache
+from simulator import simulate
+from explain import explain_batch, explain_one, explainer_for
+from cohort import GENDER_CODINGS, cohort_for
+from model_registry import ModelRegistry
+from health_metrics import calculate_bmi, calculate_heart_age, calculate_heart_age_batch, plan_locale, reboot_plan, reboot_plan_json, reboot_plan_key
+from bulk_export import RenderPool, score_cohort, stream_zip
+from reports import ReportJobQueue, ReportQueueFull, render_heart_passport, report_filename
 
 app = Flask(__name__)
 
 # --- Configuration ---
 MODEL_PATH = "model1.pkl"
+# Versioned artifacts served side by side; without the manifest only MODEL_PATH is served
+MODEL_MANIFEST = os.environ.get("MODEL_MANIFEST", "models.json")
+# Seconds between checks of the manifest and artifacts for changes (hot swap)
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", 5))
+# Score linear models with the compiled NumPy kernel instead of sklearn (set to 0 to disable)
+MODEL_FAST_PATH = os.environ.get("MODEL_FAST_PATH", "1") == "1"
+# Serve single-row probabilities from a memoized lookup table (quantized to whole units)
+PROBA_TABLE = os.environ.get("PROBA_TABLE", "0") == "1"
+PROBA_TABLE_SIZE = int(os.environ.get("PROBA_TABLE_SIZE", 4096))
+MAX_BATCH_ROWS = int(os.environ.get("MAX_BATCH_ROWS", 10000))
+# Per-feature contributions (explain.py) in /predict, /predict_batch and the Heart Passport
+EXPLAIN_PREDICTIONS = os.environ.get("EXPLAIN_PREDICTIONS", "1") == "1"
+# Risk percentile among Cardio_cleaned.csv peers of the same age band and gender (cohort.py)
+COHORT_STATS = os.environ.get("COHORT_STATS", "1") == "1"
+# /predict results kept for the Heart Passport download (result_token). Set RESULT_CACHE_DIR
+# (gunicorn.conf.py does) to share them between worker processes; unset, each worker has its own.
+RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", 900))
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 1024))
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR")
+# Inference cost per candidate model (bench_models.py), rendered on /accuracy
+MODEL_BENCHMARKS = os.environ.get("MODEL_BENCHMARKS", "model_benchmarks.json")
+# Background Heart Passport rendering (POST /reports, GET /reports/<job_id>)
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", 2))
+REPORT_QUEUE_LIMIT = int(os.environ.get("REPORT_QUEUE_LIMIT", 16))
+REPORT_EXECUTOR = os.environ.get("REPORT_EXECUTOR", "thread")  # "thread" or "process"
+REPORT_JOB_TTL = int(os.environ.get("REPORT_JOB_TTL", 600))
+REPORT_JOB_DIR = os.environ.get("REPORT_JOB_DIR")
+# Bulk ZIP export (POST /bulk_reports)
+BULK_MAX_ROWS = int(os.environ.get("BULK_MAX_ROWS", 10000))
+BULK_WORKERS = int(os.environ.get("BULK_WORKERS", os.cpu_count() or 1))
+# Exports streaming at once per gunicorn worker; they share one pool of BULK_WORKERS processes
+BULK_MAX_CONCURRENT = int(os.environ.get("BULK_MAX_CONCURRENT", 2))
+# Loaded at import, i.e. in the gunicorn master before fork when preload_app is on (see
+# gunicorn.conf.py): comma-separated "model" (every model in the manifest), "reports" (fpdf2 +
+# Heart Passport layout), "all" or "none". Anything not warmed up loads on first use.
+WARMUP = os.environ.get("WARMUP", "model")
 
 # --- Model Loading ---
-model = None
-
-def load_model():
-    global model
-    if os.path.exists(MODEL_PATH):
-        try:
-            model = joblib.load(MODEL_PATH)
-            print(f"Model loaded successfully from {MODEL_PATH}")
-        except Exception as e_joblib:
-            print(f"Joblib load failed: {e_joblib}. Trying pickle...")
-            try:
-                with open(MODEL_PATH, "rb") as f:
-                    model = pickle.load(f)
-                print(f"Model loaded successfully using pickle.")
-            except Exception as e_pickle:
-                print(f"Failed to load model: {e_pickle}")
-                model = None
-    else:
-        print(f"Model file {MODEL_PATH} not found.")
+registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    # Loads every model in the manifest on first use when it was not part of the warm-up
+    global registry
+    if registry is None:
+        with _registry_lock:
+            if registry is None:
+                registry = ModelRegistry(
+                    MODEL_MANIFEST, default_path=MODEL_PATH, check_interval=MODEL_RELOAD_INTERVAL, warm=warm_model,
+                    fast_path=MODEL_FAST_PATH, proba_table=PROBA_TABLE, table_size=PROBA_TABLE_SIZE
+                )
+    return registry
+
+def warm_model(model):
+    # Run by the registry for every model it loads, before the model serves: tree explainers
+    # precompute their leaf tables (a second for a forest) and the cohort cache is loaded, or the
+    # whole cohort scored once when it is missing
+    if EXPLAIN_PREDICTIONS:
+        explainer_for(model)
+    if COHORT_STATS:
+        cohort_for(model)
+
+def select_model(name=None):
+    # Registry entry serving this request: by name when given, otherwise by A/B weight
+    try:
+        return get_registry().select(name or None)
+    except KeyError:
+        raise ValueError(f"Unknown model '{name}'. Available: {', '.join(get_registry().names())}")
 
-load_model()
+def model_or_error(name=None):
+    # Returns (entry, None), or (None, error response) when the model cannot serve
+    try:
+        entry = select_model(name)
+    except ValueError as e:
+        return None, (jsonify({'success': False, 'error': str(e)}), 400)
+    if entry is None or entry.model is None:
+        return None, (jsonify({'error': 'Model not loaded. Please check server logs.'}), 500)
+    return entry, None
+
+def validation_error(e):
+    # 400 listing the offending fields (and rows, for batches)
+    return jsonify({'success': False, 'error': str(e), 'errors': e.errors, 'error_count': e.total}), 400
+
+def record_inference(entry, seconds, rows=1):
+    # One model call: registry counters plus the /metrics series
+    entry.record(seconds)
+    METRICS.observe('cardio_stage_seconds', seconds, (('stage', 'predict_proba'),))
+    labels = (('model', entry.name), ('version', entry.version))
+    METRICS.inc('cardio_model_calls_total', labels + (('kind', 'single' if rows == 1 else 'batch'),))
+    METRICS.inc('cardio_model_rows_total', labels, rows)
+
+def registry_samples():
+    # Hot-swap and probability-table counters of this process, for /metrics
+    if registry is None:
+        return []
+    stats = registry.stats()
+    samples = [('cardio_model_reloads_total', "Model registry snapshot swaps.", {}, stats['reloads'])]
+    for name, model_stats in stats['models'].items():
+        table = model_stats['probability_table']
+        if table:
+            for outcome in ('hits', 'misses', 'bypassed'):
+                samples.append(('cardio_proba_table_lookups_total', "Probability table lookups by outcome.",
+                                {'model': name, 'outcome': outcome}, table[outcome]))
+    return samples
+
+METRICS.add_collector(registry_samples)
+METRICS.add_collector(lambda: [
+    ('cardio_result_cache_total', "Result token lookups by outcome.", {'outcome': outcome}, result_cache.stats()[outcome])
+    for outcome in ('hits', 'shared_hits', 'misses', 'expired', 'evicted')
+])
+
+result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, store_dir=RESULT_CACHE_DIR)
+
+bulk_pool = RenderPool(BULK_WORKERS, BULK_MAX_CONCURRENT)
+
+report_queue = ReportJobQueue(
+    workers=REPORT_WORKERS, max_pending=REPORT_QUEUE_LIMIT, executor=REPORT_EXECUTOR,
+    ttl=REPORT_JOB_TTL, job_dir=REPORT_JOB_DIR
+)
+
+# --- Instrumentation ---
+
+# Fetching profiles (which sends the token) or metrics should not itself be profiled
+UNPROFILED_ENDPOINTS = {'metrics', 'list_profiles', 'download_slowest_profiles', 'download_profile', 'static'}
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+    # Opt-in cProfile of this request (PROFILE_HEADER + token, or PROFILE_SAMPLE_RATE)
+    g.profile = None
+    if request.endpoint not in UNPROFILED_ENDPOINTS:
+        g.profile = PROFILER.start(request.headers.get(PROFILE_HEADER))
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    profile = g.pop('profile', None)
+    if profile is not None:
+        record = PROFILER.stop(profile, route, request.method, response.status_code)
+        response.headers['X-Profile-Id'] = record['id']
+        METRICS.inc('cardio_profiles_captured_total', (('route', route),))
+    started = g.get('request_started')
+    if started is not None:
+        # The rule ("/reports/<job_id>"), not the path, keeps the label set bounded
+        METRICS.observe('cardio_http_request_seconds', time.perf_counter() - started, (('route', route),))
+        METRICS.inc('cardio_http_requests_total', (('route', route), ('method', request.method), ('status', str(response.status_code))))
+        if response.status_code >= 400:
+            METRICS.inc('cardio_http_errors_total', (('route', route), ('status', str(response.status_code))))
+    METRICS.maybe_flush()
+    return response
+
+@app.teardown_request
+def stop_abandoned_profile(exc):
+    # A request that never reached after_request must still release the profiler
+    profile = g.pop('profile', None)
+    if profile is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        PROFILER.stop(profile, route, request.method, 500)
+
+@app.route('/metrics')
+def metrics():
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+def profiles_forbidden():
+    if PROFILER.authorized(request.headers.get(PROFILE_HEADER)):
+        return None
+    if not PROFILER.token:
+        return jsonify({'success': False, 'error': 'Profile downloads are disabled; set PROFILE_TOKEN to enable them.'}), 403
+    return jsonify({'success': False, 'error': f'Send the profiling token in {PROFILE_HEADER}.'}), 403
+
+@app.route('/profiles')
+def list_profiles():
+    # Slowest captured requests of this worker, newest buffer only
+    forbidden = profiles_forbidden()
+    if forbidden:
+        return forbidden
+    return jsonify(PROFILER.index(request.args.get('n', 10, type=int)))
+
+@app.route('/profiles/slowest.zip')
+def download_slowest_profiles():
+    forbidden = profiles_forbidden()
+    if forbidden:
+        return forbidden
+    records = PROFILER.slowest(request.args.get('n', 10, type=int))
+    if not records:
+        return jsonify({'success': False, 'error': 'No profiles captured yet.'}), 404
+    return send_file(
+        io.BytesIO(profiling.slowest_zip(records)), as_attachment=True,
+        download_name=f"profiles_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip", mimetype='application/zip'
+    )
+
+@app.route('/profiles/<profile_id>.<fmt>')
+def download_profile(profile_id, fmt):
+    forbidden = profiles_forbidden()
+    if forbidden:
+        return forbidden
+    record = PROFILER.get(profile_id)
+    if record is None or fmt not in ('prof', 'txt'):
+        return jsonify({'success': False, 'error': 'Unknown or evicted profile.'}), 404
+    if fmt == 'txt':
+        return Response(profiling.summary(record), mimetype='text/plain')
+    return send_file(io.BytesIO(record['stats']), as_attachment=True,
+                     download_name=f"{profiling.filename(record)}.prof", mimetype='application/octet-stream')
+
+def record_pdf(route, size, reports=1):
+    METRICS.inc('cardio_pdf_reports_total', (('route', route),), reports)
+    METRICS.inc('cardio_pdf_bytes_total', (('route', route),), size)
 
 # --- Routes ---
 
@@ -58,437 +260,469 @@ def predict_ui():
 def doctors():
     return render_template('doctors.html')
 
+def load_json_file(path):
+    # Small result files written by the offline tools; a missing or bad file renders as empty
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
 @app.route('/accuracy')
 def accuracy():
-    return render_template('accuracy.html')
-
-def calculate_heart_age(chronological_age, systolic, diastolic, weight, height, cholesterol, gluc, smoke, active):
-    heart_age = chronological_age
-    
-    # BP Impact
-    if systolic >= 140 or diastolic >= 90:
-        heart_age += 7
-    elif systolic >= 130 or diastolic >= 85:
-        heart_age += 3
-    elif systolic < 120 and diastolic < 80:
-        heart_age -= 1
-        
-    # Smoking Impact
-    if smoke == 1:
-        heart_age += 5
-        
-    # BMI Impact
-    bmi = weight / ((height / 100) ** 2)
-    if bmi >= 30:
-        heart_age += 6
-    elif bmi >= 25:
-        heart_age += 2
-        
-    # Cholesterol & Glucose
-    if cholesterol > 1:
-        heart_age += 2
-    if gluc > 1:
-        heart_age += 2
-        
-    # Activity
-    if active == 0:
-        heart_age += 3
-    else:
-        heart_age -= 1
-        
-    return round(max(chronological_age - 5, min(heart_age, 100)))
-
-def generate_heart_reboot_plan(data, prediction):
-    # Base plan structure
-    plan = []
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    
-    # Extract triggers
-    bp_high = float(data.get('ap_hi', 120)) >= 140 or float(data.get('ap_lo', 80)) >= 90
-    smoker = int(data.get('smoke', 0)) == 1
-    inactive = int(data.get('active', 1)) == 0
-    weight = float(data.get('weight', 70))
-    height = float(data.get('height', 170))
-    bmi = weight / ((height / 100) ** 2)
-    obese = bmi >= 30
+    benchmarks = load_json_file(MODEL_BENCHMARKS) or {}
+    # Fastest single row first, so the models that fit the latency budget lead the table
+    rows = sorted(benchmarks.get('models', []), key=lambda m: m['batches']['1']['p95_ms'])
+    return render_template('accuracy.html', benchmarks=benchmarks, benchmark_rows=rows)
 
-    # Activity Levels
-    base_activity = "15-min light walk" if not inactive else "5-min stretching"
-    high_activity = "30-min brisk walk" if not inactive else "15-min modified walk"
-
-    for i, day in enumerate(days):
-        day_plan = {"day": day}
-        
-        # Morning Vital
-        if bp_high:
-            day_plan["vital"] = "Measure BP (Resting)"
-        elif obese:
-            day_plan["vital"] = "Record Morning Weight"
-        else:
-            day_plan["vital"] = "Record Resting Heart Rate"
-
-        # Main Activity Logic
-        if i == 0: # Mon
-            day_plan["activity"] = base_activity
-            day_plan["diet"] = "Cut salt intake by 50%" if bp_high else "Start 2L water goal"
-        elif i == 1: # Tue
-            day_plan["activity"] = "Isometric wall-sit (30s)" if bp_high else "Light yoga/stretching"
-            day_plan["diet"] = "Zero processed sugar today"
-        elif i == 2: # Wed
-            day_plan["activity"] = high_activity
-            day_plan["diet"] = "Add leafy greens to lunch"
-        elif i == 3: # Thu
-            day_plan["activity"] = "Deep breathing (5 mins)"
-            day_plan["diet"] = "Intermittent fasting (12h gap)"
-        elif i == 4: # Fri
-            day_plan["activity"] = "Bodyweight squats (10 reps)"
-            day_plan["diet"] = "Replace caffeine with herbal tea"
-        elif i == 5: # Sat
-            day_plan["activity"] = "Long nature walk (45 min)"
-            day_plan["diet"] = "Try a DASH-diet recipe"
-        else: # Sun
-            day_plan["activity"] = "Rest & Mobility work"
-            day_plan["diet"] = "Meal prep for next week"
-
-        # Special Overlays
-        if smoker and i % 2 == 0:
-            day_plan["activity"] += " + Lung capacity breaths"
-            day_plan["diet"] += " (Nicotine-free window: 4h)"
-
-        plan.append(day_plan)
-        
-    return plan
+@app.route('/scoring_stats')
+def scoring_stats():
+    # Per-model request counts and inference latency, plus lookup-table stats when enabled
+    return jsonify(get_registry().stats())
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    if model is None:
-        return jsonify({'error': 'Model not loaded. Please check server logs.'}), 500
-
+    # Validate first: a bad form costs no model lookup and no inference
     try:
-        data = request.form
-        
-        age = float(data.get('Age_Year', 45))
-        ap_hi = float(data.get('ap_hi', 120))
-        ap_lo = float(data.get('ap_lo', 80))
-        weight = float(data.get('weight', 70))
-        height = float(data.get('height', 170))
-        chol = int(data.get('cholesterol', 1))
-        gluc = int(data.get('gluc', 1))
-        smoke = int(data.get('smoke', 0))
-        active = int(data.get('active', 1))
-
-        features = [
-            int(data.get('gender', 0)), height, weight, ap_hi, ap_lo, 
-            chol, gluc, smoke, int(data.get('alco', 0)), active, age
-        ]
-        
-        # Predict
-        prediction = model.predict([features])[0]
-        
-        # Probability
-        probability = 0.0
-        if hasattr(model, "predict_proba"):
-            prob_array = model.predict_proba([features])[0]
-            probability = float(prob_array[1] if len(prob_array) > 1 else prob_array[0]) * 100
-        
-        # Calculate Heart Age
-        heart_age = calculate_heart_age(age, ap_hi, ap_lo, weight, height, chol, gluc, smoke, active)
-        
-        # Generate 7-Day Reboot Plan
-        reboot_plan = generate_heart_reboot_plan(data, int(prediction))
+        with METRICS.timed('validate'):
+            features = validate_one(request.form)
+    except ValidationError as e:
+        return validation_error(e)
 
-        return jsonify({
+    entry, error = model_or_error(request.values.get('model'))
+    if error:
+        return error
+
+    try:
+        assessment = build_assessment(request.form, entry, features)
+        # Kept for the Heart Passport download, which then needs no second scoring pass
+        result_token = result_cache.put(assessment)
+        cohort = None
+        if COHORT_STATS:
+            with METRICS.timed('cohort'):
+                stats = cohort_for(entry.model)
+                if stats is not None:
+                    cohort = stats.compare(assessment['probability'], assessment['age'], features[FEATURES.index('gender')])
+
+        body = json.dumps({
             'success': True,
-            'prediction': int(prediction), 
-            'probability': probability,
-            'heart_age': heart_age,
-            'chronological_age': age,
-            'reboot_plan': reboot_plan
-        })
+            'prediction': int(assessment['prediction']), 
+            'probability': assessment['probability'],
+            'threshold': assessment['threshold'],
+            'model': entry.name,
+            'model_version': entry.version,
+            'heart_age': assessment['heart_age'],
+            'chronological_age': assessment['age'],
+            'explanation': assessment['explanation'],
+            'cohort': cohort,
+            'result_token': result_token,
+            'result_token_ttl': RESULT_CACHE_TTL
+        }, separators=(',', ':'))
+        # The plan is spliced in as its pre-serialized JSON instead of being encoded again
+        plan_json = reboot_plan_json(assessment['reboot_plan_key'], assessment['locale'])
+        return Response(f'{body[:-1]},"reboot_plan":{plan_json}}}', mimetype='application/json')
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
-@app.route('/generate_report', methods=['POST'])
-def generate_report():
-    from fpdf import FPDF
-    import io
-    from datetime import datetime
-    from flask import send_file, jsonify
+@app.route('/simulate', methods=['POST'])
+def simulate_route():
+    # What-if grid for one patient: {"patient": {...features}, "interventions": {"ap_hi": {"delta": [-20, -10]},
+    # "smoke": {"set": [0]}, ...}}. A form post (predict.html) is the patient, with the default grid
+    # unless an "interventions" field carries the JSON spec.
+    try:
+        if request.is_json:
+            payload = request.get_json() or {}
+            if not isinstance(payload, dict):
+                raise ValueError("Expected a JSON object.")
+            patient = payload.get('patient', payload)
+            if not isinstance(patient, dict):
+                raise ValidationError([{'row': None, 'field': 'patient', 'value': None,
+                                        'message': "patient must be an object of feature values."}])
+            interventions = payload.get('interventions')
+        else:
+            patient = request.form
+            interventions = json.loads(request.form['interventions']) if request.form.get('interventions') else None
+        if interventions is not None and not isinstance(interventions, dict):
+            raise ValueError("interventions must be an object keyed by feature.")
+        with METRICS.timed('validate'):
+            features = validate_one(patient)
+    except ValidationError as e:
+        return validation_error(e)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    entry, error = model_or_error(request.values.get('model') or patient.get('model'))
+    if error:
+        return error
+
+    try:
+        started = time.perf_counter()
+        result, rows = simulate(entry.model, features, interventions)
+        record_inference(entry, time.perf_counter() - started, rows)
+    except ValidationError as e:
+        return validation_error(e)
+
+    return jsonify({'success': True, 'model': entry.name, 'model_version': entry.version, **result})
+
+@app.route('/cohort')
+def cohort_summary():
+    # Every age band / gender stratum of the cohort as scored by the selected model: size, mean
+    # risk, quantiles, observed prevalence and a risk histogram
+    entry, error = model_or_error(request.args.get('model'))
+    if error:
+        return error
+    stats = cohort_for(entry.model)
+    if stats is None:
+        return jsonify({'success': False, 'error': 'Cohort statistics are not available.'}), 503
+    return jsonify({'success': True, 'model': entry.name, 'model_version': entry.version, **stats.summary()})
+
+@app.route('/cohort/percentile')
+def cohort_percentile():
+    # ?probability=<0-100>&Age_Year=<years>&gender=<code>: where a risk falls among those peers.
+    # gender is in the form coding (0 = female, 1 = male) unless gender_coding=dataset (1 / 2).
+    try:
+        probability = float(request.args['probability'])
+        if not 0 <= probability <= 100:
+            raise ValueError
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'error': 'probability must be a number between 0 and 100.'}), 400
+    coding = request.args.get('gender_coding', 'form')
+    if coding not in GENDER_CODINGS:
+        return jsonify({'success': False, 'error': f"gender_coding must be one of: {', '.join(GENDER_CODINGS)}."}), 400
+    try:
+        # Age and gender are checked like the assessment form (the other fields take their defaults)
+        values = dict(zip(FEATURES, validate_one({k: request.args[k] for k in ('Age_Year', 'gender') if k in request.args})))
+    except ValidationError as e:
+        return validation_error(e)
+
+    entry, error = model_or_error(request.args.get('model'))
+    if error:
+        return error
+    stats = cohort_for(entry.model)
+    if stats is None:
+        return jsonify({'success': False, 'error': 'Cohort statistics are not available.'}), 503
+    return jsonify({
+        'success': True, 'model': entry.name, 'model_version': entry.version, 'probability': probability,
+        **stats.compare(probability, values['Age_Year'], values['gender'], coding)
+    })
+
+def skip_invalid():
+    # ?skip_invalid=1 on the batch routes: score the valid rows and report the rest, instead of
+    # rejecting the whole batch on the first bad row
+    return request.values.get('skip_invalid') in ('1', 'true')
+
+def read_batch_records():
+    # Accepts a JSON list / {"records": [...]} body, or a CSV upload (file field or text/csv body)
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+    elif request.is_json:
+        payload = request.get_json()
+        records = payload.get('records', []) if isinstance(payload, dict) else payload
+        if not isinstance(records, list):
+            raise ValueError("Expected a list of records.")
+        return records
+    else:
+        text = request.get_data(as_text=True)
+    return records_from_csv(text)
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    entry, error = model_or_error(request.values.get('model'))
+    if error:
+        return error
 
     try:
-        data = request.form
-        patient_name = data.get('patient_name', 'Valued Patient').strip()
-        if not patient_name:
-            patient_name = "Valued Patient"
-            
-        age = float(data.get('Age_Year', 45))
-        ap_hi = float(data.get('ap_hi', 120))
-        ap_lo = float(data.get('ap_lo', 80))
-        weight = float(data.get('weight', 70))
-        height = float(data.get('height', 170))
-        chol = int(data.get('cholesterol', 1))
-        gluc = int(data.get('gluc', 1))
-        smoke = int(data.get('smoke', 0))
-        active = int(data.get('active', 1))
-
-        features = [
-            int(data.get('gender', 0)), height, weight, ap_hi, ap_lo, 
-            chol, gluc, smoke, int(data.get('alco', 0)), active, age
+        with METRICS.timed('parse_batch'):
+            records = read_batch_records()
+        if not records:
+            return jsonify({'success': False, 'error': 'No records supplied.'}), 400
+        if len(records) > MAX_BATCH_ROWS:
+            return jsonify({'success': False, 'error': f'Batch too large (max {MAX_BATCH_ROWS} records).'}), 413
+
+        # The whole batch is checked before any row is scored
+        with METRICS.timed('validate'):
+            if skip_invalid():
+                X, kept, errors, error_count = partition_batch(records)
+                skipped = len(records) - len(kept)
+                records = [records[i] for i in kept.tolist()]
+                rows = (kept + 1).tolist()
+            else:
+                X = validate_batch(records)
+                skipped, errors, error_count, rows = 0, [], 0, range(1, len(records) + 1)
+        cols = {f: X[:, i] for i, f in enumerate(FEATURES)}
+
+        # One inference pass for the whole batch; labels are derived from the probabilities
+        started = time.perf_counter()
+        predictions, probabilities, threshold = score_batch(entry.model, X)
+        record_inference(entry, time.perf_counter() - started, len(X))
+        probabilities = probabilities * 100
+
+        with METRICS.timed('heart_age'):
+            heart_ages = calculate_heart_age_batch(
+                cols['Age_Year'], cols['ap_hi'], cols['ap_lo'], cols['weight'], cols['height'],
+                cols['cholesterol'], cols['gluc'], cols['smoke'], cols['active']
+            )
+        bmis = np.round(calculate_bmi(cols['weight'], cols['height']), 2)
+        explainer = None
+        if EXPLAIN_PREDICTIONS:
+            with METRICS.timed('explain'):
+                explainer, contributions = explain_batch(entry.model, X)
+
+        results = [
+            {
+                'row': row,
+                'prediction': pred,
+                'probability': prob,
+                'heart_age': h_age,
+                'bmi': bmi,
+                'chronological_age': c_age
+            }
+            for row, pred, prob, h_age, bmi, c_age in zip(
+                rows, predictions.tolist(), probabilities.tolist(), heart_ages.tolist(),
+                bmis.tolist(), cols['Age_Year'].tolist()
+            )
         ]
-        
-        prediction = 0
-        probability = 0.0
-        if model:
-            prediction = int(model.predict([features])[0])
-            if hasattr(model, "predict_proba"):
-                prob_array = model.predict_proba([features])[0]
-                probability = float(prob_array[1] if len(prob_array) > 1 else prob_array[0]) * 100
+        for rec, res in zip(records, results):
+            if 'id' in rec:
+                res['id'] = rec['id']
+        stats = cohort_for(entry.model) if COHORT_STATS else None
+        if stats is not None:
+            # One binary search for the whole batch
+            with METRICS.timed('cohort'):
+                # Gender as the model saw it (form coding) unless the upload says gender_coding=dataset
+                _, percentiles = stats.percentiles(
+                    probabilities / 100, cols['Age_Year'], cols['gender'], request.values.get('gender_coding', 'form')
+                )
+            for res, pct in zip(results, np.round(percentiles, 1).tolist()):
+                res['cohort_percentile'] = pct
+        explanation = None
+        if explainer is not None:
+            # Per row {feature: contribution}; method, space and base_value are shared
+            for res, row in zip(results, contributions.tolist()):
+                res['contributions'] = dict(zip(FEATURES, row))
+            explanation = {'method': explainer.method, 'space': explainer.space, 'base_value': explainer.base_value}
+
+        return jsonify({
+            'success': True, 'count': len(results), 'threshold': threshold,
+            'model': entry.name, 'model_version': entry.version, 'explanation': explanation, 'results': results,
+            'skipped': skipped, 'errors': errors, 'error_count': error_count
+        })
 
+    except ValidationError as e:
+        return validation_error(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+def form_patient_name(data):
+    return data.get('patient_name', 'Valued Patient').strip() or "Valued Patient"
+
+def build_assessment(data, entry=None, features=None):
+    # Parses the assessment form and scores it; everything the Heart Passport needs.
+    # /predict passes the model entry and the features it already validated.
+    patient_name = form_patient_name(data)
+
+    # Raises ValidationError before any scoring or PDF work
+    if features is None:
+        with METRICS.timed('validate'):
+            features = validate_one(data)
+    values = dict(zip(FEATURES, features))
+    age, ap_hi, ap_lo = values['Age_Year'], values['ap_hi'], values['ap_lo']
+    weight, height = values['weight'], values['height']
+    chol, gluc = values['cholesterol'], values['gluc']
+    smoke, active = values['smoke'], values['active']
+
+    prediction = 0
+    probability = 0.0
+    threshold = None
+    if entry is None:
+        entry = select_model(data.get('model'))
+    if entry is not None and entry.model is not None:
+        started = time.perf_counter()
+        prediction, probability, threshold = score_one(entry.model, features)
+        record_inference(entry, time.perf_counter() - started)
+        probability *= 100
+
+    explanation = None
+    if EXPLAIN_PREDICTIONS and entry is not None and entry.model is not None:
+        with METRICS.timed('explain'):
+            explanation = explain_one(entry.model, features)
+
+    with METRICS.timed('heart_age'):
         heart_age = calculate_heart_age(age, ap_hi, ap_lo, weight, height, chol, gluc, smoke, active)
-        bmi = weight / ((height / 100) ** 2)
-        reboot_plan = generate_heart_reboot_plan(data, prediction)
+    bmi = weight / ((height / 100) ** 2)
+    # One of the precomputed plan variants; the optional 'locale' field picks the language
+    with METRICS.timed('reboot_plan'):
+        plan_key = reboot_plan_key(values)
+        locale = plan_locale(data.get('locale'))
+        plan = reboot_plan(plan_key, locale)
+
+    return {
+        'patient_name': patient_name, 'age': age, 'ap_hi': ap_hi, 'ap_lo': ap_lo,
+        'weight': weight, 'height': height, 'chol': chol, 'gluc': gluc,
+        'prediction': prediction, 'probability': probability, 'heart_age': heart_age,
+        'bmi': bmi, 'reboot_plan': plan, 'reboot_plan_key': plan_key, 'locale': locale,
+        'threshold': threshold, 'explanation': explanation
+    }
 
-        # Generate PDF
-        pdf = FPDF()
-        pdf.add_page()
-        
-        # --- Page 1: Clinical Summary ---
-        pdf.set_font("Helvetica", 'B', 24)
-        pdf.set_text_color(37, 99, 235)
-        pdf.cell(0, 20, "Global Heart Passport", ln=True, align='C')
-        
-        pdf.set_font("Helvetica", '', 10)
-        pdf.set_text_color(107, 114, 128)
-        pdf.cell(0, 10, f"Issued on: {datetime.now().strftime('%B %d, %Y')} | CardioCare AI Diagnostic", ln=True, align='C')
-        
-        pdf.ln(10)
-
-        # Patient Info Header
-        pdf.set_fill_color(248, 250, 252)
-        pdf.set_font("Helvetica", 'B', 12)
-        pdf.set_text_color(51, 65, 85)
-        pdf.cell(0, 12, f" PATIENT NAME: {patient_name.upper()}", border=0, ln=True, fill=True)
-        pdf.ln(2)
-        
-        # Risk Summary Header
-        pdf.set_fill_color(243, 244, 246)
-        pdf.set_font("Helvetica", 'B', 14)
-        pdf.set_text_color(31, 41, 55)
-        pdf.cell(0, 12, " [1] CLINICAL RISK ASSESSMENT SUMMARY", ln=True, fill=True)
-        pdf.ln(5)
-        
-        pdf.set_font("Helvetica", 'B', 12)
-        pdf.cell(45, 10, "Chronological Age :")
-        pdf.cell(15, 10, f"{int(age)}")
-        pdf.cell(45, 10, "  Functional Heart Age : ")
-        
-        age_diff = heart_age - age
-        if age_diff > 0:
-            pdf.set_text_color(220, 38, 38)
-            age_text = f"{heart_age} Yrs (+{int(age_diff)})"
-        elif age_diff < 0:
-            pdf.set_text_color(16, 185, 129)
-            age_text = f"{heart_age} Yrs ({int(age_diff)})"
-        else:
-            pdf.set_text_color(37, 99, 235)
-            age_text = f"{heart_age} Yrs (Optimal)"
-            
-        pdf.cell(0, 10, age_text, ln=True)
-        pdf.set_text_color(31, 41, 55)
-        
-        risk_status = "HIGH RISK" if prediction == 1 else "LOW RISK"
-        status_color = (220, 38, 38) if prediction == 1 else (16, 185, 129)
-        
-        pdf.cell(45, 10, "Risk Status : ")
-        pdf.set_text_color(*status_color)
-        pdf.cell(40, 10, risk_status)
-        pdf.set_text_color(31, 41, 55)
-        pdf.cell(30, 10, "   Probability : ")
-        pdf.cell(0, 10, f"{probability:.2f}%", ln=True)
-        
-        pdf.ln(5)
-        pdf.set_font("Helvetica", 'B', 12)
-        pdf.cell(0, 10, f"Vital Parameters for {patient_name}:", ln=True)
-        pdf.set_font("Helvetica", '', 10)
-        
-        def add_row(label, value, unit=""):
-            pdf.set_fill_color(252, 252, 252)
-            pdf.cell(60, 8, f" {label}", border=1, fill=True)
-            pdf.cell(0, 8, f" {value} {unit}", border=1, ln=True)
-
-        add_row("Height", height, "cm")
-        add_row("Weight", weight, "kg")
-        add_row("BMI", f"{bmi:.2f}", "kg/m2")
-        add_row("Blood Pressure", f"{ap_hi}/{ap_lo}", "mmHg")
-        add_row("Cholesterol", ["Normal", "Above Normal", "High"][chol-1])
-        add_row("Glucose", ["Normal", "Above Normal", "High"][gluc-1])
-        
-        pdf.ln(10)
-        pdf.set_fill_color(243, 244, 246)
-        pdf.set_font("Helvetica", 'B', 14)
-        pdf.cell(0, 12, " [1] AI-DRIVEN PERSONALIZED HEALTH ADVICE", ln=True, fill=True)
-        pdf.ln(5)
-        
-        pdf.set_font("Helvetica", '', 10)
-        if prediction == 1 or age_diff > 5:
-            pdf.set_text_color(185, 28, 28)
-            pdf.multi_cell(0, 7, f"CRITICAL INSIGHT for {patient_name}: Your Heart Age is {heart_age}, which is {int(age_diff) if age_diff > 0 else 'significantly'} years older than your actual age. This indicates rapid cardiovascular aging.")
-            pdf.set_text_color(31, 41, 55)
-            pdf.ln(2)
-            pdf.multi_cell(0, 7, "- Priority 1: Consult a cardiologist to discuss preventative medication.\n- Priority 2: Adopt a DASH diet and reduce daily salt below 1,500mg.\n- Priority 3: Begin daily aerobic activity (light walking) to 'de-age' your heart.")
-        else:
-            pdf.set_text_color(15, 118, 110)
-            pdf.multi_cell(0, 7, f"HEALTH OPTIMIZATION for {patient_name}: Your heart is aging at a healthy rate. Maintaining current status is key.")
-            pdf.set_text_color(31, 41, 55)
-            pdf.ln(2)
-            pdf.multi_cell(0, 7, "- Focus on longevity through strength training and high-fiber intake.\n- Avoid any new tobacco exposure which could accelerate heart aging by 5-10 years.")
-
-        pdf.ln(10)
-        pdf.set_font("Helvetica", 'I', 8)
-        pdf.set_text_color(107, 114, 128)
-        pdf.multi_cell(0, 5, "DISCLAIMER: This report is AI-generated for educational purposes only. It is not a clinical diagnosis.")
-
-        # --- Page 2: 7-Day Heart Reboot Blueprint ---
-        pdf.add_page()
-        pdf.set_font("Helvetica", 'B', 20)
-        pdf.set_text_color(37, 99, 235)
-        pdf.cell(0, 15, " [2] 7-DAY HEART REBOOT BLUEPRINT", ln=True, align='L')
-        pdf.set_font("Helvetica", '', 10)
-        pdf.set_text_color(75, 85, 99)
-        pdf.multi_cell(0, 6, f"Tailored action plan for {patient_name} based on current clinical risk profile. Follow these daily steps to optimize cardiovascular performance.")
-        pdf.ln(5)
-
-        # Using fpdf2 table feature for perfect alignment
-        table_data = [
-            ("Day", "Morning Vital", "Activity Goal", "Dietary Focus")
-        ]
-        for day in reboot_plan:
-            table_data.append((
-                day['day'],
-                day['vital'],
-                day['activity'],
-                day['diet']
-            ))
-
-        with pdf.table(
-            borders_layout="SINGLE_TOP_LINE",
-            cell_fill_color=(250, 250, 252),
-            cell_fill_mode="ROWS",
-            line_height=8,
-            text_align=("LEFT", "LEFT", "LEFT", "LEFT"),
-            width=190,
-            col_widths=(25, 40, 60, 65)
-        ) as table:
-            for i, row in enumerate(table_data):
-                row_cells = table.row()
-                if i == 0:
-                    pdf.set_font("Helvetica", 'B', 10)
-                    pdf.set_text_color(255, 255, 255)
-                    pdf.set_fill_color(37, 99, 235)
-                else:
-                    pdf.set_font("Helvetica", '', 9)
-                    pdf.set_text_color(31, 41, 55)
-                    pdf.set_fill_color(250, 250, 252) if i % 2 == 0 else pdf.set_fill_color(255, 255, 255)
-                    
-                for cell_text in row:
-                    row_cells.cell(cell_text)
-
-        pdf.ln(10)
-        pdf.set_font("Helvetica", 'B', 11)
-        pdf.set_text_color(15, 118, 110)
-        pdf.cell(0, 10, "Pro Tip: Consistency is better than intensity. Start small, stay steady.", ln=True)
-
-        # In fpdf2, output() returns bytearray by default
-        pdf_bytes = pdf.output()
-        
-        buffer = io.BytesIO(pdf_bytes)
-        buffer.seek(0)
-        
-        # Format filename
-        safe_name = patient_name.replace(" ", "_").lower()
-        filename = f"{safe_name}_Heart_Passport_{datetime.now().strftime('%Y%m%d')}.pdf"
+def cached_or_built_assessment(data):
+    # The /predict result named by result_token when still cached, otherwise a full scoring pass
+    assessment = result_cache.get(data.get('result_token'))
+    METRICS.inc('cardio_report_assessments_total', (('source', 'cache' if assessment else 'scored'),))
+    if assessment is None:
+        return build_assessment(data)
+    # The name may have been edited after predicting; it does not affect the scores
+    if data.get('patient_name') is not None:
+        assessment = dict(assessment, patient_name=form_patient_name(data))
+    return assessment
+
+@app.route('/generate_report', methods=['POST'])
+def generate_report():
+    try:
+        assessment = cached_or_built_assessment(request.form)
+        with METRICS.timed('pdf_render'):
+            pdf_bytes = render_heart_passport(assessment)
+        record_pdf('/generate_report', len(pdf_bytes))
         
         return send_file(
-            buffer,
+            io.BytesIO(pdf_bytes),
             as_attachment=True,
-            download_name=filename,
+            download_name=report_filename(assessment['patient_name']),
             mimetype='application/pdf'
         )
+    except ValidationError as e:
+        return validation_error(e)
     except Exception as e:
         print(f"PDF GENERATION ERROR: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    import random
-    data = request.json
-    user_msg = data.get('message', '').lower().strip()
-    
-    # Advanced prioritized responses with expanded details
-    medical_responses = {
-        "symptom": "Warning symptoms of heart trouble include: 1. Chest pain or pressure, 2. Shortness of breath, 3. Pain in neck/jaw/back, 4. Nausea or cold sweats, 5. Lightheadedness. If these occur suddenly, call emergency services immediately (102 or your local number).",
-        "chest pain": "Chest pain (Angina) can feel like squeezing, pressure, or fullness. While it can be non-cardiac (like GERD), it is often the first sign of a heart attack. Do not ignore it – seek immediate medical evaluation at an ER.",
-        "systolic": "Systolic pressure (the top/higher number) measures the force your heart exerts on artery walls during a beat. Normal is < 120. Elevated is 120-129. Stage 1 Hypertension is 130-139. High systolic pressure is a major risk factor for stroke and heart disease.",
-        "diastolic": "Diastolic pressure (the bottom/lower number) measures the force between beats while the heart rests. Normal is < 80. Consistent readings above 80 indicate hypertension. Both numbers are critical for your heart health assessment.",
-        "bmi": "Body Mass Index (BMI) categories: Underweight (<18.5), Normal (18.5-24.9), Overweight (25-29.9), and Obese (30+). A higher BMI increases the workload on your heart and raises the risk of diabetes and high blood pressure.",
-        "cholesterol": "Cholesterol has two main types: LDL ('bad') which clogs arteries, and HDL ('good') which clears them. To lower LDL: avoid trans fats, eat more soluble fiber (oats, beans), and consume Omega-3s (salmon, walnuts).",
-        "exercise": "The goal is at least 150 minutes of moderate aerobic activity (like brisk walking) or 75 minutes of vigorous activity (running/swimming) per week, plus muscle-strengthening exercises twice a week. Start slow and stay consistent!",
-        "diet": "A heart-healthy diet focuses on: 1. Fruits/Vegetables (half your plate), 2. Whole grains, 3. Lean proteins (fish, poultry, legumes), 4. Limiting salt, sugar, and saturated fats. The DASH and Mediterranean diets are excellent benchmarks.",
-        "smoke": "Smoking is a leading cause of cardiovascular disease. It damages the lining of your arteries, leads to plaque buildup, and reduces oxygen in your blood. Quitting at any age significantly lowers heart attack risk within 1-2 years.",
-        "pressure": "Hypertension (High Blood Pressure) is often called the 'silent killer' because it has no symptoms but causes permanent damage to the heart, brain, and kidneys. Reducing salt and increasing exercise are the best non-medical ways to lower it.",
-        "salt": "High sodium intake causes the body to retain water, raising blood pressure. Aim for less than 2,300mg/day (about 1 teaspoon). Avoid processed foods, canned soups, and salty snacks to protect your arteries.",
-        "prevention": "Top 5 Preventive Steps: 1. Know your numbers (BP, Cholesterol, Glucose), 2. Move your body daily, 3. Eat real, unprocessed food, 4. Manage stress through sleep/medication, 5. Avoid all tobacco products.",
-        "doctor": "Our Specialists page lists experts who can provide personalized care. If your Assessment shows High Risk, we recommend booking a consultation immediately for a professional diagnostic workup.",
-        "heart attack": "Signs of a heart attack: Chest discomfort, upper body pain (arms, back, neck), stomach pain (sometimes mistaken for indigestion), and shortness of breath. Time is heart muscle – seek help instantly.",
-        "stroke": "Use the FAST acronym for Stroke: Face drooping, Arm weakness, Speech difficulty, Time to call emergency services. Strokes are often caused by the same risk factors as heart disease, like high BP.",
-        "weight": "Losing even 5-10% of your body weight can dramatically improve your blood pressure and cholesterol levels, reducing the strain on your cardiovascular system.",
-        "diabetes": "High blood sugar damages blood vessels and the nerves that control your heart. Managing your 'A1C' levels is crucial for preventing long-term cardiovascular complications.",
-        "alcohol": "Excessive alcohol can raise blood pressure and contribute to heart failure. If you drink, limit it to 1 drink/day for women and 2/day for men.",
-        "stress": "Chronic stress increases hormones like cortisol, which can raise BP and heart rate. Practice deep breathing, meditation, or regular physical activity to help manage stress levels."
-    }
+# --- Asynchronous Report Jobs ---
 
-    # Group 2: Medium Priority (Greetings/General)
-    general_responses = {
-        "hello": "Hello! I'm Hearty, your AI specialist. I can explain your test results, give diet/exercise advice, or help you understand symptoms. What's on your mind?",
-        "hi": "Hi there! Ready to take control of your heart health? Ask me about things like blood pressure, BMI, or healthy eating!",
-        "hey": "Hey! How can I help you stay healthy today? I have lots of information on heart disease prevention and lifestyle tips.",
-        "who are you": "I'm Hearty AI, a dedicated cardiovascular health assistant. I use clinical guidelines to help users understand their heart risks and live longer, healthier lives.",
-        "thanks": "You're welcome! My goal is to see you stay healthy. Don't forget to check your 'Assessment' results!",
-        "thank you": "It's my pleasure! I'm here 24/7 if you have more questions about your heart. Stay active!",
-        "help": "I can help with: 1. Explaining BP/BMI numbers, 2. Diet and Exercise tips, 3. Identifying heart attack signs, 4. Finding a doctor. What specifically do you need?",
-        "ok": "Great! Let me know if you have any specific questions about your heart health or our services.",
-        "good": "Wonderful! Keeping a positive attitude is actually good for your heart too. Anything else I can help with?"
-    }
+@app.route('/reports', methods=['POST'])
+def submit_report():
+    try:
+        assessment = cached_or_built_assessment(request.form)
+    except ValidationError as e:
+        return validation_error(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
 
-    # Custom multi-keyword search logic
-    response = None
-    
-    # 1. Check Medical (Priority) - Matches if any word is in message
-    for key, value in medical_responses.items():
-        if key in user_msg:
-            response = value
-            break
-            
-    # 2. Check General (If no medical match)
-    if not response:
-        for key, value in general_responses.items():
-            if key in user_msg:
-                response = value
-                break
-                
-    # 3. Randomized Fallback
-    if not response:
-        fallbacks = [
-            "That's a good question! To give you the best advice, could you ask me about specific things like 'Blood Pressure', 'Diet', 'Smoking', or 'Symptoms'?",
-            "I'm not sure I understand that perfectly. However, I can tell you all about how to prevent heart disease if you're interested!",
-            "I recommend checking our 'Specialists' page for an expert opinion. Would you like to know more about the different heart symptoms I recognize?",
-            "I'm still learning! You can try asking: 'What are heart attack signs?' or 'How much should I exercise?'",
-            "I'm here to help with your cardio health! Try mentioning keywords like 'cholesterol', 'bmi', or 'salt intake'."
-        ]
-        response = random.choice(fallbacks)
+    try:
+        job_id = report_queue.submit(assessment)
+    except ReportQueueFull as e:
+        response = jsonify({'success': False, 'error': str(e)})
+        response.headers['Retry-After'] = '2'
+        return response, 503
+
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('fetch_report', job_id=job_id)
+    }), 202
+
+@app.route('/reports/<job_id>', methods=['GET'])
+def fetch_report(job_id):
+    status, payload = report_queue.status(job_id)
+    if status == 'unknown':
+        return jsonify({'success': False, 'error': 'Unknown or expired report job.'}), 404
+    if status == 'pending':
+        return jsonify({'success': True, 'status': 'pending'}), 202
+    if status == 'failed':
+        return jsonify({'success': False, 'status': 'failed', 'error': payload}), 500
+
+    record_pdf('/reports/<job_id>', os.path.getsize(payload))
+    return send_file(
+        payload,
+        as_attachment=True,
+        download_name=report_queue.filename(job_id),
+        mimetype='application/pdf'
+    )
+
+def counted_zip(chunks, reports):
+    # Passes the ZIP stream through and records its size once it has been sent in full
+    started = time.perf_counter()
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        yield chunk
+    METRICS.observe('cardio_stage_seconds', time.perf_counter() - started, (('stage', 'zip_stream'),))
+    record_pdf('/bulk_reports', size, reports)
+
+@app.route('/bulk_reports', methods=['POST'])
+def bulk_reports():
+    entry, error = model_or_error(request.values.get('model'))
+    if error:
+        return error
+
+    try:
+        with METRICS.timed('parse_batch'):
+            records = read_batch_records()
+        if not records:
+            return jsonify({'success': False, 'error': 'No records supplied.'}), 400
+        if len(records) > BULK_MAX_ROWS:
+            return jsonify({'success': False, 'error': f'Cohort too large (max {BULK_MAX_ROWS} records).'}), 413
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    if not bulk_pool.acquire():
+        response = jsonify({'success': False, 'error': f'{BULK_MAX_CONCURRENT} bulk exports are already running. Try again shortly.'})
+        response.headers['Retry-After'] = '10'
+        return response, 503
+    try:
+        # Score up front so bad input fails before the ZIP stream starts
+        cohort = score_cohort(entry.model, records, explain=EXPLAIN_PREDICTIONS, skip_invalid=skip_invalid())
+        record_inference(entry, cohort['inference_seconds'], len(cohort['records']))
+    except ValidationError as e:
+        bulk_pool.release()
+        return validation_error(e)
+    except Exception as e:
+        bulk_pool.release()
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    filename = f"Heart_Passports_{datetime.now().strftime('%Y%m%d')}.zip"
+    response = Response(
+        stream_with_context(counted_zip(stream_zip(cohort, BULK_WORKERS, bulk_pool), len(cohort['records']))),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={filename}', 'X-Skipped-Rows': str(cohort['skipped'])}
+    )
+    # The server closes the response however the stream ends (sent, failed or abandoned)
+    response.call_on_close(bulk_pool.release)
+    return response
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    data = request.get_json(silent=True) or {}
+    return jsonify({'response': chatbot.respond(str(data.get('message', '')))})
+
+# --- Warm-up ---
+# Representative form used to run the scoring and Heart Passport paths once at startup
+WARMUP_FORM = {
+    'patient_name': 'Warm-up', 'gender': '1', 'Age_Year': '55', 'height': '156', 'weight': '85',
+    'ap_hi': '140', 'ap_lo': '90', 'cholesterol': '3', 'gluc': '1', 'smoke': '0', 'alco': '0', 'active': '1'
+}
+WARMUP_COMPONENTS = ("model", "reports")
+
+def warm_up(components):
+    components = {c.strip() for c in components.split(",") if c.strip()} - {"none"}
+    if "all" in components:
+        components = set(WARMUP_COMPONENTS)
+    for unknown in sorted(components - set(WARMUP_COMPONENTS)):
+        print(f"Unknown WARMUP component '{unknown}' ignored.")
+
+    if "model" in components:
+        # Every model in the manifest, with its explainer and cohort statistics (warm_model)
+        get_registry()
+    if "reports" in components:
+        # Imports fpdf2 and builds the cached layout (scores the form, so the model loads too)
+        try:
+            render_heart_passport(build_assessment(WARMUP_FORM))
+        except Exception as e:
+            print(f"Report warm-up failed: {e}")
+    return sorted(components & set(WARMUP_COMPONENTS))
 
-    return jsonify({'response': response})
+warmed = warm_up(WARMUP)
+print(f"App ready in {(time.perf_counter() - _import_started) * 1000:.0f} ms (warm-up: {', '.join(warmed) or 'none'})")
 
 # <<<<<<< HEAD
 # # if __name__ == '__main__':
@@ -0,0 +1,79 @@
+# bench_chat.py
+# Messages/second through the /chat responder on a single thread, plus the cost of a reload,
+# and the latency percentiles and memory footprint of the TF-IDF retrieval mode.
+# Usage: python bench_chat.py [seconds]
+import sys
+import time
+import numpy as np
+import chatbot
+
+# Target throughput for one worker
+TARGET_PER_SECOND = 10000
+
+MESSAGES = [
+    "hi",
+    "hello, what are the symptoms of a heart attack?",
+    "how much exercise should i do every week",
+    "is my blood pressure of 140 over 90 too high",
+    "what does my bmi mean",
+    "thank you so much",
+    "tell me about cholesterol and a good diet",
+    "who are you",
+    "i want to quit smoking, any tips?",
+    "this is something the knowledge base does not cover at all, so it should fall back",
+]
+
+def messages_per_second(respond, seconds):
+    for message in MESSAGES:
+        respond(message)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for message in MESSAGES:
+            respond(message)
+        count += len(MESSAGES)
+    return count / (time.perf_counter() - start)
+
+def latencies_us(respond, rounds=500):
+    samples = []
+    for _ in range(rounds):
+        for message in MESSAGES:
+            start = time.perf_counter()
+            respond(message)
+            samples.append(time.perf_counter() - start)
+    return np.array(samples) * 1e6
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    store = chatbot.STORE
+
+    # Check interval 0 forces an mtime stat on every message: the worst case for hot reload
+    interval = store.check_interval
+    rates = {}
+    for label, check_interval in (("mtime check every 2 s", 2.0), ("mtime check every message", 0.0)):
+        store.check_interval = check_interval
+        rates[label] = messages_per_second(chatbot.respond, seconds)
+    store.check_interval = interval
+
+    start = time.perf_counter()
+    for _ in range(20):
+        chatbot.KnowledgeBase.from_file(store.path)
+    rebuild_ms = (time.perf_counter() - start) / 20 * 1000
+
+    print(f"Knowledge base: {store.kb.topics} topics from {store.path}")
+    for label, rate in rates.items():
+        status = "OK" if rate >= TARGET_PER_SECOND else "below target"
+        print(f"  {label:26s}: {rate:10,.0f} msgs/s ({1e6 / rate:5.1f} us/msg) [{status}]")
+    print(f"  reload (parse + compile)  : {rebuild_ms:10.2f} ms")
+
+    start = time.perf_counter()
+    retrieval = chatbot.KnowledgeBase.from_file(store.path, retrieval=True)
+    build_ms = (time.perf_counter() - start) * 1000
+    rate = messages_per_second(retrieval.respond, seconds)
+    samples = latencies_us(retrieval.respond)
+    status = "OK" if rate >= TARGET_PER_SECOND else "below target"
+    print(f"Retrieval mode: {len(retrieval.index.answers)} indexed documents")
+    print(f"  throughput                : {rate:10,.0f} msgs/s [{status}]")
+    print(f"  latency p50 / p99 / max   : {np.percentile(samples, 50):.1f} / {np.percentile(samples, 99):.1f} / {samples.max():.1f} us")
+    print(f"  index memory              : {retrieval.index.memory_bytes() / 1024:10.1f} KiB")
+    print(f"  index build (cold import) : {build_ms:10.2f} ms")
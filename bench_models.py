@@ -0,0 +1,193 @@
+# bench_models.py
+# Inference cost of every candidate model, so the model served is chosen on latency as well as
+# accuracy. Each artifact is loaded the way the registry serves it (load_artifact, including the
+# compiled fast path) in a fresh process, so resident memory is measured per model and one
+# model's caches never warm another's. For batch sizes 1, 64 and 4096 it times predict_proba
+# (score_one for the single row, as /predict does) and reports p50/p95 latency and throughput,
+# plus artifact size and RSS. Models without predict_proba are skipped: scoring would time their
+# predict instead, and the app could only serve labels for them. Results go to
+# model_benchmarks.json next to model_accuracies.json (machine-specific, so not committed) and
+# are rendered on /accuracy.
+# Usage: python bench_models.py [--models models.json] [--artifacts "models/*.pkl"] [--budget-ms 5]
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import warnings
+import multiprocessing
+import numpy as np
+
+BATCH_SIZES = (1, 64, 4096)
+# Timed calls per batch size; large batches get fewer so slow models finish in reasonable time
+CALLS = {1: 500, 64: 100, 4096: 10}
+# Rows the batches are drawn from: real patients, so tree and neighbour models take realistic paths
+SAMPLE_DATA = "Cardio_cleaned.csv"
+
+def candidates(manifest_path, patterns):
+    # (name, path) for every model in the registry manifest plus any extra artifacts (e.g. the
+    # output of train.py / search.py), de-duplicated by file
+    found = []
+    seen = set()
+    if manifest_path and os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        base = os.path.dirname(os.path.abspath(manifest_path))
+        for spec in manifest.get('models', []):
+            path = os.path.join(base, spec['path'])
+            found.append((spec['name'], path))
+            seen.add(os.path.abspath(path))
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            if os.path.abspath(path) not in seen:
+                found.append((os.path.splitext(os.path.basename(path))[0], path))
+                seen.add(os.path.abspath(path))
+    return found
+
+def rss_bytes():
+    # Current resident set size; Linux reads /proc, elsewhere the peak is the best available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def _sample_rows(n):
+    from scoring import FEATURES
+    from dataset import load_frame
+    X = load_frame(SAMPLE_DATA, FEATURES)[FEATURES].to_numpy(dtype=float)
+    rng = np.random.default_rng(0)
+    return X[rng.integers(0, len(X), n)]
+
+def _bench_one(path, fast_path):
+    # Runs in a fresh process: everything the model needs except the model itself is imported
+    # and the sample rows are built before the baseline RSS reading
+    from threadpoolctl import threadpool_limits
+    from model_registry import load_artifact
+    from scoring import score_batch, score_one
+    import sklearn.ensemble, sklearn.linear_model, sklearn.neighbors, sklearn.svm, sklearn.tree  # noqa: F401
+    warnings.filterwarnings("ignore")
+    # One thread, as a gunicorn worker thread would effectively get
+    threadpool_limits(1)
+
+    X = _sample_rows(max(BATCH_SIZES))
+    rows = X.tolist()
+    baseline = rss_bytes()
+    started = time.perf_counter()
+    model = load_artifact(path, fast_path=fast_path)
+    load_seconds = time.perf_counter() - started
+    loaded = rss_bytes()
+
+    model_class = type(getattr(model, 'estimator', model)).__name__
+    if not hasattr(model, "predict_proba"):
+        return {'model_class': model_class, 'skipped': "no predict_proba (labels only)"}
+
+    result = {
+        'model_class': model_class,
+        'compiled': model is not getattr(model, 'estimator', model),
+        'load_seconds': round(load_seconds, 4),
+        'rss_bytes': max(loaded - baseline, 0),
+        'batches': {}
+    }
+    for size in BATCH_SIZES:
+        samples = []
+        for i in range(CALLS[size] + 1):
+            if size == 1:
+                row = rows[i % len(rows)]
+                t = time.perf_counter()
+                score_one(model, row)
+            else:
+                batch = X[:size]
+                t = time.perf_counter()
+                score_batch(model, batch)
+            samples.append(time.perf_counter() - t)
+        # The first call pays one-off costs (lazy imports, buffer allocation) and is left out
+        samples = np.array(samples[1:])
+        p50 = float(np.percentile(samples, 50))
+        result['batches'][str(size)] = {
+            'p50_ms': round(p50 * 1000, 4),
+            'p95_ms': round(float(np.percentile(samples, 95)) * 1000, 4),
+            'rows_per_second': round(size / p50, 1)
+        }
+    result['peak_rss_bytes'] = max(rss_bytes() - baseline, 0)
+    return result
+
+def bench(name, path, fast_path=True):
+    # Fresh interpreter per model (spawn), so RSS and caches are its own
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        result = pool.apply(_bench_one, (path, fast_path))
+    result.update(name=name, artifact=os.path.relpath(path), artifact_bytes=os.path.getsize(path))
+    return result
+
+def attach_accuracy(results, accuracies_path):
+    # Hold-out accuracy from model_accuracies.json, matched by slug, artifact file or (for the
+    # notebook's records) the family's display name
+    from train import MODEL_FAMILIES
+    if not os.path.exists(accuracies_path):
+        return
+    with open(accuracies_path, encoding="utf-8") as f:
+        records = json.load(f)
+    for result in results:
+        for record in records:
+            artifact = record.get('artifact')
+            if record.get('slug') == result['name'] or record['Model'] == MODEL_FAMILIES.get(result['name']) or (
+                artifact and os.path.abspath(artifact) == os.path.abspath(result['artifact'])
+            ):
+                result['Model'] = record['Model']
+                result['accuracy'] = record['Accuracy']
+                break
+
+def write_results(path, results, budget_ms):
+    payload = {
+        'generated_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'budget_ms': budget_ms,
+        'batch_sizes': list(BATCH_SIZES),
+        'cpu_count': os.cpu_count(),
+        'models': results
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark inference latency, throughput and memory of every candidate model.")
+    parser.add_argument("--models", default="models.json", help="registry manifest to take candidates from")
+    parser.add_argument("--artifacts", action="append", help="extra artifact glob (repeatable, default models/*.pkl)")
+    parser.add_argument("--accuracies", default="model_accuracies.json")
+    parser.add_argument("--out", help="default: model_benchmarks.json next to --accuracies")
+    parser.add_argument("--budget-ms", type=float, default=5.0, help="single-row p95 latency budget")
+    parser.add_argument("--no-fast-path", action="store_true", help="time the plain sklearn estimators")
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(args.accuracies)), "model_benchmarks.json")
+    found = candidates(args.models, args.artifacts or ["models/*.pkl"])
+    if not found:
+        parser.error("no candidate models found")
+
+    results = []
+    for name, path in found:
+        try:
+            result = bench(name, path, fast_path=not args.no_fast_path)
+        except Exception as e:
+            print(f"  {name}: benchmark failed: {e}")
+            continue
+        if 'skipped' in result:
+            print(f"  {name}: skipped, {result['model_class']} has {result['skipped']}")
+            continue
+        single = result['batches']['1']
+        result['within_budget'] = single['p95_ms'] <= args.budget_ms
+        results.append(result)
+        print(f"  {name:28s} 1 row p95 {single['p95_ms']:8.3f} ms | "
+              + " | ".join(f"{size}: {result['batches'][str(size)]['rows_per_second']:>11,.0f} rows/s" for size in BATCH_SIZES[1:])
+              + f" | {result['artifact_bytes'] / 1e6:7.2f} MB file, {result['rss_bytes'] / 1e6:7.1f} MB RSS"
+              + ("" if result['within_budget'] else "  OVER BUDGET"))
+
+    attach_accuracy(results, args.accuracies)
+    write_results(out, results, args.budget_ms)
+    print(f"Wrote {len(results)} benchmark(s) to {out}")
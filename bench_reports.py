@@ -0,0 +1,48 @@
+# bench_reports.py
+# PDFs/second on a single core: plain fpdf2 layout vs the cached HeartPassportTemplate.
+# Usage: python bench_reports.py [seconds_per_renderer]
+import sys
+import time
+from reports import render_heart_passport_uncached, HeartPassportTemplate
+
+ASSESSMENT = {
+    'patient_name': 'Jane Doe', 'age': 55.0, 'ap_hi': 140.0, 'ap_lo': 90.0,
+    'weight': 85.0, 'height': 156.0, 'chol': 3, 'gluc': 1,
+    'prediction': 1, 'probability': 82.53, 'heart_age': 74, 'bmi': 34.93,
+    'reboot_plan': [
+        {'day': day, 'vital': 'Measure BP (Resting)', 'activity': activity, 'diet': diet}
+        for day, activity, diet in [
+            ("Monday", "15-min light walk + Lung capacity breaths", "Cut salt intake by 50% (Nicotine-free window: 4h)"),
+            ("Tuesday", "Isometric wall-sit (30s)", "Zero processed sugar today"),
+            ("Wednesday", "30-min brisk walk + Lung capacity breaths", "Add leafy greens to lunch (Nicotine-free window: 4h)"),
+            ("Thursday", "Deep breathing (5 mins)", "Intermittent fasting (12h gap)"),
+            ("Friday", "Bodyweight squats (10 reps) + Lung capacity breaths", "Replace caffeine with herbal tea (Nicotine-free window: 4h)"),
+            ("Saturday", "Long nature walk (45 min)", "Try a DASH-diet recipe"),
+            ("Sunday", "Rest & Mobility work + Lung capacity breaths", "Meal prep for next week (Nicotine-free window: 4h)"),
+        ]
+    ]
+}
+
+def pdfs_per_second(render, seconds):
+    render(ASSESSMENT)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        render(ASSESSMENT)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+
+    start = time.perf_counter()
+    template = HeartPassportTemplate()
+    setup_ms = (time.perf_counter() - start) * 1000
+
+    before = pdfs_per_second(render_heart_passport_uncached, seconds)
+    after = pdfs_per_second(template.render, seconds)
+
+    print(f"Template setup (once per process): {setup_ms:.1f} ms")
+    print(f"  fpdf2 layout per request : {before:7.1f} PDFs/s ({1000 / before:.1f} ms/PDF)")
+    print(f"  cached template          : {after:7.1f} PDFs/s ({1000 / after:.1f} ms/PDF)")
+    print(f"  speed-up                 : {after / before:.1f}x")
@@ -0,0 +1,59 @@
+# bench_scoring.py
+# Micro-benchmark: legacy predict + predict_proba vs the shared single-pass scoring core.
+# Usage: python bench_scoring.py [n_iterations]
+import sys
+import time
+import warnings
+import joblib
+from scoring import CompiledLinearModel, compile_model, score_one
+
+warnings.filterwarnings("ignore")
+
+MODEL_PATH = "model1.pkl"
+SAMPLE = [1, 156, 85, 140, 90, 3, 1, 0, 0, 1, 55]
+
+def legacy_score(model, features):
+    # What /predict and /generate_report used to do
+    prediction = model.predict([features])[0]
+    prob_array = model.predict_proba([features])[0]
+    probability = float(prob_array[1] if len(prob_array) > 1 else prob_array[0]) * 100
+    return int(prediction), probability
+
+def single_pass_score(model, features):
+    prediction, probability, _ = score_one(model, features)
+    return prediction, probability * 100
+
+def time_per_call(fn, model, n):
+    for _ in range(min(n, 200)):
+        fn(model, SAMPLE)
+    start = time.perf_counter()
+    for _ in range(n):
+        fn(model, SAMPLE)
+    return (time.perf_counter() - start) / n * 1e6
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    model = joblib.load(MODEL_PATH)
+
+    legacy = legacy_score(model, SAMPLE)
+    single = single_pass_score(model, SAMPLE)
+    assert legacy[0] == single[0] and abs(legacy[1] - single[1]) < 1e-9, (legacy, single)
+
+    legacy_us = time_per_call(legacy_score, model, n)
+    single_us = time_per_call(single_pass_score, model, n)
+
+    compiled = compile_model(model)
+    compiled_us = None
+    if isinstance(compiled, CompiledLinearModel):
+        fast = single_pass_score(compiled, SAMPLE)
+        assert fast[0] == single[0] and abs(fast[1] - single[1]) < 1e-6, (fast, single)
+        compiled_us = time_per_call(single_pass_score, compiled, n * 10)
+
+    print(f"Model: {type(model).__name__}  iterations: {n}")
+    print(f"  predict + predict_proba : {legacy_us:8.1f} us/request")
+    print(f"  single-pass score_one   : {single_us:8.1f} us/request")
+    print(f"  saved                   : {legacy_us - single_us:8.1f} us/request ({(1 - single_us / legacy_us) * 100:.0f}%)")
+    if compiled_us is None:
+        print("  compiled fast path      : not available for this model")
+    else:
+        print(f"  compiled fast path      : {compiled_us:8.1f} us/request ({legacy_us / compiled_us:.0f}x faster than legacy)")
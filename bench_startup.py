@@ -0,0 +1,48 @@
+# bench_startup.py
+# Cold-start cost per WARMUP setting: time to import app.py, then the latency of the first and
+# second request to each endpoint. Every setting runs in a fresh interpreter.
+# Usage: python bench_startup.py [warmup ...]   (default: none model all)
+import os
+import sys
+import json
+import subprocess
+
+PROBE = r"""
+import json, time, warnings
+warnings.filterwarnings("ignore")
+start = time.perf_counter()
+import app
+import_ms = (time.perf_counter() - start) * 1000
+client = app.app.test_client()
+form = dict(app.WARMUP_FORM)
+requests = [
+    ("/predict", lambda: client.post("/predict", data=form)),
+    ("/generate_report", lambda: client.post("/generate_report", data=form)),
+    ("/chat", lambda: client.post("/chat", json={"message": "what is a normal blood pressure"})),
+]
+timings = {}
+for name, call in requests:
+    runs = []
+    for _ in range(2):
+        t = time.perf_counter()
+        response = call()
+        runs.append((time.perf_counter() - t) * 1000)
+        assert response.status_code == 200, (name, response.status_code)
+    timings[name] = runs
+print("RESULT " + json.dumps({"import_ms": import_ms, "requests": timings}))
+"""
+
+def run(warmup):
+    env = dict(os.environ, WARMUP=warmup)
+    out = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True).stdout
+    line = next(l for l in out.splitlines() if l.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+if __name__ == "__main__":
+    settings = sys.argv[1:] or ["none", "model", "all"]
+    for warmup in settings:
+        result = run(warmup)
+        print(f"WARMUP={warmup}")
+        print(f"  import app             : {result['import_ms']:8.0f} ms")
+        for name, (first, second) in result["requests"].items():
+            print(f"  {name:22s} : first {first:8.1f} ms   then {second:6.1f} ms")
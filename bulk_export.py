@@ -0,0 +1,244 @@
+# bulk_export.py
+# Bulk Heart Passport export: scores a whole cohort CSV (Cardio_cleaned.csv layout) in one
+# vectorized pass, renders the PDFs across a process pool and streams them out as a ZIP.
+# The archive is written incrementally, so memory stays flat no matter how many patients.
+# In the app every export shares one RenderPool per worker process, which also caps how many
+# exports stream at once.
+# Usage: python bulk_export.py cohort.csv passports.zip [--workers N] [--model model1.pkl] [--skip-invalid]
+import os
+import io
+import time
+import csv
+import argparse
+import zipfile
+import warnings
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from scoring import FEATURES, compile_model, records_from_csv, score_batch
+from validation import ValidationError, partition_batch, validate_batch
+from explain import describe, explain_batch
+from health_metrics import DEFAULT_PLAN_LOCALE, calculate_bmi, calculate_heart_age_batch, reboot_plan, reboot_plan_keys
+from reports import render_heart_passport
+
+# Renders in flight per worker process; bounds memory held by finished-but-unwritten PDFs
+IN_FLIGHT_PER_WORKER = 4
+
+class _ChunkSink:
+    # Write-only, non-seekable target for ZipFile; the streaming generator drains it after each entry
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+class RenderPool:
+    # Process pool shared by the bulk exports of one process. Created on first use, so no
+    # processes exist before a gunicorn fork; replaced if a crashed worker broke it.
+    # acquire/release bound the exports in progress.
+    def __init__(self, workers, max_exports=2):
+        self.workers = workers
+        self.max_exports = max_exports
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_exports)
+
+    def acquire(self):
+        # False when max_exports exports are already running
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def submit(self, fn, *args):
+        executor = self._get_executor()
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            return self._get_executor().submit(fn, *args)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+def score_cohort(model, records, explain=True, skip_invalid=False):
+    # One predict_proba call, one heart-age pass and (optionally) one attribution pass for the
+    # whole cohort. Rejects the cohort (ValidationError) before any row is scored or rendered,
+    # unless skip_invalid: then bad rows are left out and reported under 'skipped' / 'errors'
+    if skip_invalid:
+        X, kept, errors, error_count = partition_batch(records)
+        rows = (kept + 1).tolist()
+        skipped = len(records) - len(kept)
+        records = [records[i] for i in kept.tolist()]
+    else:
+        X = validate_batch(records)
+        rows, skipped, errors, error_count = list(range(1, len(records) + 1)), 0, [], 0
+    started = time.perf_counter()
+    labels, probabilities, _ = score_batch(model, X)
+    inference_seconds = time.perf_counter() - started
+    explainer, contributions = explain_batch(model, X) if explain else (None, None)
+    cols = {f: X[:, i] for i, f in enumerate(FEATURES)}
+    heart_ages = calculate_heart_age_batch(
+        cols['Age_Year'], cols['ap_hi'], cols['ap_lo'], cols['weight'], cols['height'],
+        cols['cholesterol'], cols['gluc'], cols['smoke'], cols['active']
+    )
+    return {
+        'records': records,
+        # 1-based row of each record in the input
+        'rows': rows,
+        'skipped': skipped,
+        'errors': errors,
+        'error_count': error_count,
+        # The predict_proba call alone, for the per-model latency counters
+        'inference_seconds': inference_seconds,
+        'X': X,
+        'labels': labels,
+        'probabilities': probabilities * 100,
+        'heart_ages': heart_ages,
+        'bmis': calculate_bmi(cols['weight'], cols['height']),
+        'plan_keys': reboot_plan_keys(cols['ap_hi'], cols['ap_lo'], cols['smoke'], cols['active'], cols['weight'], cols['height']),
+        'explainer': explainer,
+        'contributions': contributions
+    }
+
+def patient_name(record, row):
+    name = (record.get('patient_name') or '').strip()
+    return name or f"Patient {record.get('id', row)}"
+
+def iter_assessments(cohort):
+    # Builds the per-patient dicts lazily so only the in-flight window exists at once
+    explainer = cohort.get('explainer')
+    for i, record in enumerate(cohort['records']):
+        values = cohort['X'][i].tolist()
+        row = dict(zip(FEATURES, values))
+        prediction = int(cohort['labels'][i])
+        plan_key = int(cohort['plan_keys'][i])
+        yield {
+            'patient_name': patient_name(record, cohort['rows'][i]),
+            'age': row['Age_Year'], 'ap_hi': row['ap_hi'], 'ap_lo': row['ap_lo'],
+            'weight': row['weight'], 'height': row['height'],
+            'chol': int(row['cholesterol']), 'gluc': int(row['gluc']),
+            'prediction': prediction,
+            'probability': float(cohort['probabilities'][i]),
+            'heart_age': int(cohort['heart_ages'][i]),
+            'bmi': float(cohort['bmis'][i]),
+            'reboot_plan': reboot_plan(plan_key),
+            'reboot_plan_key': plan_key,
+            'locale': DEFAULT_PLAN_LOCALE,
+            'explanation': describe(explainer, values, cohort['contributions'][i].tolist()) if explainer else None
+        }
+
+def render_all(assessments, workers, pool=None):
+    # Yields (assessment, pdf bytes) in input order. pool: a shared RenderPool (app); without one
+    # a process pool lives for this export only (CLI)
+    if workers <= 1:
+        for assessment in assessments:
+            yield assessment, render_heart_passport(assessment)
+        return
+
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    window = deque()
+    try:
+        for assessment in assessments:
+            window.append((assessment, pool.submit(render_heart_passport, assessment)))
+            if len(window) >= workers * IN_FLIGHT_PER_WORKER:
+                done, future = window.popleft()
+                yield done, future.result()
+        while window:
+            done, future = window.popleft()
+            yield done, future.result()
+    finally:
+        if own_pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+        else:
+            # An abandoned download leaves the shared pool nothing of its queued work
+            for _, future in window:
+                future.cancel()
+
+def summary_csv(cohort):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['index', 'id', 'patient_name', 'prediction', 'probability', 'heart_age', 'bmi'])
+    for i, record in enumerate(cohort['records']):
+        row = cohort['rows'][i]
+        writer.writerow([
+            row, record.get('id', ''), patient_name(record, row), int(cohort['labels'][i]),
+            f"{cohort['probabilities'][i]:.2f}", int(cohort['heart_ages'][i]), f"{cohort['bmis'][i]:.2f}"
+        ])
+    return out.getvalue()
+
+def skipped_csv(cohort):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['index', 'field', 'message'])
+    for error in cohort['errors']:
+        writer.writerow([error['row'], error['field'] or '', error['message']])
+    return out.getvalue()
+
+def stream_zip(cohort, workers=1, pool=None):
+    # Generator of ZIP bytes: summary.csv (and skipped.csv) first, then one Heart Passport per patient
+    sink = _ChunkSink()
+    # PDFs are already deflated internally, so entries are stored rather than recompressed
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        archive.writestr('summary.csv', summary_csv(cohort))
+        if cohort.get('errors'):
+            archive.writestr('skipped.csv', skipped_csv(cohort))
+        yield from sink.drain()
+        for i, (assessment, pdf_bytes) in enumerate(render_all(iter_assessments(cohort), workers, pool)):
+            safe_name = assessment['patient_name'].replace(" ", "_").replace("/", "_").replace("\\", "_").lower()
+            archive.writestr(f"{i + 1:05d}_{safe_name}_Heart_Passport.pdf", pdf_bytes)
+            yield from sink.drain()
+    yield from sink.drain()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render Heart Passports for every row of a cohort CSV into a ZIP.")
+    parser.add_argument("csv_path")
+    parser.add_argument("zip_path")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model", default="model1.pkl")
+    parser.add_argument("--skip-invalid", action="store_true", help="leave out rows that fail validation instead of stopping")
+    args = parser.parse_args()
+
+    # Only the CLI loads a model itself; the app passes its own in
+    import joblib
+    warnings.filterwarnings("ignore")
+    model = compile_model(joblib.load(args.model))
+    with open(args.csv_path, encoding="utf-8-sig") as f:
+        records = records_from_csv(f.read())
+
+    try:
+        cohort = score_cohort(model, records, skip_invalid=args.skip_invalid)
+    except ValidationError as e:
+        raise SystemExit(f"{e}\nRe-run with --skip-invalid to leave the bad rows out.")
+    for error in cohort['errors']:
+        print(f"Skipped row {error['row']}: {error['message']}")
+    if cohort['error_count'] > len(cohort['errors']):
+        print(f"... and {cohort['error_count'] - len(cohort['errors'])} more error(s)")
+    written = 0
+    with open(args.zip_path, "wb") as out:
+        for chunk in stream_zip(cohort, args.workers):
+            out.write(chunk)
+            written += len(chunk)
+    print(f"Wrote {len(cohort['records'])} Heart Passports to {args.zip_path} ({written / 1e6:.1f} MB, {cohort['skipped']} row(s) skipped)")
@@ -0,0 +1,209 @@
+# chatbot.py
+# Hearty, the keyword chatbot behind /chat. The knowledge base lives in chat_knowledge.json and
+# is compiled into a single regex, so each message is resolved in one scan. Edits to the file
+# are picked up without a restart: a changed mtime triggers a rebuild that is swapped in whole.
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import threading
+import numpy as np
+
+CHAT_KB_PATH = os.environ.get("CHAT_KB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_knowledge.json"))
+# Seconds between mtime checks; 0 checks on every message
+CHAT_KB_CHECK_INTERVAL = float(os.environ.get("CHAT_KB_CHECK_INTERVAL", 2))
+# "keyword" answers from keyword topics only; "retrieval" first looks the message up in a TF-IDF
+# index over the FAQ and topics, then falls back to keywords
+CHAT_MODE = os.environ.get("CHAT_MODE", "keyword")
+# Minimum cosine similarity for a retrieved answer to be used
+CHAT_RETRIEVAL_MIN_SCORE = float(os.environ.get("CHAT_RETRIEVAL_MIN_SCORE", 0.3))
+# Vocabulary cap, bounds the index memory however large the FAQ grows
+CHAT_RETRIEVAL_MAX_FEATURES = int(os.environ.get("CHAT_RETRIEVAL_MAX_FEATURES", 20000))
+
+class KeywordMatcher:
+    # Compiles prioritized keyword groups into one regex. All keywords sit in a single
+    # alternation inside a lookahead, ordered by priority, so finditer reports the best
+    # keyword starting at each word and the lowest priority index seen wins overall -
+    # the same answer as scanning the dicts in order, but in one pass over the message.
+    def __init__(self, groups):
+        self.responses = []
+        self._priority = {}
+        alternatives = []
+        for responses, prefix_match in groups:
+            for key, value in responses.items():
+                # Messages are lowercased before matching
+                words = key.lower().split()
+                if not words:
+                    continue
+                pattern = r'\s+'.join(re.escape(word) for word in words)
+                if not prefix_match:
+                    pattern += r'(?!\w)'
+                alternatives.append(pattern)
+                self._priority.setdefault(" ".join(words), len(self.responses))
+                self.responses.append(value)
+        # Only positions that start a word with a possible first character are tried
+        first_chars = "".join(sorted({re.escape(key[0]) for key in self._priority}))
+        self._regex = re.compile(r"(?<!\w)(?=[" + first_chars + r"])(?=(" + "|".join(alternatives) + "))")
+
+    def match(self, message):
+        best = None
+        for m in self._regex.finditer(message):
+            index = self._priority[" ".join(m.group(1).split())]
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        return None if best is None else self.responses[best]
+
+class RetrievalIndex:
+    # TF-IDF over short documents (FAQ questions, topic keywords), each pointing at an answer.
+    # The term-document matrix is stored transposed (one posting row per term), so scoring a
+    # message is a sparse matrix-vector product that only touches the rows of its own terms.
+    def __init__(self, documents, answers, max_features=CHAT_RETRIEVAL_MAX_FEATURES):
+        # Only imported when retrieval is on: keyword mode keeps the lighter startup
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        vectorizer = TfidfVectorizer(
+            ngram_range=(1, 2), sublinear_tf=True, stop_words='english',
+            max_features=max_features, dtype=np.float32
+        )
+        postings = vectorizer.fit_transform(documents).T.tocsr()
+        self.answers = list(answers)
+        self._analyzer = vectorizer.build_analyzer()
+        self._vocabulary = vectorizer.vocabulary_
+        self._idf = vectorizer.idf_.astype(np.float32)
+        self._indptr = postings.indptr
+        self._indices = postings.indices
+        self._data = postings.data
+
+    def search(self, message, k=3):
+        # Returns up to k (score, answer) pairs, best first, one per distinct answer
+        counts = {}
+        for token in self._analyzer(message):
+            j = self._vocabulary.get(token)
+            if j is not None:
+                counts[j] = counts.get(j, 0) + 1
+        if not counts:
+            return []
+
+        scores = np.zeros(len(self.answers), dtype=np.float32)
+        norm = 0.0
+        for j, count in counts.items():
+            # Same sublinear tf * idf weighting the documents were built with
+            weight = (1.0 + math.log(count)) * float(self._idf[j])
+            norm += weight * weight
+            start, end = self._indptr[j], self._indptr[j + 1]
+            scores[self._indices[start:end]] += weight * self._data[start:end]
+        scores /= math.sqrt(norm)
+
+        # Paraphrases share an answer, so take a few extra candidates before de-duplicating
+        candidates = min(k * 4, len(scores))
+        top = np.argpartition(scores, -candidates)[-candidates:]
+        results = []
+        for i in top[np.argsort(-scores[top])].tolist():
+            if scores[i] <= 0 or len(results) == k:
+                break
+            if all(answer != self.answers[i] for _, answer in results):
+                results.append((float(scores[i]), self.answers[i]))
+        return results
+
+    def memory_bytes(self):
+        arrays = self._indptr.nbytes + self._indices.nbytes + self._data.nbytes + self._idf.nbytes
+        vocabulary = sys.getsizeof(self._vocabulary) + sum(sys.getsizeof(t) for t in self._vocabulary)
+        return arrays + vocabulary
+
+class KnowledgeBase:
+    # Immutable compiled snapshot of a knowledge base file. Groups are listed in priority order;
+    # "prefix" groups match word prefixes ("symptom" also hits "symptoms"), "word" groups only
+    # whole words ("hi" must not fire inside "this").
+    def __init__(self, data, version=None, retrieval=CHAT_MODE == "retrieval"):
+        groups = []
+        for group in data.get('groups', []):
+            match = group.get('match', 'word')
+            if match not in ('prefix', 'word'):
+                raise ValueError(f"Unknown match mode '{match}' in group '{group.get('name', '?')}'")
+            groups.append((group.get('responses', {}), match == 'prefix'))
+        if not any(responses for responses, _ in groups):
+            raise ValueError("Knowledge base has no responses")
+        self.fallbacks = tuple(data.get('fallbacks', []))
+        if not self.fallbacks:
+            raise ValueError("Knowledge base has no fallbacks")
+        self.matcher = KeywordMatcher(groups)
+        self.topics = len(self.matcher.responses)
+        self.version = version
+
+        self.index = None
+        if retrieval:
+            # Each FAQ paraphrase is its own document; topics are found by their keyword
+            documents, answers = [], []
+            for responses, _ in groups:
+                for key, value in responses.items():
+                    documents.append(key)
+                    answers.append(value)
+            for entry in data.get('faq', []):
+                for question in entry.get('questions', []):
+                    documents.append(question)
+                    answers.append(entry['answer'])
+            self.index = RetrievalIndex(documents, answers)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        version = _file_version(path)
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), version, **kwargs)
+
+    def respond(self, message):
+        user_msg = message.lower().strip()
+        if self.index is not None:
+            hits = self.index.search(user_msg, k=1)
+            if hits and hits[0][0] >= CHAT_RETRIEVAL_MIN_SCORE:
+                return hits[0][1]
+        return self.matcher.match(user_msg) or random.choice(self.fallbacks)
+
+def _file_version(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+class KnowledgeBaseStore:
+    # Holds the live KnowledgeBase. Readers only load one attribute, so the request path takes
+    # no lock; a reload builds the new snapshot off to the side and replaces the reference.
+    # Concurrent checks are collapsed with a non-blocking lock: whoever loses keeps serving
+    # the current snapshot. A broken file is reported and the last good snapshot stays live.
+    def __init__(self, path, check_interval=CHAT_KB_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.kb = KnowledgeBase.from_file(path)
+        self.reloads = 0
+        self._next_check = time.monotonic() + check_interval
+        self._reload_lock = threading.Lock()
+
+    def current(self):
+        now = time.monotonic()
+        if now >= self._next_check and self._reload_lock.acquire(blocking=False):
+            try:
+                self._next_check = now + self.check_interval
+                self._reload_if_changed()
+            finally:
+                self._reload_lock.release()
+        return self.kb
+
+    def _reload_if_changed(self):
+        try:
+            if _file_version(self.path) == self.kb.version:
+                return
+            kb = KnowledgeBase.from_file(self.path)
+        except (OSError, ValueError) as e:
+            # json.JSONDecodeError is a ValueError
+            print(f"Chat knowledge base not reloaded, keeping previous version: {e}")
+            return
+        self.kb = kb
+        self.reloads += 1
+        print(f"Chat knowledge base reloaded: {kb.topics} topics from {self.path}")
+
+STORE = KnowledgeBaseStore(CHAT_KB_PATH)
+
+def respond(message):
+    return STORE.current().respond(message)
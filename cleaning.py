@@ -0,0 +1,158 @@
+# cleaning.py
+# Streaming cleaning pipeline for cardio_train.csv-style extracts. The input is read in chunks
+# and each chunk flows through a list of vectorized stages (pandas column operations, no row
+# loops), so memory stays bounded by the chunk size however large the extract is. Every stage
+# counts rows in/out and its own time. default_stages() reproduce Cardio_cleaned.csv exactly.
+# Usage: python cleaning.py cardio_train.csv cleaned.csv [--chunksize 50000] [--bp]
+import time
+import argparse
+
+class Stage:
+    name = "stage"
+
+    def __init__(self):
+        self.rows_in = 0
+        self.rows_out = 0
+        self.seconds = 0.0
+
+    def apply(self, chunk):
+        raise NotImplementedError
+
+    def __call__(self, chunk):
+        started = time.perf_counter()
+        out = self.apply(chunk)
+        self.seconds += time.perf_counter() - started
+        self.rows_in += len(chunk)
+        self.rows_out += len(out)
+        return out
+
+class AgeInYears(Stage):
+    # age is recorded in days; the models use whole years
+    name = "age_years"
+
+    def apply(self, chunk):
+        if 'Age_Year' not in chunk.columns:
+            chunk = chunk.assign(Age_Year=(chunk['age'] / 365).round().astype(int))
+        return chunk
+
+class Bounds(Stage):
+    # Keeps rows whose column lies in [low, high] (inclusive)
+    def __init__(self, column, low, high):
+        super().__init__()
+        self.column = column
+        self.low = low
+        self.high = high
+        self.name = f"{column}_bounds"
+
+    def apply(self, chunk):
+        return chunk[chunk[self.column].between(self.low, self.high)]
+
+class BloodPressurePlausibility(Stage):
+    # Drops physiologically impossible readings: non-positive or out-of-range values and
+    # diastolic above systolic. Not part of the defaults: Cardio_cleaned.csv keeps raw BP.
+    name = "bp_plausibility"
+
+    def __init__(self, hi_range=(60, 250), lo_range=(30, 200)):
+        super().__init__()
+        self.hi_range = hi_range
+        self.lo_range = lo_range
+
+    def apply(self, chunk):
+        keep = (
+            chunk['ap_hi'].between(*self.hi_range)
+            & chunk['ap_lo'].between(*self.lo_range)
+            & (chunk['ap_lo'] <= chunk['ap_hi'])
+        )
+        return chunk[keep]
+
+class DropDuplicates(Stage):
+    # Drops repeated patient ids across the whole stream. Only the ids seen so far are kept,
+    # which is far smaller than the data itself.
+    name = "dedup"
+
+    def __init__(self, key='id'):
+        super().__init__()
+        self.key = key
+        self.seen = set()
+
+    def apply(self, chunk):
+        ids = chunk[self.key]
+        keep = ~ids.duplicated() & ~ids.isin(self.seen)
+        self.seen.update(ids[keep].tolist())
+        return chunk[keep]
+
+def default_stages(bp=False):
+    # Fresh stage objects each call, since stages carry counters (and dedup its seen ids)
+    stages = [AgeInYears()]
+    if bp:
+        stages.append(BloodPressurePlausibility())
+    stages += [Bounds('height', 110, 210), Bounds('weight', 45, 175), DropDuplicates('id')]
+    return stages
+
+def read_chunks(path, chunksize=50000):
+    import pandas as pd
+    # Both the raw (;) and the cleaned (,) layouts are accepted
+    with open(path, encoding="utf-8-sig") as f:
+        header = f.readline()
+    sep = ';' if header.count(';') > header.count(',') else ','
+    return pd.read_csv(path, sep=sep, chunksize=chunksize)
+
+class CleaningPipeline:
+    def __init__(self, stages=None):
+        self.stages = stages if stages is not None else default_stages()
+        self.read_seconds = 0.0
+
+    def run(self, chunks):
+        # Generator: yields each cleaned chunk as soon as it has passed every stage
+        chunks = iter(chunks)
+        while True:
+            started = time.perf_counter()
+            chunk = next(chunks, None)
+            self.read_seconds += time.perf_counter() - started
+            if chunk is None:
+                return
+            for stage in self.stages:
+                chunk = stage(chunk)
+                if chunk.empty:
+                    break
+            yield chunk
+
+    def clean_frame(self, frame):
+        # Whole-frame convenience: one chunk through the same stages
+        import pandas as pd
+        parts = list(self.run([frame]))
+        return pd.concat(parts, ignore_index=True) if parts else frame.iloc[0:0]
+
+    def report(self):
+        return [
+            {'stage': s.name, 'rows_in': s.rows_in, 'rows_out': s.rows_out,
+             'dropped': s.rows_in - s.rows_out, 'seconds': s.seconds}
+            for s in self.stages
+        ]
+
+def clean_file(in_path, out_path, chunksize=50000, stages=None):
+    # Streams in_path to out_path; returns the pipeline for its report
+    pipeline = CleaningPipeline(stages)
+    header = True
+    with open(out_path, "w", newline="", encoding="utf-8") as out:
+        for chunk in pipeline.run(read_chunks(in_path, chunksize)):
+            chunk.to_csv(out, index=False, header=header)
+            header = False
+    return pipeline
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean a cardio extract chunk by chunk.")
+    parser.add_argument("in_path")
+    parser.add_argument("out_path")
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--bp", action="store_true", help="also drop implausible blood pressure readings")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    pipeline = clean_file(args.in_path, args.out_path, args.chunksize, default_stages(bp=args.bp))
+    total = time.perf_counter() - started
+
+    print(f"{'stage':18s} {'rows in':>10s} {'rows out':>10s} {'dropped':>8s} {'ms':>8s}")
+    for row in pipeline.report():
+        print(f"{row['stage']:18s} {row['rows_in']:10d} {row['rows_out']:10d} {row['dropped']:8d} {row['seconds'] * 1000:8.1f}")
+    print(f"read/parse {pipeline.read_seconds * 1000:.0f} ms, total {total * 1000:.0f} ms -> {args.out_path}")
@@ -0,0 +1,302 @@
+# cohort.py
+# How a patient's risk compares with peers: the percentile of their predicted probability among
+# the Cardio_cleaned.csv patients of the same age band and gender, as scored by the same model.
+# The whole cohort is scored once per model and kept as one sorted array of stratum-offset keys
+# (stratum id * 2 + probability), so a percentile, or a whole batch of them, is a single binary
+# search. Per-stratum risk histograms, quantiles and observed prevalence are precomputed with it.
+# The arrays are cached in COHORT_CACHE_DIR as one .npz per (dataset, model) pair and loaded
+# instead of rescoring the cohort on the next start. Rows that fail the input schema
+# (validation.py) are left out. The CSV is read with the csv module, so serving needs no pandas.
+# Strata use the dataset's gender codes (1 = female, 2 = male); the form's (0 = female, 1 = male)
+# are converted by dataset_gender.
+# Usage: python cohort.py [--model model1.pkl] [--data Cardio_cleaned.csv]   (builds the cache, prints the strata)
+import os
+import csv
+import json
+import bisect
+import hashlib
+import argparse
+import threading
+import weakref
+import itertools
+import numpy as np
+from scoring import FEATURES, score_batch
+from dataset import DATA_CACHE_DIR, file_hash
+from validation import COMPILED
+
+COHORT_DATA = os.environ.get("COHORT_DATA", "Cardio_cleaned.csv")
+COHORT_CACHE_DIR = os.environ.get("COHORT_CACHE_DIR", DATA_CACHE_DIR)
+# Bump when the cache layout changes so old files are rebuilt
+COHORT_FORMAT = 2
+# Lower edges of the age bands after the first: under 40, 40-44, ..., 60 and over
+AGE_BAND_EDGES = (40, 45, 50, 55, 60)
+# Gender strata smaller than this fall back to the whole age band
+MIN_STRATUM_SIZE = 50
+# Risk histogram bins over 0-100 %
+HIST_BINS = 20
+QUANTILES = (10, 25, 50, 75, 90)
+# Cohort rows scored to fingerprint the model (see model_fingerprint)
+FINGERPRINT_ROWS = 256
+# Dataset gender codes; the lookup has one column per code up to the largest (column 0 is unused
+# and, like any unknown code, maps to the whole age band)
+DATASET_GENDERS = (1, 2)
+ALL_GENDERS = -1
+GENDER_NAMES = {1: 'female', 2: 'male', ALL_GENDERS: 'all'}
+# Form code -> dataset code. 2 only occurs in the dataset coding, where it is male.
+FORM_TO_DATASET = (1, 2, 2)
+GENDER_CODINGS = ('form', 'dataset')
+
+def dataset_gender(gender, coding='form'):
+    # Gender code(s) as the cohort stores them, for a scalar (returns an int) or an array.
+    # coding: 'form' (0 = female, 1 = male, as /predict posts it) or 'dataset' (1 = female, 2 = male)
+    if coding not in GENDER_CODINGS:
+        raise ValueError(f"Unknown gender coding '{coding}' (expected one of: {', '.join(GENDER_CODINGS)}).")
+    if np.ndim(gender):
+        genders = np.asarray(gender, dtype=int)
+        return np.take(FORM_TO_DATASET, genders) if coding == 'form' else genders
+    return FORM_TO_DATASET[int(gender)] if coding == 'form' else int(gender)
+
+def band_label(band):
+    if band == 0:
+        return f"under {AGE_BAND_EDGES[0]}"
+    if band == len(AGE_BAND_EDGES):
+        return f"{AGE_BAND_EDGES[-1]} and over"
+    return f"{AGE_BAND_EDGES[band - 1]}-{AGE_BAND_EDGES[band] - 1}"
+
+def age_bands(ages):
+    return np.searchsorted(AGE_BAND_EDGES, np.asarray(ages, dtype=float), side='right')
+
+class CohortStats:
+    def __init__(self, arrays, meta):
+        # arrays: the .npz contents (see build); meta: data/model fingerprints and sizes
+        self.meta = meta
+        self.keys = arrays['keys']
+        self.offsets = arrays['offsets']
+        self.band = arrays['band']
+        self.gender = arrays['gender']
+        self.mean = arrays['mean']
+        self.prevalence = arrays['prevalence']
+        self.histograms = arrays['histograms']
+        self.quantiles = arrays['quantiles']
+        # (band, gender code) -> stratum id
+        self.lookup = arrays['lookup']
+        self.sizes = np.diff(self.offsets)
+        self._summary = None
+
+    @classmethod
+    def build(cls, model, columns, meta):
+        # columns: {name: array} in the dataset coding (read_columns). Rows the app would reject
+        # (e.g. ap_lo 1100) are not anyone's peers.
+        X = np.column_stack([np.asarray(columns[f], dtype=float) for f in FEATURES])
+        valid = COMPILED.valid_rows(X)
+        X = X[valid]
+        _, probabilities, _ = score_batch(model, X)
+        bands = age_bands(X[:, FEATURES.index('Age_Year')])
+        genders = X[:, FEATURES.index('gender')].astype(int)
+        outcome = np.asarray(columns['cardio'], dtype=float)[valid] if 'cardio' in columns else np.full(len(X), np.nan)
+
+        strata = []
+        for band in range(len(AGE_BAND_EDGES) + 1):
+            in_band = bands == band
+            for gender in sorted(set(genders[in_band].tolist())):
+                strata.append((band, gender, in_band & (genders == gender)))
+            strata.append((band, ALL_GENDERS, in_band))
+
+        keys, offsets, band_ids, gender_ids, means, prevalence, histograms, quantiles = [], [0], [], [], [], [], [], []
+        edges = np.linspace(0, 1, HIST_BINS + 1)
+        for sid, (band, gender, rows) in enumerate(strata):
+            scores = np.sort(probabilities[rows])
+            keys.append(sid * 2 + scores)
+            offsets.append(offsets[-1] + len(scores))
+            band_ids.append(band)
+            gender_ids.append(gender)
+            means.append(scores.mean() if len(scores) else np.nan)
+            prevalence.append(outcome[rows].mean() if len(scores) else np.nan)
+            histograms.append(np.histogram(scores, bins=edges)[0])
+            quantiles.append(np.percentile(scores, QUANTILES) if len(scores) else np.full(len(QUANTILES), np.nan))
+
+        # Every dataset gender code gets a stratum: its own when large enough, else the whole band
+        lookup = np.empty((len(AGE_BAND_EDGES) + 1, max(DATASET_GENDERS) + 1), dtype=np.intp)
+        index = {(band, gender): sid for sid, (band, gender, _) in enumerate(strata)}
+        sizes = np.diff(offsets)
+        for band in range(len(AGE_BAND_EDGES) + 1):
+            for code in range(lookup.shape[1]):
+                sid = index.get((band, code))
+                lookup[band, code] = sid if sid is not None and sizes[sid] >= MIN_STRATUM_SIZE else index[(band, ALL_GENDERS)]
+
+        arrays = {
+            'keys': np.concatenate(keys), 'offsets': np.array(offsets, dtype=np.intp),
+            'band': np.array(band_ids), 'gender': np.array(gender_ids),
+            'mean': np.array(means), 'prevalence': np.array(prevalence),
+            'histograms': np.array(histograms), 'quantiles': np.array(quantiles), 'lookup': lookup
+        }
+        return cls(arrays, dict(meta, rows=len(X), dropped=int((~valid).sum()), strata=len(strata)))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        return cls(arrays, json.loads(str(arrays.pop('meta'))))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f, keys=self.keys, offsets=self.offsets, band=self.band, gender=self.gender,
+                mean=self.mean, prevalence=self.prevalence, histograms=self.histograms,
+                quantiles=self.quantiles, lookup=self.lookup, meta=np.array(json.dumps(self.meta))
+            )
+        os.replace(tmp_path, path)
+
+    def strata_of(self, ages, genders, coding='form'):
+        return self.lookup[age_bands(ages), dataset_gender(genders, coding)]
+
+    def percentiles(self, probabilities, ages, genders, coding='form'):
+        # Mid-rank percentile (ties count half) of each probability (0-1) within its stratum:
+        # (stratum ids, percentiles 0-100)
+        sid = self.strata_of(ages, genders, coding)
+        keys = sid * 2 + np.asarray(probabilities, dtype=float)
+        below = np.searchsorted(self.keys, keys, side='left') - self.offsets[sid]
+        at_or_below = np.searchsorted(self.keys, keys, side='right') - self.offsets[sid]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sid, (below + at_or_below) / 2 / self.sizes[sid] * 100
+
+    def stratum(self, sid):
+        return {
+            'age_band': band_label(int(self.band[sid])),
+            'gender': GENDER_NAMES[int(self.gender[sid])],
+            'size': int(self.sizes[sid]),
+            'mean_probability': float(self.mean[sid]) * 100,
+            'prevalence': float(self.prevalence[sid]) * 100
+        }
+
+    def compare(self, probability, age, gender, coding='form'):
+        # One patient against their peers; probability in 0-100 as /predict reports it. Scalar
+        # version of percentiles(): two binary searches, no temporary arrays.
+        sid = int(self.lookup[bisect.bisect_right(AGE_BAND_EDGES, age), dataset_gender(gender, coding)])
+        size = int(self.sizes[sid])
+        key = sid * 2 + probability / 100
+        start = int(self.offsets[sid])
+        below = int(self.keys.searchsorted(key, side='left')) - start
+        at_or_below = int(self.keys.searchsorted(key, side='right')) - start
+        percentile = round((below + at_or_below) / 2 / size * 100, 1) if size else None
+        return dict(self.stratum(sid), percentile=percentile)
+
+    def summary(self):
+        # Every stratum with its distribution; built once, the arrays never change
+        if self._summary is None:
+            self._summary = {
+                'rows': self.meta['rows'],
+                'dropped': self.meta['dropped'],
+                'source': self.meta['source'],
+                'histogram_bins': np.linspace(0, 100, HIST_BINS + 1).tolist(),
+                'strata': [
+                    dict(
+                        self.stratum(sid),
+                        quantiles={f"p{q}": float(v) * 100 for q, v in zip(QUANTILES, self.quantiles[sid])},
+                        histogram=self.histograms[sid].tolist()
+                    )
+                    for sid in range(len(self.sizes))
+                ]
+            }
+        return self._summary
+
+def read_columns(path, rows=None):
+    # {name: float array} of FEATURES (+ cardio when present) from a raw (;) or cleaned (,) CSV,
+    # optionally only its first rows. Age_Year is derived from age in days when missing, as
+    # cleaning.py does; unparsable cells become NaN and fail validation in build.
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = f.readline()
+        delimiter = ';' if header.count(';') > header.count(',') else ','
+        names = next(csv.reader([header], delimiter=delimiter))
+        wanted = FEATURES + ['cardio', 'age']
+        present = [name for name in wanted if name in names]
+        missing = [f for f in FEATURES if f not in names and not (f == 'Age_Year' and 'age' in names)]
+        if missing:
+            raise ValueError(f"{os.path.basename(path)} has no column(s): {', '.join(missing)}")
+        positions = [names.index(name) for name in present]
+        cells = [[row[i] if i < len(row) else '' for i in positions]
+                 for row in itertools.islice(csv.reader(f, delimiter=delimiter), rows)]
+    try:
+        table = np.array(cells, dtype=float).reshape(len(cells), len(present))
+    except ValueError:
+        table = np.array([[_to_float(cell) for cell in row] for row in cells]).reshape(len(cells), len(present))
+    columns = {name: table[:, j] for j, name in enumerate(present)}
+    if 'Age_Year' not in columns:
+        columns['Age_Year'] = np.round(columns['age'] / 365)
+    return columns
+
+def _to_float(cell):
+    try:
+        return float(cell)
+    except ValueError:
+        return np.nan
+
+def model_fingerprint(model, columns):
+    # Hash of the model's scores on the first valid cohort rows: any retrained or swapped
+    # artifact scores them differently and gets its own cache file
+    X = np.column_stack([np.asarray(columns[f][:FINGERPRINT_ROWS], dtype=float) for f in FEATURES])
+    X = X[COMPILED.valid_rows(X)]
+    return hashlib.sha256(np.ascontiguousarray(score_batch(model, X)[1]).tobytes()).hexdigest()[:16]
+
+def load_or_build(model, data_path=COHORT_DATA, cache_dir=COHORT_CACHE_DIR):
+    # A cache hit reads only the first FINGERPRINT_ROWS rows of the CSV
+    digest = file_hash(data_path)
+    meta = {
+        'format': COHORT_FORMAT, 'source': os.path.basename(data_path), 'sha256': digest,
+        'model': model_fingerprint(model, read_columns(data_path, FINGERPRINT_ROWS)),
+        'age_band_edges': list(AGE_BAND_EDGES)
+    }
+    stem = os.path.splitext(os.path.basename(data_path))[0]
+    path = os.path.join(cache_dir, f"cohort-{stem}-{digest[:16]}-{meta['model']}.npz")
+    try:
+        stats = CohortStats.load(path)
+        if all(stats.meta.get(k) == v for k, v in meta.items()):
+            return stats
+    except (OSError, ValueError, KeyError):
+        pass
+    stats = CohortStats.build(model, read_columns(data_path), meta)
+    try:
+        stats.save(path)
+    except OSError as e:
+        print(f"Cohort cache not written: {e}")
+    return stats
+
+# Built once per model object, like the explainers; None when the cohort data is unavailable
+_cohorts = weakref.WeakKeyDictionary()
+_cohorts_lock = threading.Lock()
+
+def cohort_for(model):
+    try:
+        return _cohorts[model]
+    except KeyError:
+        pass
+    with _cohorts_lock:
+        if model not in _cohorts:
+            try:
+                _cohorts[model] = load_or_build(model)
+            except Exception as e:
+                print(f"Cohort statistics unavailable for {type(model).__name__}: {e}")
+                _cohorts[model] = None
+        return _cohorts[model]
+
+if __name__ == "__main__":
+    import time
+    import warnings
+    from model_registry import load_artifact
+
+    parser = argparse.ArgumentParser(description="Build the cohort percentile cache for a model and print its strata.")
+    parser.add_argument("--model", default="model1.pkl")
+    parser.add_argument("--data", default=COHORT_DATA)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    model = load_artifact(args.model)
+    started = time.perf_counter()
+    stats = load_or_build(model, args.data)
+    print(f"{stats.meta['rows']} rows in {stats.meta['strata']} strata, {stats.meta['dropped']} invalid rows left out "
+          f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+    for s in stats.summary()['strata']:
+        print(f"  {s['age_band']:>12s}  {s['gender']:>6s}  n={s['size']:6d}  "
+              f"mean {s['mean_probability']:5.1f}%  median {s['quantiles']['p50']:5.1f}%  prevalence {s['prevalence']:5.1f}%")
@@ -0,0 +1,132 @@
+# dataset.py
+# Columnar cache for the training CSVs. The first load of a CSV parses it once and stores every
+# column as its own .npy file with the narrowest dtype that holds it losslessly (the 0/1/2/3
+# categorical fields become int8). Later loads memory-map those files instead of parsing text.
+# A cache directory is tied to the SHA-256 of the source file, so editing the CSV rebuilds it.
+# Usage: python dataset.py cardio_train.csv [Cardio_cleaned.csv ...]   (builds/refreshes caches)
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+
+DATA_CACHE_DIR = os.environ.get("DATA_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data_cache"))
+# Bump when the on-disk layout changes so old caches are rebuilt
+CACHE_FORMAT = 1
+
+INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def narrow(values):
+    # Smallest integer dtype covering the column, or float32 when that round-trips exactly
+    values = np.asarray(values)
+    if values.dtype.kind in "iub" and len(values):
+        low, high = values.min(), values.max()
+        for dtype in INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return values.astype(dtype)
+    if values.dtype.kind == "f" and values.dtype != np.float32:
+        as32 = values.astype(np.float32)
+        if np.array_equal(as32.astype(values.dtype), values, equal_nan=True):
+            return as32
+    return values
+
+def _read_csv(path):
+    import pandas as pd
+    # Both the raw (;) and the cleaned (,) layouts are accepted
+    with open(path, encoding="utf-8-sig") as f:
+        header = f.readline()
+    sep = ';' if header.count(';') > header.count(',') else ','
+    return pd.read_csv(path, sep=sep)
+
+def _cache_dir(path, digest):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(DATA_CACHE_DIR, f"{stem}-{digest[:16]}")
+
+def build_cache(path, digest=None):
+    digest = digest or file_hash(path)
+    target = _cache_dir(path, digest)
+    frame = _read_csv(path)
+
+    os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columns = []
+    for name in frame.columns:
+        values = narrow(frame[name].to_numpy())
+        np.save(os.path.join(tmp, f"{name}.npy"), values, allow_pickle=False)
+        columns.append({'name': name, 'dtype': values.dtype.str})
+    meta = {'format': CACHE_FORMAT, 'source': os.path.abspath(path), 'sha256': digest, 'rows': len(frame), 'columns': columns}
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    # The directory rename publishes the cache in one step; a concurrent builder may have won
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    # Caches of earlier versions of the same file are no longer reachable
+    stem = os.path.basename(target).rsplit("-", 1)[0]
+    for entry in os.listdir(DATA_CACHE_DIR):
+        if entry != os.path.basename(target) and re.fullmatch(re.escape(stem) + r"-[0-9a-f]{16}", entry):
+            shutil.rmtree(os.path.join(DATA_CACHE_DIR, entry), ignore_errors=True)
+    return target
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('format') == CACHE_FORMAT else None
+
+def load_columns(path):
+    # Returns {column: read-only memory-mapped array}, building the cache if needed
+    digest = file_hash(path)
+    cache_dir = _cache_dir(path, digest)
+    meta = _read_meta(cache_dir)
+    if meta is None or meta.get('sha256') != digest:
+        cache_dir = build_cache(path, digest)
+        meta = _read_meta(cache_dir)
+    return {
+        col['name']: np.load(os.path.join(cache_dir, f"{col['name']}.npy"), mmap_mode='r')
+        for col in meta['columns']
+    }
+
+def load_frame(path, columns=None):
+    # pandas view of the cache for code that expects a DataFrame (same values as read_csv,
+    # narrower dtypes). Only the requested columns are touched.
+    import pandas as pd
+    arrays = load_columns(path)
+    names = columns or list(arrays)
+    return pd.DataFrame({name: np.asarray(arrays[name]) for name in names})
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or ["cardio_train.csv", "Cardio_cleaned.csv"]:
+        started = time.perf_counter()
+        _read_csv(path)
+        parse_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        arrays = load_columns(path)
+        first_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        arrays = load_columns(path)
+        warm_ms = (time.perf_counter() - started) * 1000
+
+        size = sum(a.nbytes for a in arrays.values())
+        dtypes = ", ".join(f"{name}:{a.dtype}" for name, a in arrays.items())
+        print(f"{path}: {len(next(iter(arrays.values())))} rows, {size / 1e6:.1f} MB cached ({dtypes})")
+        print(f"  CSV parse {parse_ms:.0f} ms, first load {first_ms:.0f} ms, cached load {warm_ms:.1f} ms")
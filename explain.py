@@ -0,0 +1,272 @@
+# explain.py
+# Per-prediction feature attribution: how far each of the 11 inputs pushed a patient's risk up or
+# down, relative to the average training patient. Linear models (model1.pkl) use the closed form
+# coef * (x - mean) in log-odds, with the training-split feature means cached in FEATURE_MEANS.
+# Tree models (decision tree, random forest, gradient boosting) use Saabas-style path attribution:
+# every split on a row's decision path credits its feature with the change in node value. The
+# summed credits of each leaf's path are precomputed into one (leaves x features) table when the
+# model loads; a batch then walks all trees at once (one NumPy step per tree level) and gathers
+# the table rows of the leaves it reached. In both cases base_value
+# plus the contributions adds up exactly to the model's output (log-odds or probability, see `space`).
+# Usage: python explain.py [--data Cardio_cleaned.csv] [--out feature_means.json]   (rebuilds the means)
+import os
+import json
+import argparse
+import threading
+import weakref
+import numpy as np
+from scoring import FEATURES, FEATURE_DEFAULTS, CompiledLinearModel, ProbabilityTable
+from validation import SCHEMA
+
+FEATURE_MEANS = os.environ.get("FEATURE_MEANS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "feature_means.json"))
+# Data the means are rebuilt from when FEATURE_MEANS is missing
+MEANS_DATA = "Cardio_cleaned.csv"
+LABELS = {field.name: field.label for field in SCHEMA}
+
+# --- Training means ---
+
+def training_means(X_train):
+    # X_train: DataFrame of the training split (train.split), FEATURES columns
+    return {f: float(np.mean(np.asarray(X_train[f], dtype=float))) for f in FEATURES}
+
+def write_feature_means(path, X_train, source=None):
+    record = {'source': source, 'rows': len(X_train), 'means': training_means(X_train)}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return record['means']
+
+def build_feature_means(data_path=MEANS_DATA, path=FEATURE_MEANS):
+    # Same hold-out split as train.py, so the reference patient is the one the models were fitted on
+    from dataset import load_frame
+    from train import TARGET, split
+    X_train = split(load_frame(data_path, FEATURES + [TARGET]))[0]
+    return write_feature_means(path, X_train, os.path.basename(data_path))
+
+_means = None
+_means_lock = threading.Lock()
+
+def feature_means():
+    # Read once per process; rebuilt from MEANS_DATA when the file is missing, and the form
+    # defaults as a last resort
+    global _means
+    if _means is None:
+        with _means_lock:
+            if _means is None:
+                try:
+                    with open(FEATURE_MEANS, encoding="utf-8") as f:
+                        means = json.load(f)['means']
+                except (OSError, ValueError, KeyError):
+                    try:
+                        means = build_feature_means()
+                    except Exception as e:
+                        print(f"Feature means unavailable, explaining against the form defaults: {e}")
+                        means = dict(FEATURE_DEFAULTS)
+                _means = np.array([float(means[f]) for f in FEATURES])
+    return _means
+
+# --- Explainers ---
+
+class LinearExplainer:
+    method = 'linear'
+    space = 'log_odds'
+
+    def __init__(self, coef, intercept, means):
+        self.coef = np.asarray(coef, dtype=float)
+        self.means = np.asarray(means, dtype=float)
+        # Log-odds of the mean training patient
+        self.base_value = float(intercept + self.coef @ self.means)
+        self._coef_list = self.coef.tolist()
+        self._means_list = self.means.tolist()
+
+    def explain_one(self, features):
+        # Plain Python floats, like CompiledLinearModel.proba_one
+        return [c * (x - m) for c, x, m in zip(self._coef_list, features, self._means_list)]
+
+    def explain_batch(self, X):
+        return (np.asarray(X, dtype=float) - self.means) * self.coef
+
+class TreeExplainer:
+    method = 'tree_path'
+    # Batches walk the packed trees only up to this depth (boosting); single rows always do
+    WALK_MAX_DEPTH = 8
+
+    def __init__(self, trees, scale, base_offset, space, positive=1):
+        # trees: sklearn Tree objects; scale: weight of each tree's output in the model's output
+        # (1/n_trees for a forest, the learning rate for boosting); base_offset: the part of the
+        # output that no tree explains (boosting's initial log-odds)
+        self.space = space
+        # All trees packed into flat node arrays, so every tree is walked at once. Leaves point
+        # to themselves and always "go left", which lets a row that reached its leaf stay there.
+        left, right, feature, threshold, leaf_rows, tables, roots = [], [], [], [], [], [], []
+        base = base_offset
+        offset = 0
+        n_leaves = 0
+        self.depth = 0
+        self.trees = list(trees)
+        for tree in self.trees:
+            values = tree.value[:, 0, :]
+            if values.shape[1] > 1:
+                # Classifier nodes hold (weighted) class counts or fractions
+                node_value = values[:, positive] / values.sum(axis=1)
+            else:
+                node_value = values[:, 0]
+            node_value = node_value * scale
+            base += float(node_value[0])
+
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left < 0
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            rows = np.full(tree.node_count, -1, dtype=np.intp)
+            rows[is_leaf] = n_leaves + np.arange(is_leaf.sum())
+            leaf_rows.append(rows)
+            tables.append(_path_credits(tree, node_value)[is_leaf])
+            roots.append(offset)
+            offset += tree.node_count
+            n_leaves += int(is_leaf.sum())
+            self.depth = max(self.depth, tree.max_depth)
+
+        self.left = np.concatenate(left)
+        self.right = np.concatenate(right)
+        self.feature = np.concatenate(feature)
+        self.threshold = np.concatenate(threshold)
+        self.leaf_rows = np.concatenate(leaf_rows)
+        self.roots = np.array(roots, dtype=np.intp)
+        # Summed path credits of every leaf: (leaves, n_features)
+        self.table = np.concatenate(tables)
+        self.base_value = base
+        # Rows per chunk, so the (rows, trees, features) gather stays around 8 MB
+        self.chunk = max(1, (1 << 20) // (len(roots) * len(FEATURES)))
+
+    def leaves(self, X):
+        # (rows, trees) leaf node ids; compares float32 inputs like sklearn's apply()
+        X = np.asarray(X, dtype=np.float32).astype(float)
+        nodes = np.tile(self.roots, (len(X), 1))
+        row = np.arange(len(X))[:, None]
+        for _ in range(self.depth):
+            go_left = X[row, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def explain_batch(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if len(X) > 1 and self.depth > self.WALK_MAX_DEPTH:
+            # Deep forests on batches: sklearn's apply() tree by tree beats one NumPy step per level
+            X32 = np.ascontiguousarray(X, dtype=np.float32)
+            contributions = np.zeros((len(X), len(FEATURES)))
+            for tree, root in zip(self.trees, self.roots):
+                contributions += self.table[self.leaf_rows[tree.apply(X32) + root]]
+            return contributions
+        contributions = np.empty((len(X), len(FEATURES)))
+        for start in range(0, len(X), self.chunk):
+            rows = self.leaf_rows[self.leaves(X[start:start + self.chunk])]
+            contributions[start:start + self.chunk] = self.table[rows].sum(axis=1)
+        return contributions
+
+    def explain_one(self, features):
+        return self.explain_batch(np.asarray([features], dtype=float))[0].tolist()
+
+def _path_credits(tree, node_value):
+    # (node_count, n_features): summed credits of every split from the root down to each node,
+    # filled one depth level at a time
+    credits = np.zeros((tree.node_count, len(FEATURES)))
+    frontier = np.array([0])
+    while len(frontier):
+        frontier = frontier[tree.children_left[frontier] >= 0]
+        parents = np.concatenate([frontier, frontier])
+        children = np.concatenate([tree.children_left[frontier], tree.children_right[frontier]])
+        credits[children] = credits[parents]
+        credits[children, tree.feature[parents]] += node_value[children] - node_value[parents]
+        frontier = children
+    return credits
+
+def make_explainer(model):
+    # Explainer for a served model (as load_artifact returns it), or None for families without an
+    # attribution method here (SVC, k-NN, naive Bayes)
+    if isinstance(model, ProbabilityTable):
+        model = model.model
+    if isinstance(model, CompiledLinearModel):
+        return LinearExplainer(model.coef, model.intercept, feature_means())
+    if getattr(model, 'n_features_in_', None) != len(FEATURES) or len(getattr(model, 'classes_', ())) != 2:
+        return None
+
+    kind = type(model).__name__
+    if kind == 'LogisticRegression':
+        return LinearExplainer(model.coef_[0], model.intercept_[0], feature_means())
+    if kind == 'DecisionTreeClassifier':
+        return TreeExplainer([model.tree_], 1.0, 0.0, 'probability')
+    if kind in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+        trees = [est.tree_ for est in model.estimators_]
+        return TreeExplainer(trees, 1.0 / len(trees), 0.0, 'probability')
+    if kind == 'GradientBoostingClassifier' and model.estimators_.shape[1] == 1:
+        trees = [est.tree_ for est in model.estimators_[:, 0]]
+        # The initial estimate is whatever the trees do not account for on any row
+        probe = np.array([[FEATURE_DEFAULTS[f] for f in FEATURES]], dtype=float)
+        probe32 = probe.astype(np.float32)
+        tree_sum = sum(float(t.value[t.apply(probe32)[0], 0, 0]) for t in trees) * model.learning_rate
+        return TreeExplainer(trees, model.learning_rate, float(model.decision_function(probe)[0]) - tree_sum, 'log_odds')
+    return None
+
+# Built once per model object; a hot-swapped model gets its own and the old one goes with it
+_explainers = weakref.WeakKeyDictionary()
+_explainers_lock = threading.Lock()
+
+def explainer_for(model):
+    try:
+        return _explainers[model]
+    except KeyError:
+        pass
+    with _explainers_lock:
+        if model not in _explainers:
+            try:
+                _explainers[model] = make_explainer(model)
+            except Exception as e:
+                print(f"Explanations disabled for {type(model).__name__}: {e}")
+                _explainers[model] = None
+        return _explainers[model]
+
+# --- Output ---
+
+def describe(explainer, features, contributions):
+    # One row's explanation, largest effect first
+    order = sorted(range(len(FEATURES)), key=lambda j: -abs(contributions[j]))
+    return {
+        'method': explainer.method,
+        'space': explainer.space,
+        'base_value': explainer.base_value,
+        'contributions': [
+            {'feature': FEATURES[j], 'label': LABELS[FEATURES[j]], 'value': features[j], 'contribution': contributions[j]}
+            for j in order
+        ]
+    }
+
+def explain_one(model, features):
+    # Explanation dict for one validated row, or None when the model has no explainer
+    explainer = explainer_for(model)
+    if explainer is None:
+        return None
+    return describe(explainer, features, explainer.explain_one(features))
+
+def explain_batch(model, X):
+    # (explainer, contributions matrix aligned with FEATURES), or (None, None)
+    explainer = explainer_for(model)
+    if explainer is None:
+        return None, None
+    return explainer, explainer.explain_batch(X)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the training-split feature means used by linear explanations.")
+    parser.add_argument("--data", default=MEANS_DATA)
+    parser.add_argument("--out", default=FEATURE_MEANS)
+    args = parser.parse_args()
+    means = build_feature_means(args.data, args.out)
+    for f in FEATURES:
+        print(f"  {f:12s} {means[f]:10.4f}")
+    print(f"Wrote {args.out}")
@@ -0,0 +1,31 @@
+# gunicorn.conf.py
+# Picked up automatically by `gunicorn app:app`. With preload_app the app module, and with it
+# everything listed in WARMUP (see app.py), is loaded once in the master before workers fork,
+# so the model and the Heart Passport layout are shared copy-on-write instead of per worker.
+# Workers share /metrics through per-process snapshot files in METRICS_DIR (see metrics.py), and
+# /predict result tokens through RESULT_CACHE_DIR (see result_cache.py).
+import os
+import gc
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+preload_app = os.environ.get("PRELOAD_APP", "1") == "1"
+
+# Set before the app is imported, so every worker flushes its metrics to the same place
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"cardio-metrics-{os.environ.get('PORT', 5000)}"))
+os.environ.setdefault("RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), f"cardio-results-{os.environ.get('PORT', 5000)}"))
+
+def on_starting(server):
+    # Snapshots left by a previous run would be summed into this one's totals
+    from metrics import clear_snapshots
+    clear_snapshots(os.environ["METRICS_DIR"])
+
+def when_ready(server):
+    # Runs after the preloaded app is imported and before the first fork. Moving everything
+    # allocated so far out of the collector's reach keeps GC passes in the workers from
+    # writing to (and so un-sharing) the pages inherited from the master.
+    if preload_app:
+        gc.freeze()
@@ -0,0 +1,204 @@
+# health_metrics.py
+# Rule-based heart age, BMI and the 7-day Heart Reboot plan shared by the web app and bulk export.
+import json
+import numpy as np
+
+def calculate_heart_age(chronological_age, systolic, diastolic, weight, height, cholesterol, gluc, smoke, active):
+    heart_age = chronological_age
+    
+    # BP Impact
+    if systolic >= 140 or diastolic >= 90:
+        heart_age += 7
+    elif systolic >= 130 or diastolic >= 85:
+        heart_age += 3
+    elif systolic < 120 and diastolic < 80:
+        heart_age -= 1
+        
+    # Smoking Impact
+    if smoke == 1:
+        heart_age += 5
+        
+    # BMI Impact
+    bmi = weight / ((height / 100) ** 2)
+    if bmi >= 30:
+        heart_age += 6
+    elif bmi >= 25:
+        heart_age += 2
+        
+    # Cholesterol & Glucose
+    if cholesterol > 1:
+        heart_age += 2
+    if gluc > 1:
+        heart_age += 2
+        
+    # Activity
+    if active == 0:
+        heart_age += 3
+    else:
+        heart_age -= 1
+        
+    return round(max(chronological_age - 5, min(heart_age, 100)))
+
+def calculate_bmi(weight, height):
+    # Works on scalars and NumPy arrays alike
+    return weight / ((height / 100) ** 2)
+
+def calculate_heart_age_batch(chronological_age, systolic, diastolic, weight, height, cholesterol, gluc, smoke, active):
+    # Array version of calculate_heart_age: same rules, one pass over the whole batch
+    chronological_age = np.asarray(chronological_age, dtype=float)
+    systolic = np.asarray(systolic, dtype=float)
+    diastolic = np.asarray(diastolic, dtype=float)
+
+    heart_age = chronological_age.copy()
+
+    # BP Impact
+    heart_age += np.select(
+        [(systolic >= 140) | (diastolic >= 90),
+         (systolic >= 130) | (diastolic >= 85),
+         (systolic < 120) & (diastolic < 80)],
+        [7, 3, -1], default=0
+    )
+
+    # Smoking Impact
+    heart_age += np.where(np.asarray(smoke) == 1, 5, 0)
+
+    # BMI Impact
+    bmi = calculate_bmi(np.asarray(weight, dtype=float), np.asarray(height, dtype=float))
+    heart_age += np.select([bmi >= 30, bmi >= 25], [6, 2], default=0)
+
+    # Cholesterol & Glucose
+    heart_age += np.where(np.asarray(cholesterol) > 1, 2, 0)
+    heart_age += np.where(np.asarray(gluc) > 1, 2, 0)
+
+    # Activity
+    heart_age += np.where(np.asarray(active) == 0, 3, -1)
+
+    return np.round(np.maximum(chronological_age - 5, np.minimum(heart_age, 100))).astype(int)
+
+# --- 7-Day Heart Reboot Plan ---
+# A plan depends only on four risk flags, so all 16 variants (per locale) are built once at import
+# and shared: each as a tuple of frozen day dicts, as a pre-serialized JSON array for splicing into
+# responses, and (in reports.py) as pre-laid-out PDF table rows. A request computes the 4-bit key
+# and looks the variant up.
+
+PLAN_BP_HIGH = 1
+PLAN_SMOKER = 2
+PLAN_INACTIVE = 4
+PLAN_OBESE = 8
+PLAN_VARIANTS = 16
+
+# Every user-facing string of the plan, per locale. Adding a locale here adds its 16 variants at
+# startup; nothing changes on the request path.
+PLAN_TEXT = {
+    'en': {
+        'days': ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"),
+        'vital_bp': "Measure BP (Resting)",
+        'vital_obese': "Record Morning Weight",
+        'vital_default': "Record Resting Heart Rate",
+        # (active, inactive)
+        'base_activity': ("15-min light walk", "5-min stretching"),
+        'high_activity': ("30-min brisk walk", "15-min modified walk"),
+        # (high BP, otherwise)
+        'monday_diet': ("Cut salt intake by 50%", "Start 2L water goal"),
+        'tuesday_activity': ("Isometric wall-sit (30s)", "Light yoga/stretching"),
+        # Thursday to Sunday
+        'activities': ("Deep breathing (5 mins)", "Bodyweight squats (10 reps)", "Long nature walk (45 min)", "Rest & Mobility work"),
+        # Tuesday to Sunday
+        'diets': ("Zero processed sugar today", "Add leafy greens to lunch", "Intermittent fasting (12h gap)",
+                  "Replace caffeine with herbal tea", "Try a DASH-diet recipe", "Meal prep for next week"),
+        # Appended on Monday, Wednesday, Friday and Sunday for smokers
+        'smoker_activity': " + Lung capacity breaths",
+        'smoker_diet': " (Nicotine-free window: 4h)",
+    },
+}
+DEFAULT_PLAN_LOCALE = 'en'
+
+def reboot_plan_key(data):
+    # 4-bit variant key from a form, a validated feature dict or a CSV record
+    ap_hi = float(data.get('ap_hi', 120))
+    ap_lo = float(data.get('ap_lo', 80))
+    weight = float(data.get('weight', 70))
+    height = float(data.get('height', 170))
+    key = PLAN_BP_HIGH if ap_hi >= 140 or ap_lo >= 90 else 0
+    if int(float(data.get('smoke', 0))) == 1:
+        key |= PLAN_SMOKER
+    if int(float(data.get('active', 1))) == 0:
+        key |= PLAN_INACTIVE
+    if weight / ((height / 100) ** 2) >= 30:
+        key |= PLAN_OBESE
+    return key
+
+def reboot_plan_keys(ap_hi, ap_lo, smoke, active, weight, height):
+    # Vectorized reboot_plan_key for whole cohorts (NumPy arrays in, int array out)
+    bmi = calculate_bmi(np.asarray(weight, dtype=float), np.asarray(height, dtype=float))
+    return (
+        ((np.asarray(ap_hi) >= 140) | (np.asarray(ap_lo) >= 90)) * PLAN_BP_HIGH
+        + (np.asarray(smoke) == 1) * PLAN_SMOKER
+        + (np.asarray(active) == 0) * PLAN_INACTIVE
+        + (bmi >= 30) * PLAN_OBESE
+    ).astype(int)
+
+class PlanDay(dict):
+    # One day of a shared plan variant: a dict that refuses changes, so no caller can alter the
+    # plan of every later patient. (types.MappingProxyType cannot be pickled, and assessments
+    # travel to the report and bulk-export process pools.)
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Reboot plan days are shared between requests and cannot be changed.")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (PlanDay, (dict(self),))
+
+def build_reboot_plan(key, text):
+    # The plan for one variant key; run only while building the variant tables
+    bp_high = bool(key & PLAN_BP_HIGH)
+    smoker = bool(key & PLAN_SMOKER)
+    inactive = bool(key & PLAN_INACTIVE)
+    obese = bool(key & PLAN_OBESE)
+
+    if bp_high:
+        vital = text['vital_bp']
+    elif obese:
+        vital = text['vital_obese']
+    else:
+        vital = text['vital_default']
+    pick = lambda pair, flag: pair[0] if flag else pair[1]
+    activities = (
+        pick(text['base_activity'], not inactive),
+        pick(text['tuesday_activity'], bp_high),
+        pick(text['high_activity'], not inactive),
+    ) + text['activities']
+    diets = (pick(text['monday_diet'], bp_high),) + text['diets']
+
+    plan = []
+    for i, (day, activity, diet) in enumerate(zip(text['days'], activities, diets)):
+        if smoker and i % 2 == 0:
+            activity += text['smoker_activity']
+            diet += text['smoker_diet']
+        plan.append(PlanDay(day=day, vital=vital, activity=activity, diet=diet))
+    return tuple(plan)
+
+# (locale, key) -> tuple of frozen days, and the same plan as a JSON array string
+PLAN_VARIANTS_BY_KEY = {
+    (locale, key): build_reboot_plan(key, text)
+    for locale, text in PLAN_TEXT.items() for key in range(PLAN_VARIANTS)
+}
+PLAN_JSON_BY_KEY = {
+    variant: json.dumps(plan, separators=(',', ':')) for variant, plan in PLAN_VARIANTS_BY_KEY.items()
+}
+
+def plan_locale(locale):
+    return locale if locale in PLAN_TEXT else DEFAULT_PLAN_LOCALE
+
+def reboot_plan(key, locale=DEFAULT_PLAN_LOCALE):
+    # Shared variant; its days raise TypeError on any change
+    return PLAN_VARIANTS_BY_KEY[(plan_locale(locale), key)]
+
+def reboot_plan_json(key, locale=DEFAULT_PLAN_LOCALE):
+    return PLAN_JSON_BY_KEY[(plan_locale(locale), key)]
+
+def generate_heart_reboot_plan(data, prediction, locale=DEFAULT_PLAN_LOCALE):
+    # The plan does not depend on the prediction; the argument is kept for existing callers
+    return reboot_plan(reboot_plan_key(data), locale)
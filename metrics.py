@@ -0,0 +1,202 @@
+# metrics.py
+# In-process counters and latency histograms, exposed in the Prometheus text format on /metrics.
+# Recording is a dict lookup, a bisect over fixed buckets and a few additions under one lock, so
+# it stays in the low microseconds per request.
+# Under gunicorn every worker is its own process with its own numbers. When METRICS_DIR is set,
+# each process writes a snapshot of its metrics to METRICS_DIR/<pid>.json at most every
+# METRICS_FLUSH_INTERVAL seconds (atomic replace), and /metrics sums the snapshots of every
+# process with the live numbers of the one answering. Snapshots of exited workers are kept so
+# totals never go backwards; gunicorn.conf.py clears the directory when the server starts.
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 1))
+
+# Upper bounds in seconds; sized for a ~50 us model call up to multi-second bulk exports
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metrics:
+    def __init__(self, metrics_dir=None, flush_interval=1.0, buckets=LATENCY_BUCKETS):
+        self.metrics_dir = metrics_dir
+        self.flush_interval = flush_interval
+        self.buckets = tuple(buckets)
+        self.help = {}
+        # name -> {label tuple: value}
+        self.counters = {}
+        # name -> {label tuple: [bucket counts..., +Inf count, sum]}
+        self.histograms = {}
+        # Callables returning [(name, help, labels dict, value)] read at snapshot time, for
+        # counters kept elsewhere (e.g. the probability table's hits and misses)
+        self.collectors = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._next_flush = 0.0
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, labels=(), amount=1):
+        # labels: tuple of (key, value) pairs in a fixed order
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name, seconds, labels=()):
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            values = series.get(labels)
+            if values is None:
+                values = series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            values[slot] += 1
+            values[-1] += seconds
+
+    @contextmanager
+    def timed(self, stage):
+        # Times a block as one stage of request handling
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('cardio_stage_seconds', time.perf_counter() - started, (('stage', stage),))
+
+    def add_collector(self, fn):
+        self.collectors.append(fn)
+
+    # --- Snapshots ---
+
+    def snapshot(self):
+        # Plain-JSON copy: {"counters": {name: [[labels, value], ...]}, "histograms": {...}}
+        with self._lock:
+            counters = {name: [[list(map(list, k)), v] for k, v in series.items()] for name, series in self.counters.items()}
+            histograms = {name: [[list(map(list, k)), list(v)] for k, v in series.items()] for name, series in self.histograms.items()}
+        for collect in self.collectors:
+            try:
+                samples = collect()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, text, labels, value in samples:
+                self.help.setdefault(name, text)
+                counters.setdefault(name, []).append([sorted(labels.items()), value])
+        return {'buckets': list(self.buckets), 'counters': counters, 'histograms': histograms}
+
+    def maybe_flush(self):
+        # Called after each request; only one thread writes, and at most every flush_interval
+        if not self.metrics_dir or time.monotonic() < self._next_flush:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_flush = time.monotonic() + self.flush_interval
+            self.flush()
+        finally:
+            self._flush_lock.release()
+
+    def flush(self):
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        path = os.path.join(self.metrics_dir, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Metrics snapshot not written: {e}")
+
+    def _snapshots(self):
+        # This process live, every other process from its last snapshot file
+        own = self.snapshot()
+        yield own
+        if not self.metrics_dir or not os.path.isdir(self.metrics_dir):
+            return
+        own_file = f"{os.getpid()}.json"
+        for entry in os.listdir(self.metrics_dir):
+            if not entry.endswith(".json") or entry == own_file:
+                continue
+            try:
+                with open(os.path.join(self.metrics_dir, entry), encoding="utf-8") as f:
+                    snap = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snap.get('buckets') == own['buckets']:
+                yield snap
+
+    # --- Exposition ---
+
+    def render(self):
+        # Prometheus text format (version 0.0.4), summed over all processes
+        counters = {}
+        histograms = {}
+        for snap in self._snapshots():
+            for name, series in snap['counters'].items():
+                merged = counters.setdefault(name, {})
+                for labels, value in series:
+                    key = tuple(map(tuple, labels))
+                    merged[key] = merged.get(key, 0) + value
+            for name, series in snap['histograms'].items():
+                merged = histograms.setdefault(name, {})
+                for labels, values in series:
+                    key = tuple(map(tuple, labels))
+                    if key in merged:
+                        merged[key] = [a + b for a, b in zip(merged[key], values)]
+                    else:
+                        merged[key] = list(values)
+
+        lines = []
+        for name in sorted(counters):
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        for name in sorted(histograms):
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, values in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(bounds, values[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(values[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def clear_snapshots(metrics_dir):
+    # For a fresh server start; see gunicorn.conf.py
+    if not metrics_dir or not os.path.isdir(metrics_dir):
+        return
+    for entry in os.listdir(metrics_dir):
+        if entry.endswith((".json", ".tmp")):
+            try:
+                os.remove(os.path.join(metrics_dir, entry))
+            except OSError:
+                pass
+
+METRICS = Metrics(METRICS_DIR, METRICS_FLUSH_INTERVAL)
+METRICS.describe('cardio_http_requests_total', "HTTP requests by route, method and status.")
+METRICS.describe('cardio_http_request_seconds', "Request latency by route (time until the response is returned).")
+METRICS.describe('cardio_http_errors_total', "Requests answered with a 4xx/5xx status or an unhandled exception.")
+METRICS.describe('cardio_stage_seconds', "Time spent per request-handling stage.")
+METRICS.describe('cardio_model_calls_total', "Inference calls by model and kind (single row or batch).")
+METRICS.describe('cardio_model_rows_total', "Rows scored by model.")
+METRICS.describe('cardio_report_assessments_total', "Report assessments taken from the /predict result cache or scored again.")
+METRICS.describe('cardio_pdf_reports_total', "Heart Passport PDFs produced by route.")
+METRICS.describe('cardio_profiles_captured_total', "Requests profiled with cProfile (see profiling.py).")
+METRICS.describe('cardio_pdf_bytes_total', "Bytes of Heart Passport PDF (or ZIP) output by route.")
@@ -0,0 +1,232 @@
+# model_registry.py
+# Serves several versioned model artifacts side by side. models.json lists them; requests pick
+# one by name or, without a name, by A/B weight. Changed artifacts (or a changed manifest) are
+# loaded and warmed up (the `warm` hook: explainer, cohort statistics) in a background thread and
+# only then swapped in as a new immutable snapshot. Requests keep being served from the previous
+# snapshot meanwhile, and requests already holding the previous model finish on it undisturbed.
+import os
+import json
+import time
+import pickle
+import random
+import threading
+from scoring import CompiledLinearModel, ProbabilityTable, compile_model
+
+def load_artifact(path, fast_path=True, proba_table=False, table_size=4096):
+    # joblib first, pickle as the fallback; then the same serving wrappers app.py always applied
+    import joblib
+    try:
+        model = joblib.load(path)
+    except Exception as e_joblib:
+        print(f"Joblib load failed for {path}: {e_joblib}. Trying pickle...")
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+
+    if fast_path:
+        model = compile_model(model)
+    if proba_table:
+        model = ProbabilityTable(model, table_size)
+    return model
+
+def _file_version(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+class ModelEntry:
+    # One loaded artifact plus its request counters. Entries are never mutated after loading
+    # except for the counters, which carry over when the artifact itself is unchanged.
+    def __init__(self, name, path, version="", weight=0.0, model=None, file_version=None, error=None):
+        self.name = name
+        self.path = path
+        self.version = version
+        self.weight = weight
+        self.model = model
+        self.file_version = file_version
+        self.error = error
+        self.loaded_at = time.time()
+        self.requests = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        # Inference time of one request (a whole batch counts as one)
+        with self._lock:
+            self.requests += 1
+            self.total_seconds += seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+
+    def stats(self):
+        model = self.model
+        if isinstance(model, ProbabilityTable):
+            model = model.model
+        estimator = model.estimator if isinstance(model, CompiledLinearModel) else model
+        return {
+            'version': self.version,
+            'path': self.path,
+            'weight': self.weight,
+            'estimator': type(estimator).__name__ if estimator is not None else None,
+            'fast_path': isinstance(model, CompiledLinearModel),
+            'probability_table': self.model.stats() if isinstance(self.model, ProbabilityTable) else None,
+            'error': self.error,
+            'loaded_at': self.loaded_at,
+            'requests': self.requests,
+            'mean_ms': self.total_seconds / self.requests * 1000 if self.requests else 0.0,
+            'max_ms': self.max_seconds * 1000
+        }
+
+class ModelRegistry:
+    def __init__(self, manifest_path, default_path="model1.pkl", check_interval=5.0, warm=None, **load_options):
+        # warm: called with every newly loaded model before it is swapped in
+        self.manifest_path = manifest_path
+        self.default_path = default_path
+        self.check_interval = check_interval
+        self.warm = warm
+        self.load_options = load_options
+        self.reloads = 0
+        # (entries by name, default name, routable names, cumulative weights, manifest version)
+        self._snapshot = ({}, None, [], [], None)
+        self._reload_lock = threading.Lock()
+        # A reload thread running in the gunicorn master at fork time does not exist in the
+        # workers; they must not inherit its lock held
+        os.register_at_fork(after_in_child=self._reset_reload_lock)
+        with self._reload_lock:
+            self._reload()
+        self._next_check = time.monotonic() + self.check_interval
+
+    def _reset_reload_lock(self):
+        self._reload_lock = threading.Lock()
+
+    def _read_manifest(self):
+        # Without a manifest the registry serves the single default artifact
+        if not os.path.exists(self.manifest_path):
+            name = os.path.splitext(os.path.basename(self.default_path))[0]
+            return {'default': name, 'models': [{'name': name, 'path': self.default_path, 'weight': 1}]}, None
+        version = _file_version(self.manifest_path)
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f), version
+
+    def _load_entry(self, spec, previous):
+        # Artifact paths are relative to the manifest
+        path = os.path.join(os.path.dirname(self.manifest_path), spec['path'])
+        weight = float(spec.get('weight', 0))
+        version = str(spec.get('version', ''))
+        try:
+            file_version = _file_version(path)
+        except OSError as e:
+            print(f"Model '{spec['name']}': {e}")
+            if previous is not None and previous.model is not None:
+                return previous
+            return ModelEntry(spec['name'], path, version, weight, error=str(e))
+
+        if previous is not None and previous.file_version == file_version and previous.path == path:
+            if previous.weight == weight and previous.version == version:
+                return previous
+            # Only the routing metadata changed: same model object, counters carried over
+            entry = ModelEntry(spec['name'], path, version, weight, previous.model, file_version, previous.error)
+            entry.loaded_at = previous.loaded_at
+            entry.requests, entry.total_seconds, entry.max_seconds = (
+                previous.requests, previous.total_seconds, previous.max_seconds
+            )
+            return entry
+
+        try:
+            model = load_artifact(path, **self.load_options)
+        except Exception as e:
+            print(f"Failed to load model '{spec['name']}' from {path}: {e}")
+            # Keep serving the last good version of this model, if there is one
+            if previous is not None and previous.model is not None:
+                return previous
+            return ModelEntry(spec['name'], path, version, weight, file_version=file_version, error=str(e))
+        if self.warm is not None:
+            try:
+                self.warm(model)
+            except Exception as e:
+                print(f"Warm-up of model '{spec['name']}' failed, it will finish on first use: {e}")
+        print(f"Model '{spec['name']}' loaded from {path} ({type(model).__name__}).")
+        return ModelEntry(spec['name'], path, version, weight, model, file_version)
+
+    def _reload(self):
+        entries, _, _, _, manifest_version = self._snapshot
+        try:
+            manifest, new_manifest_version = self._read_manifest()
+            specs = manifest.get('models', [])
+            if not specs:
+                raise ValueError("manifest lists no models")
+            if any(not spec.get('name') or not spec.get('path') for spec in specs):
+                raise ValueError("every model needs a name and a path")
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Model manifest not reloaded, keeping previous version: {e}")
+            return
+
+        new_entries = {}
+        for spec in specs:
+            new_entries[spec['name']] = self._load_entry(spec, entries.get(spec['name']))
+
+        unchanged = new_manifest_version == manifest_version and all(
+            new_entries[name] is entries.get(name) for name in new_entries
+        )
+        if unchanged and entries:
+            return
+
+        default = manifest.get('default') or specs[0]['name']
+        routable = [e for e in new_entries.values() if e.model is not None and e.weight > 0]
+        names, cumulative, total = [], [], 0.0
+        for entry in routable:
+            total += entry.weight
+            names.append(entry.name)
+            cumulative.append(total)
+        # Replacing the tuple is the swap: readers see either the old or the new snapshot
+        self._snapshot = (new_entries, default, names, cumulative, new_manifest_version)
+        if entries:
+            self.reloads += 1
+            print(f"Model registry reloaded: {', '.join(new_entries)}")
+
+    def maybe_reload(self):
+        # Starts at most one background check; the request (and every other) keeps serving the
+        # current snapshot. Returns the reload thread when one was started.
+        now = time.monotonic()
+        if now < self._next_check:
+            return None
+        lock = self._reload_lock
+        if not lock.acquire(blocking=False):
+            return None
+        self._next_check = now + self.check_interval
+        try:
+            thread = threading.Thread(target=self._background_reload, args=(lock,), name="model-reload", daemon=True)
+            thread.start()
+        except RuntimeError:
+            lock.release()
+            raise
+        return thread
+
+    def _background_reload(self, lock):
+        try:
+            self._reload()
+        except Exception as e:
+            print(f"Model registry reload failed, keeping previous version: {e}")
+        finally:
+            lock.release()
+
+    def select(self, name=None):
+        # Returns the entry to serve: the named model, else an A/B draw by weight, else the default.
+        # Raises KeyError for an unknown name.
+        self.maybe_reload()
+        entries, default, names, cumulative, _ = self._snapshot
+        if name:
+            return entries[name]
+        if names:
+            return entries[random.choices(names, cum_weights=cumulative)[0]]
+        return entries.get(default)
+
+    def names(self):
+        return list(self._snapshot[0])
+
+    def stats(self):
+        entries, default, names, cumulative, _ = self._snapshot
+        return {
+            'default': default,
+            'reloads': self.reloads,
+            'models': {name: entry.stats() for name, entry in entries.items()}
+        }
@@ -0,0 +1,145 @@
+# profiling.py
+# Opt-in cProfile capture of individual production requests. A request is profiled when it
+# carries the PROFILE_HEADER with the PROFILE_TOKEN value, or at random with probability
+# PROFILE_SAMPLE_RATE. Only one request per process is profiled at a time, so the cost stays
+# bounded under load; the rest run untouched. Finished profiles go into a ring buffer of the
+# last PROFILE_BUFFER_SIZE captures, from which /profiles serves the slowest ones as .prof files
+# (pstats / snakeviz format) with a plain-text summary alongside.
+import io
+import os
+import time
+import hmac
+import uuid
+import random
+import marshal
+import pstats
+import cProfile
+import zipfile
+import threading
+from collections import deque
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_HEADER = os.environ.get("PROFILE_HEADER", "X-Profile")
+# Required in PROFILE_HEADER to profile on demand, and to download profiles. Without a token the
+# header is ignored, only sampling captures anything and the captures cannot be downloaded.
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_BUFFER_SIZE = int(os.environ.get("PROFILE_BUFFER_SIZE", 50))
+# Lines of the text summary, sorted by cumulative time
+PROFILE_SUMMARY_LINES = 40
+
+class RequestProfiler:
+    def __init__(self, sample_rate=0.0, token="", buffer_size=50):
+        self.sample_rate = sample_rate
+        self.token = token
+        self.profiles = deque(maxlen=buffer_size)
+        self.captured = 0
+        self.skipped_busy = 0
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+
+    def authorized(self, header_value):
+        # Profiles expose code paths and request data: without a token nobody may download them
+        if not self.token:
+            return False
+        return bool(header_value) and hmac.compare_digest(header_value, self.token)
+
+    def wanted(self, header_value):
+        if self.token and header_value and hmac.compare_digest(header_value, self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, header_value=None):
+        # Returns a running profiler, or None when this request is not profiled
+        if not self.wanted(header_value):
+            return None
+        if not self._busy.acquire(blocking=False):
+            self.skipped_busy += 1
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) owns the hook
+            self._busy.release()
+            return None
+        profile.started = time.perf_counter()
+        return profile
+
+    def stop(self, profile, route, method, status):
+        profile.disable()
+        seconds = time.perf_counter() - profile.started
+        self._busy.release()
+        profile.create_stats()
+        record = {
+            'id': uuid.uuid4().hex[:12],
+            'route': route,
+            'method': method,
+            'status': status,
+            'seconds': seconds,
+            'captured_at': time.time(),
+            'pid': os.getpid(),
+            # Same bytes pstats writes with dump_stats, so the file opens in any pstats viewer
+            'stats': marshal.dumps(profile.stats)
+        }
+        with self._lock:
+            self.profiles.append(record)
+            self.captured += 1
+        return record
+
+    def slowest(self, n=10):
+        with self._lock:
+            records = list(self.profiles)
+        return sorted(records, key=lambda r: r['seconds'], reverse=True)[:n]
+
+    def get(self, profile_id):
+        with self._lock:
+            for record in self.profiles:
+                if record['id'] == profile_id:
+                    return record
+        return None
+
+    def index(self, n=10):
+        return {
+            'captured': self.captured,
+            'skipped_busy': self.skipped_busy,
+            'buffered': len(self.profiles),
+            'sample_rate': self.sample_rate,
+            'pid': os.getpid(),
+            'profiles': [
+                {k: v for k, v in r.items() if k != 'stats'} | {'ms': round(r['seconds'] * 1000, 3)}
+                for r in self.slowest(n)
+            ]
+        }
+
+def summary(record, lines=PROFILE_SUMMARY_LINES):
+    # Text report of one profile: header plus the top functions by cumulative time
+    out = io.StringIO()
+    out.write(f"{record['method']} {record['route']} -> {record['status']} in {record['seconds'] * 1000:.1f} ms "
+              f"(pid {record['pid']}, {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['captured_at']))})\n\n")
+    stats = pstats.Stats(_StatsSource(record['stats']), stream=out)
+    stats.sort_stats('cumulative').print_stats(lines)
+    return out.getvalue()
+
+class _StatsSource:
+    # pstats.Stats accepts any object with create_stats() and a .stats dict
+    def __init__(self, data):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
+
+def filename(record):
+    route = record['route'].strip('/').replace('/', '_').replace('<', '').replace('>', '') or 'root'
+    return f"{int(record['seconds'] * 1000):06d}ms_{route}_{record['id']}"
+
+def slowest_zip(records):
+    # One .prof and one .txt per profile, slowest first
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for record in records:
+            name = filename(record)
+            archive.writestr(f"{name}.prof", record['stats'])
+            archive.writestr(f"{name}.txt", summary(record))
+    return buffer.getvalue()
+
+PROFILER = RequestProfiler(PROFILE_SAMPLE_RATE, PROFILE_TOKEN, PROFILE_BUFFER_SIZE)
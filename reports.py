@@ -0,0 +1,645 @@
+# reports.py
+# Heart Passport PDF rendering and the background job queue behind /reports.
+import os
+import re
+import time
+import uuid
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from health_metrics import PLAN_VARIANTS_BY_KEY
+
+# Render from the per-process HeartPassportTemplate (set to 0 for the plain fpdf2 layout)
+REPORT_TEMPLATE_CACHE = os.environ.get("REPORT_TEMPLATE_CACHE", "1") == "1"
+
+# Static copy shared by both renderers
+HIGH_RISK_PRIORITIES = "- Priority 1: Consult a cardiologist to discuss preventative medication.\n- Priority 2: Adopt a DASH diet and reduce daily salt below 1,500mg.\n- Priority 3: Begin daily aerobic activity (light walking) to 'de-age' your heart."
+LOW_RISK_TIPS = "- Focus on longevity through strength training and high-fiber intake.\n- Avoid any new tobacco exposure which could accelerate heart aging by 5-10 years."
+DISCLAIMER = "DISCLAIMER: This report is AI-generated for educational purposes only. It is not a clinical diagnosis."
+PRO_TIP = "Pro Tip: Consistency is better than intensity. Start small, stay steady."
+PLAN_HEADER = ("Day", "Morning Vital", "Activity Goal", "Dietary Focus")
+PLAN_COL_WIDTHS = (25, 40, 60, 65)
+LEVEL_LABELS = ["Normal", "Above Normal", "High"]
+# Strongest factors listed in the "What drives your risk" section (explain.py)
+RISK_DRIVER_ROWS = 5
+RISK_DRIVERS_INTRO = "Compared with the average patient the model was trained on, these factors moved your risk estimate the most."
+
+# Job ids are uuid4 hex strings; anything else is rejected before touching the filesystem
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+class ReportQueueFull(Exception):
+    pass
+
+def _new_pdf():
+    # fpdf2 pulls in fontTools and PIL (~0.35 s), so it is imported on the first render rather
+    # than with this module; app.py decides whether that happens during warm-up
+    from fpdf import FPDF
+    return FPDF()
+
+def report_filename(patient_name):
+    safe_name = patient_name.replace(" ", "_").lower()
+    return f"{safe_name}_Heart_Passport_{datetime.now().strftime('%Y%m%d')}.pdf"
+
+def driver_value(feature, value):
+    if feature in ('cholesterol', 'gluc'):
+        return LEVEL_LABELS[int(value) - 1]
+    if feature in ('smoke', 'alco', 'active'):
+        return "Yes" if value else "No"
+    if feature == 'Age_Year':
+        return f"{int(value)} yrs"
+    return f"{value:g}"
+
+def risk_driver_rows(explanation, n=RISK_DRIVER_ROWS):
+    # (label, value text, size relative to the strongest factor, raises risk) for the top factors
+    top = [c for c in explanation['contributions'] if c['contribution'] != 0][:n]
+    if not top:
+        return []
+    largest = abs(top[0]['contribution'])
+    return [
+        (c['label'], driver_value(c['feature'], c['value']), abs(c['contribution']) / largest, c['contribution'] > 0)
+        for c in top
+    ]
+
+def draw_risk_drivers(pdf, explanation):
+    # Section [3], shared by both renderers: one row per factor with a bar scaled to the strongest
+    rows = risk_driver_rows(explanation) if explanation else []
+    if not rows:
+        return
+    pdf.ln(4)
+    pdf.set_fill_color(243, 244, 246)
+    pdf.set_font("Helvetica", 'B', 14)
+    pdf.set_text_color(31, 41, 55)
+    pdf.cell(0, 12, " [3] WHAT DRIVES YOUR RISK", new_x="LMARGIN", new_y="NEXT", fill=True)
+    pdf.set_font("Helvetica", '', 9)
+    pdf.set_text_color(75, 85, 99)
+    pdf.cell(0, 8, RISK_DRIVERS_INTRO, new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", '', 10)
+    for label, value, share, raises in rows:
+        color = (220, 38, 38) if raises else (16, 185, 129)
+        pdf.set_text_color(31, 41, 55)
+        pdf.cell(50, 8, f" {label}")
+        pdf.cell(30, 8, value)
+        x, y = pdf.get_x(), pdf.get_y()
+        pdf.set_fill_color(*color)
+        pdf.rect(x, y + 2, max(1.0, 70 * share), 4, style='F')
+        pdf.set_x(x + 75)
+        pdf.set_text_color(*color)
+        pdf.cell(0, 8, "Raises risk" if raises else "Lowers risk", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_text_color(31, 41, 55)
+
+def render_heart_passport_uncached(assessment):
+    # Reference layout: builds the two-page Heart Passport with fpdf2's own line breaking and
+    # table engine on every call. Kept as the fallback for REPORT_TEMPLATE_CACHE=0.
+    patient_name = assessment['patient_name']
+    age = assessment['age']
+    ap_hi = assessment['ap_hi']
+    ap_lo = assessment['ap_lo']
+    weight = assessment['weight']
+    height = assessment['height']
+    chol = assessment['chol']
+    gluc = assessment['gluc']
+    prediction = assessment['prediction']
+    probability = assessment['probability']
+    heart_age = assessment['heart_age']
+    bmi = assessment['bmi']
+    reboot_plan = assessment['reboot_plan']
+
+    pdf = _new_pdf()
+    pdf.add_page()
+    
+    # --- Page 1: Clinical Summary ---
+    pdf.set_font("Helvetica", 'B', 24)
+    pdf.set_text_color(37, 99, 235)
+    pdf.cell(0, 20, "Global Heart Passport", ln=True, align='C')
+    
+    pdf.set_font("Helvetica", '', 10)
+    pdf.set_text_color(107, 114, 128)
+    pdf.cell(0, 10, f"Issued on: {datetime.now().strftime('%B %d, %Y')} | CardioCare AI Diagnostic", ln=True, align='C')
+    
+    pdf.ln(10)
+
+    # Patient Info Header
+    pdf.set_fill_color(248, 250, 252)
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.set_text_color(51, 65, 85)
+    pdf.cell(0, 12, f" PATIENT NAME: {patient_name.upper()}", border=0, ln=True, fill=True)
+    pdf.ln(2)
+    
+    # Risk Summary Header
+    pdf.set_fill_color(243, 244, 246)
+    pdf.set_font("Helvetica", 'B', 14)
+    pdf.set_text_color(31, 41, 55)
+    pdf.cell(0, 12, " [1] CLINICAL RISK ASSESSMENT SUMMARY", ln=True, fill=True)
+    pdf.ln(5)
+    
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.cell(45, 10, "Chronological Age :")
+    pdf.cell(15, 10, f"{int(age)}")
+    pdf.cell(45, 10, "  Functional Heart Age : ")
+    
+    age_diff = heart_age - age
+    if age_diff > 0:
+        pdf.set_text_color(220, 38, 38)
+        age_text = f"{heart_age} Yrs (+{int(age_diff)})"
+    elif age_diff < 0:
+        pdf.set_text_color(16, 185, 129)
+        age_text = f"{heart_age} Yrs ({int(age_diff)})"
+    else:
+        pdf.set_text_color(37, 99, 235)
+        age_text = f"{heart_age} Yrs (Optimal)"
+        
+    pdf.cell(0, 10, age_text, ln=True)
+    pdf.set_text_color(31, 41, 55)
+    
+    risk_status = "HIGH RISK" if prediction == 1 else "LOW RISK"
+    status_color = (220, 38, 38) if prediction == 1 else (16, 185, 129)
+    
+    pdf.cell(45, 10, "Risk Status : ")
+    pdf.set_text_color(*status_color)
+    pdf.cell(40, 10, risk_status)
+    pdf.set_text_color(31, 41, 55)
+    pdf.cell(30, 10, "   Probability : ")
+    pdf.cell(0, 10, f"{probability:.2f}%", ln=True)
+    
+    pdf.ln(5)
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.cell(0, 10, f"Vital Parameters for {patient_name}:", ln=True)
+    pdf.set_font("Helvetica", '', 10)
+    
+    def add_row(label, value, unit=""):
+        pdf.set_fill_color(252, 252, 252)
+        pdf.cell(60, 8, f" {label}", border=1, fill=True)
+        pdf.cell(0, 8, f" {value} {unit}", border=1, ln=True)
+
+    add_row("Height", height, "cm")
+    add_row("Weight", weight, "kg")
+    add_row("BMI", f"{bmi:.2f}", "kg/m2")
+    add_row("Blood Pressure", f"{ap_hi}/{ap_lo}", "mmHg")
+    add_row("Cholesterol", LEVEL_LABELS[chol-1])
+    add_row("Glucose", LEVEL_LABELS[gluc-1])
+    
+    pdf.ln(10)
+    pdf.set_fill_color(243, 244, 246)
+    pdf.set_font("Helvetica", 'B', 14)
+    pdf.cell(0, 12, " [1] AI-DRIVEN PERSONALIZED HEALTH ADVICE", ln=True, fill=True)
+    pdf.ln(5)
+    
+    pdf.set_font("Helvetica", '', 10)
+    if prediction == 1 or age_diff > 5:
+        pdf.set_text_color(185, 28, 28)
+        pdf.multi_cell(0, 7, f"CRITICAL INSIGHT for {patient_name}: Your Heart Age is {heart_age}, which is {int(age_diff) if age_diff > 0 else 'significantly'} years older than your actual age. This indicates rapid cardiovascular aging.")
+        pdf.set_text_color(31, 41, 55)
+        pdf.ln(2)
+        pdf.multi_cell(0, 7, HIGH_RISK_PRIORITIES)
+    else:
+        pdf.set_text_color(15, 118, 110)
+        pdf.multi_cell(0, 7, f"HEALTH OPTIMIZATION for {patient_name}: Your heart is aging at a healthy rate. Maintaining current status is key.")
+        pdf.set_text_color(31, 41, 55)
+        pdf.ln(2)
+        pdf.multi_cell(0, 7, LOW_RISK_TIPS)
+
+    pdf.ln(10)
+    pdf.set_font("Helvetica", 'I', 8)
+    pdf.set_text_color(107, 114, 128)
+    pdf.multi_cell(0, 5, DISCLAIMER)
+
+    # --- Page 2: 7-Day Heart Reboot Blueprint ---
+    pdf.add_page()
+    pdf.set_font("Helvetica", 'B', 20)
+    pdf.set_text_color(37, 99, 235)
+    pdf.cell(0, 15, " [2] 7-DAY HEART REBOOT BLUEPRINT", ln=True, align='L')
+    pdf.set_font("Helvetica", '', 10)
+    pdf.set_text_color(75, 85, 99)
+    pdf.multi_cell(0, 6, f"Tailored action plan for {patient_name} based on current clinical risk profile. Follow these daily steps to optimize cardiovascular performance.")
+    pdf.ln(5)
+
+    # Using fpdf2 table feature for perfect alignment
+    table_data = [PLAN_HEADER]
+    for day in reboot_plan:
+        table_data.append((
+            day['day'],
+            day['vital'],
+            day['activity'],
+            day['diet']
+        ))
+
+    with pdf.table(
+        borders_layout="SINGLE_TOP_LINE",
+        cell_fill_color=(250, 250, 252),
+        cell_fill_mode="ROWS",
+        line_height=8,
+        text_align=("LEFT", "LEFT", "LEFT", "LEFT"),
+        width=190,
+        col_widths=PLAN_COL_WIDTHS
+    ) as table:
+        for i, row in enumerate(table_data):
+            row_cells = table.row()
+            if i == 0:
+                pdf.set_font("Helvetica", 'B', 10)
+                pdf.set_text_color(255, 255, 255)
+                pdf.set_fill_color(37, 99, 235)
+            else:
+                pdf.set_font("Helvetica", '', 9)
+                pdf.set_text_color(31, 41, 55)
+                pdf.set_fill_color(250, 250, 252) if i % 2 == 0 else pdf.set_fill_color(255, 255, 255)
+                
+            for cell_text in row:
+                row_cells.cell(cell_text)
+
+    pdf.ln(10)
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.set_text_color(15, 118, 110)
+    pdf.cell(0, 10, PRO_TIP, ln=True)
+    draw_risk_drivers(pdf, assessment.get('explanation'))
+
+    # In fpdf2, output() returns bytearray by default
+    return bytes(pdf.output())
+
+class HeartPassportTemplate:
+    # Per-process cache of everything in the Heart Passport that does not depend on the patient.
+    # Static paragraphs are wrapped once, reboot-plan table rows are laid out once per distinct
+    # row, and word widths are memoized, so a request only places pre-measured text with cheap
+    # fpdf primitives instead of running multi_cell / pdf.table line breaking every time.
+    LINE_HEIGHT = 8  # reboot-plan table line height (mm)
+    MAX_MEMO = 10000
+
+    def __init__(self):
+        self._measure_pdf = _new_pdf()
+        self._measure_pdf.add_page()
+        self.c_margin = self._measure_pdf.c_margin
+        self.epw = self._measure_pdf.epw
+        self._measure_lock = threading.Lock()
+        self._widths = {}
+        self._rows = {}
+
+        body = ("Helvetica", '', 10)
+        self.high_risk_lines = self.wrap(HIGH_RISK_PRIORITIES, body, self.epw)
+        self.low_risk_lines = self.wrap(LOW_RISK_TIPS, body, self.epw)
+        self.disclaimer_lines = self.wrap(DISCLAIMER, ("Helvetica", 'I', 8), self.epw)
+        self.header_row = self.table_row(PLAN_HEADER, ("Helvetica", 'B', 10))
+        # Row layouts of every reboot-plan variant, keyed like PLAN_VARIANTS_BY_KEY: (locale, key)
+        self.plan_rows = {variant: self.plan_table(plan) for variant, plan in PLAN_VARIANTS_BY_KEY.items()}
+
+    def width(self, font, text):
+        key = (font, text)
+        w = self._widths.get(key)
+        if w is None:
+            if len(self._widths) > self.MAX_MEMO:
+                self._widths.clear()
+            with self._measure_lock:
+                self._measure_pdf.set_font(*font)
+                w = self._widths[key] = self._measure_pdf.get_string_width(text)
+        return w
+
+    def wrap(self, text, font, cell_width):
+        # Greedy word wrap matching multi_cell: returns (line, justify) pairs, where the last
+        # line of every paragraph is left-aligned
+        max_width = cell_width - 2 * self.c_margin
+        space = self.width(font, " ")
+        lines = []
+        for paragraph in text.split("\n"):
+            words = paragraph.split(" ")
+            line, line_width = self.break_word(words[0], font, max_width, lines)
+            for word in words[1:]:
+                word_width = self.width(font, word)
+                if line_width + space + word_width <= max_width:
+                    line += " " + word
+                    line_width += space + word_width
+                else:
+                    lines.append((line, True))
+                    line, line_width = self.break_word(word, font, max_width, lines)
+            lines.append((line, False))
+        return tuple(lines)
+
+    def break_word(self, word, font, max_width, lines):
+        # A word wider than the line is cut at the last character that fits, like multi_cell
+        # does; the cut lines are left-aligned. Returns the remainder and its width.
+        word_width = self.width(font, word)
+        while word_width > max_width:
+            cut, cut_width = 0, 0.0
+            for ch in word:
+                ch_width = self.width(font, ch)
+                if cut and cut_width + ch_width > max_width:
+                    break
+                cut += 1
+                cut_width += ch_width
+            lines.append((word[:cut], False))
+            word = word[cut:]
+            word_width = self.width(font, word)
+        return word, word_width
+
+    def table_row(self, cells, font):
+        # Layout of one reboot-plan row: (row height, [(x offset, wrapped lines) per column])
+        key = (cells, font)
+        row = self._rows.get(key)
+        if row is None:
+            if len(self._rows) > self.MAX_MEMO:
+                self._rows.clear()
+            columns = []
+            x = 0
+            for text, col_width in zip(cells, PLAN_COL_WIDTHS):
+                columns.append((x, tuple(line for line, _ in self.wrap(text, font, col_width))))
+                x += col_width
+            height = max(len(lines) for _, lines in columns) * self.LINE_HEIGHT
+            row = self._rows[key] = (height, tuple(columns))
+        return row
+
+    def plan_table(self, plan):
+        font = ("Helvetica", '', 9)
+        return tuple(self.table_row((day['day'], day['vital'], day['activity'], day['diet']), font) for day in plan)
+
+    def draw_lines(self, pdf, lines, h, font):
+        # Equivalent of multi_cell(0, h, text) for pre-wrapped, justified lines, including its
+        # page breaks
+        x0 = pdf.l_margin + self.c_margin
+        max_width = self.epw - 2 * self.c_margin
+        for line, justify in lines:
+            if pdf.y + h > pdf.page_break_trigger:
+                pdf.add_page()
+            baseline = pdf.y + h / 2 + 0.3 * pdf.font_size
+            words = line.split(" ")
+            if justify and len(words) > 1:
+                # Each word keeps its space, as in multi_cell's word-spaced text
+                gap = (max_width - sum(self.width(font, w) for w in words)) / (len(words) - 1)
+                x = x0
+                for word in words[:-1]:
+                    pdf.text(x, baseline, word + " ")
+                    x += self.width(font, word) + gap
+                pdf.text(x, baseline, words[-1])
+            else:
+                pdf.text(x0, baseline, line)
+            pdf.set_y(pdf.y + h)
+
+    def draw_table_header(self, pdf):
+        pdf.set_font("Helvetica", 'B', 10)
+        pdf.set_text_color(255, 255, 255)
+        self.draw_table_row(pdf, self.header_row, (37, 99, 235))
+        pdf.line(pdf.l_margin, pdf.y, pdf.l_margin + sum(PLAN_COL_WIDTHS), pdf.y)
+        pdf.set_font("Helvetica", '', 9)
+        pdf.set_text_color(31, 41, 55)
+
+    def draw_table_row(self, pdf, row, fill_color):
+        height, columns = row
+        top = pdf.y
+        pdf.set_fill_color(*fill_color)
+        pdf.rect(pdf.l_margin, top, sum(PLAN_COL_WIDTHS), height, style='F')
+        for x, lines in columns:
+            y = top + (height - len(lines) * self.LINE_HEIGHT) / 2
+            for line in lines:
+                pdf.text(pdf.l_margin + x + self.c_margin, y + self.LINE_HEIGHT / 2 + 0.3 * pdf.font_size, line)
+                y += self.LINE_HEIGHT
+        pdf.set_y(top + height)
+
+    def render(self, assessment):
+        patient_name = assessment['patient_name']
+        age = assessment['age']
+        prediction = assessment['prediction']
+        heart_age = assessment['heart_age']
+        body = ("Helvetica", '', 10)
+
+        pdf = _new_pdf()
+        pdf.add_page()
+
+        # --- Page 1: Clinical Summary ---
+        pdf.set_font("Helvetica", 'B', 24)
+        pdf.set_text_color(37, 99, 235)
+        pdf.cell(0, 20, "Global Heart Passport", new_x="LMARGIN", new_y="NEXT", align='C')
+
+        pdf.set_font(*body)
+        pdf.set_text_color(107, 114, 128)
+        pdf.cell(0, 10, f"Issued on: {datetime.now().strftime('%B %d, %Y')} | CardioCare AI Diagnostic", new_x="LMARGIN", new_y="NEXT", align='C')
+        pdf.ln(10)
+
+        # Patient Info Header
+        pdf.set_fill_color(248, 250, 252)
+        pdf.set_font("Helvetica", 'B', 12)
+        pdf.set_text_color(51, 65, 85)
+        pdf.cell(0, 12, f" PATIENT NAME: {patient_name.upper()}", new_x="LMARGIN", new_y="NEXT", fill=True)
+        pdf.ln(2)
+
+        # Risk Summary Header
+        pdf.set_fill_color(243, 244, 246)
+        pdf.set_font("Helvetica", 'B', 14)
+        pdf.set_text_color(31, 41, 55)
+        pdf.cell(0, 12, " [1] CLINICAL RISK ASSESSMENT SUMMARY", new_x="LMARGIN", new_y="NEXT", fill=True)
+        pdf.ln(5)
+
+        pdf.set_font("Helvetica", 'B', 12)
+        pdf.cell(45, 10, "Chronological Age :")
+        pdf.cell(15, 10, f"{int(age)}")
+        pdf.cell(45, 10, "  Functional Heart Age : ")
+
+        age_diff = heart_age - age
+        if age_diff > 0:
+            pdf.set_text_color(220, 38, 38)
+            age_text = f"{heart_age} Yrs (+{int(age_diff)})"
+        elif age_diff < 0:
+            pdf.set_text_color(16, 185, 129)
+            age_text = f"{heart_age} Yrs ({int(age_diff)})"
+        else:
+            pdf.set_text_color(37, 99, 235)
+            age_text = f"{heart_age} Yrs (Optimal)"
+        pdf.cell(0, 10, age_text, new_x="LMARGIN", new_y="NEXT")
+        pdf.set_text_color(31, 41, 55)
+
+        pdf.cell(45, 10, "Risk Status : ")
+        pdf.set_text_color(*((220, 38, 38) if prediction == 1 else (16, 185, 129)))
+        pdf.cell(40, 10, "HIGH RISK" if prediction == 1 else "LOW RISK")
+        pdf.set_text_color(31, 41, 55)
+        pdf.cell(30, 10, "   Probability : ")
+        pdf.cell(0, 10, f"{assessment['probability']:.2f}%", new_x="LMARGIN", new_y="NEXT")
+
+        pdf.ln(5)
+        pdf.set_font("Helvetica", 'B', 12)
+        pdf.cell(0, 10, f"Vital Parameters for {patient_name}:", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font(*body)
+        pdf.set_fill_color(252, 252, 252)
+        for label, value in (
+            ("Height", f"{assessment['height']} cm"),
+            ("Weight", f"{assessment['weight']} kg"),
+            ("BMI", f"{assessment['bmi']:.2f} kg/m2"),
+            ("Blood Pressure", f"{assessment['ap_hi']}/{assessment['ap_lo']} mmHg"),
+            ("Cholesterol", f"{LEVEL_LABELS[assessment['chol'] - 1]} "),
+            ("Glucose", f"{LEVEL_LABELS[assessment['gluc'] - 1]} ")
+        ):
+            pdf.cell(60, 8, f" {label}", border=1, fill=True)
+            pdf.cell(0, 8, f" {value}", border=1, new_x="LMARGIN", new_y="NEXT")
+
+        pdf.ln(10)
+        pdf.set_fill_color(243, 244, 246)
+        pdf.set_font("Helvetica", 'B', 14)
+        pdf.cell(0, 12, " [1] AI-DRIVEN PERSONALIZED HEALTH ADVICE", new_x="LMARGIN", new_y="NEXT", fill=True)
+        pdf.ln(5)
+
+        pdf.set_font(*body)
+        if prediction == 1 or age_diff > 5:
+            pdf.set_text_color(185, 28, 28)
+            insight = f"CRITICAL INSIGHT for {patient_name}: Your Heart Age is {heart_age}, which is {int(age_diff) if age_diff > 0 else 'significantly'} years older than your actual age. This indicates rapid cardiovascular aging."
+            advice_lines = self.high_risk_lines
+        else:
+            pdf.set_text_color(15, 118, 110)
+            insight = f"HEALTH OPTIMIZATION for {patient_name}: Your heart is aging at a healthy rate. Maintaining current status is key."
+            advice_lines = self.low_risk_lines
+        self.draw_lines(pdf, self.wrap(insight, body, self.epw), 7, body)
+        pdf.set_text_color(31, 41, 55)
+        pdf.ln(2)
+        self.draw_lines(pdf, advice_lines, 7, body)
+
+        pdf.ln(10)
+        pdf.set_font("Helvetica", 'I', 8)
+        pdf.set_text_color(107, 114, 128)
+        self.draw_lines(pdf, self.disclaimer_lines, 5, ("Helvetica", 'I', 8))
+
+        # --- Page 2: 7-Day Heart Reboot Blueprint ---
+        pdf.add_page()
+        pdf.set_font("Helvetica", 'B', 20)
+        pdf.set_text_color(37, 99, 235)
+        pdf.cell(0, 15, " [2] 7-DAY HEART REBOOT BLUEPRINT", new_x="LMARGIN", new_y="NEXT", align='L')
+        pdf.set_font(*body)
+        pdf.set_text_color(75, 85, 99)
+        intro = f"Tailored action plan for {patient_name} based on current clinical risk profile. Follow these daily steps to optimize cardiovascular performance."
+        self.draw_lines(pdf, self.wrap(intro, body, self.epw), 6, body)
+        pdf.ln(5)
+
+        # Header row with the single rule underneath, then zebra-filled plan rows
+        self.draw_table_header(pdf)
+        # Precomputed variant when the assessment names one, else laid out from the plan itself
+        rows = self.plan_rows.get((assessment.get('locale'), assessment.get('reboot_plan_key')))
+        if rows is None:
+            rows = self.plan_table(assessment['reboot_plan'])
+        for i, row in enumerate(rows, start=1):
+            # A row that does not fit goes to the next page under a repeated header, as in pdf.table
+            if pdf.y + row[0] > pdf.page_break_trigger:
+                pdf.add_page()
+                self.draw_table_header(pdf)
+            self.draw_table_row(pdf, row, (250, 250, 252) if i % 2 == 0 else (255, 255, 255))
+
+        pdf.ln(10)
+        pdf.set_font("Helvetica", 'B', 11)
+        pdf.set_text_color(15, 118, 110)
+        pdf.cell(0, 10, PRO_TIP, new_x="LMARGIN", new_y="NEXT")
+        draw_risk_drivers(pdf, assessment.get('explanation'))
+
+        return bytes(pdf.output())
+
+_template = None
+_template_lock = threading.Lock()
+
+def render_heart_passport(assessment):
+    # Builds the two-page Heart Passport and returns the PDF bytes
+    global _template
+    if not REPORT_TEMPLATE_CACHE:
+        return render_heart_passport_uncached(assessment)
+    if _template is None:
+        # Concurrent first requests in a threaded worker build the template only once
+        with _template_lock:
+            if _template is None:
+                _template = HeartPassportTemplate()
+    return _template.render(assessment)
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class ReportJobQueue:
+    # Renders Heart Passports on a bounded worker pool so request threads return immediately.
+    # Job state lives in job_dir (<id>.name while pending, then <id>.pdf or <id>.err), so any
+    # gunicorn worker can answer GET /reports/<id>, not only the one that rendered it.
+    def __init__(self, workers=2, max_pending=16, executor="thread", ttl=600, job_dir=None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor_kind = executor
+        self.ttl = ttl
+        self.job_dir = job_dir or os.path.join(tempfile.gettempdir(), "cardio_reports")
+        os.makedirs(self.job_dir, exist_ok=True)
+
+        # The pool is created on first use so no threads/processes exist before a gunicorn fork
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.executor_kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report")
+            return self._executor
+
+    def _path(self, job_id, ext):
+        return os.path.join(self.job_dir, f"{job_id}.{ext}")
+
+    def submit(self, assessment):
+        # Backpressure: refuse new work instead of queueing without bound
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ReportQueueFull(f"Report queue is full ({self.max_pending} jobs pending). Try again shortly.")
+            self._pending += 1
+
+        try:
+            self._sweep()
+            job_id = uuid.uuid4().hex
+            _write_atomic(self._path(job_id, "name"), report_filename(assessment['patient_name']).encode("utf-8"))
+            future = self._get_executor().submit(render_heart_passport, assessment)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def _finish(self, job_id, future):
+        try:
+            error = future.exception()
+            if error is None:
+                _write_atomic(self._path(job_id, "pdf"), future.result())
+            else:
+                print(f"PDF GENERATION ERROR (job {job_id}): {error}")
+                _write_atomic(self._path(job_id, "err"), str(error).encode("utf-8"))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def status(self, job_id):
+        # Returns (status, payload): ('done', pdf path), ('failed', message), ('pending', None) or ('unknown', None)
+        if not JOB_ID_PATTERN.match(job_id):
+            return 'unknown', None
+        pdf_path = self._path(job_id, "pdf")
+        if os.path.exists(pdf_path):
+            return 'done', pdf_path
+        err_path = self._path(job_id, "err")
+        if os.path.exists(err_path):
+            with open(err_path, encoding="utf-8") as f:
+                return 'failed', f.read()
+        if os.path.exists(self._path(job_id, "name")):
+            return 'pending', None
+        return 'unknown', None
+
+    def filename(self, job_id):
+        try:
+            with open(self._path(job_id, "name"), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return f"{job_id}.pdf"
+
+    def pending(self):
+        return self._pending
+
+    def _sweep(self):
+        # Drops job files older than the TTL; runs at most once a minute
+        now = time.time()
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        for entry in os.scandir(self.job_dir):
+            try:
+                if now - entry.stat().st_mtime > self.ttl:
+                    os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,153 @@
+# result_cache.py
+# Short-lived server-side store of scored assessments. /predict puts its result here and hands
+# the client an opaque token; /generate_report (and POST /reports) render straight from the
+# cached assessment when the token comes back, instead of validating and scoring the form again.
+# Bounded in both size (oldest entry evicted first) and age (entries expire after ttl seconds).
+# With store_dir set (gunicorn.conf.py sets RESULT_CACHE_DIR), put also writes the assessment as
+# <token>.json there, so a token issued by one gunicorn worker is found by any other; the worker
+# that reads it keeps a copy in memory. JSON rather than pickle: the directory lives under /tmp.
+import os
+import re
+import json
+import time
+import secrets
+import threading
+from collections import OrderedDict
+
+# What secrets.token_urlsafe(16) produces; anything else never reaches the file system
+TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9_-]{22}$')
+
+class ResultCache:
+    def __init__(self, max_entries=1024, ttl=900, store_dir=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store_dir = store_dir
+        if store_dir:
+            os.makedirs(store_dir, mode=0o700, exist_ok=True)
+        # token -> (expires_at, assessment), oldest first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        # Hits served from another worker's file (also counted in hits)
+        self.shared_hits = 0
+        self._last_sweep = 0.0
+
+    def put(self, assessment):
+        token = secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            while len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+            self._entries[token] = (now + self.ttl, assessment)
+        if self.store_dir:
+            self._write(token, assessment)
+            self._sweep()
+        return token
+
+    def get(self, token):
+        # The cached assessment, or None when the token is unknown, evicted or expired
+        if not token:
+            return None
+        with self._lock:
+            item = self._entries.get(token)
+            if item is not None:
+                if item[0] < time.monotonic():
+                    del self._entries[token]
+                    self.expired += 1
+                    return None
+                self.hits += 1
+                return item[1]
+        shared = self._read(token)
+        with self._lock:
+            if shared is None:
+                self.misses += 1
+                return None
+            assessment, ttl_left = shared
+            if assessment is None:
+                # Expired, and already counted as such
+                return None
+            self.hits += 1
+            self.shared_hits += 1
+            now = time.monotonic()
+            self._expire(now)
+            while len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+            # Kept in this worker only until the file would have expired
+            self._entries[token] = (now + ttl_left, assessment)
+            return assessment
+
+    def _path(self, token):
+        return os.path.join(self.store_dir, f"{token}.json")
+
+    def _write(self, token, assessment):
+        # Written under a temporary name and renamed, so a reader never sees half a file
+        path = self._path(token)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(assessment, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            # The token still works on this worker
+            print(f"Result cache: could not share {token}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _read(self, token):
+        # (assessment, seconds left) from another worker's file, (None, 0) when that file has
+        # expired, or None when there is no such file
+        if not self.store_dir or not TOKEN_PATTERN.match(token):
+            return None
+        path = self._path(token)
+        try:
+            ttl_left = os.path.getmtime(path) + self.ttl - time.time()
+            if ttl_left <= 0:
+                os.remove(path)
+                with self._lock:
+                    self.expired += 1
+                return None, 0
+            with open(path) as f:
+                assessment = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return assessment, ttl_left
+
+    def _sweep(self):
+        # Drop files past their ttl, at most once a minute per worker
+        now = time.time()
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        try:
+            entries = list(os.scandir(self.store_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime + self.ttl < now:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _expire(self, now):
+        # Entries are in insertion order and (apart from ones read from store_dir, which keep the
+        # file's remaining time) share one ttl, so expired ones are at the front; get checks each
+        while self._entries:
+            expires_at, _ = next(iter(self._entries.values()))
+            if expires_at >= now:
+                break
+            self._entries.popitem(last=False)
+            self.expired += 1
+
+    def stats(self):
+        return {
+            'entries': len(self._entries), 'capacity': self.max_entries, 'ttl': self.ttl,
+            'hits': self.hits, 'misses': self.misses, 'expired': self.expired, 'evicted': self.evicted,
+            'shared_hits': self.shared_hits, 'shared': bool(self.store_dir)
+        }
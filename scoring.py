@@ -0,0 +1,245 @@
+# scoring.py
+# Shared scoring core used by the Flask routes and the Streamlit UI.
+# Inference runs once per call: labels are derived from predict_proba output
+# instead of calling model.predict and model.predict_proba back to back.
+import io
+import csv
+import math
+import operator
+import itertools
+import threading
+import warnings
+from collections import OrderedDict
+import numpy as np
+
+# Feature order expected by the model (see model.feature_names_in_)
+FEATURES = ['gender', 'height', 'weight', 'ap_hi', 'ap_lo', 'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'Age_Year']
+
+# Values used when a form field or CSV column is missing
+FEATURE_DEFAULTS = {
+    'gender': 0, 'height': 170, 'weight': 70, 'ap_hi': 120, 'ap_lo': 80,
+    'cholesterol': 1, 'gluc': 1, 'smoke': 0, 'alco': 0, 'active': 1, 'Age_Year': 45
+}
+
+# Probability of the positive class above which a row is labelled 1
+DECISION_THRESHOLD = 0.5
+
+def records_from_csv(text):
+    # Both the raw (;) and the cleaned (,) dataset layouts are accepted
+    if not text.strip():
+        return []
+    header = text.split('\n', 1)[0]
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    records = list(csv.DictReader(io.StringIO(text), delimiter=delimiter))
+    for rec in records:
+        # cardio_train.csv only carries age in days
+        if not rec.get('Age_Year') and rec.get('age'):
+            rec['Age_Year'] = round(float(rec['age']) / 365)
+    return records
+
+def build_feature_matrix(records):
+    return np.array(
+        [[rec.get(f, FEATURE_DEFAULTS[f]) for f in FEATURES] for rec in records],
+        dtype=float
+    )
+
+# Max absolute probability difference tolerated between the compiled kernel and sklearn
+COMPILE_TOLERANCE = 1e-9
+
+class CompiledLinearModel:
+    # Pure-NumPy replacement for a binary LogisticRegression: dot product + sigmoid,
+    # without sklearn's per-call input validation. Keeps the estimator for reference.
+    def __init__(self, estimator):
+        self.estimator = estimator
+        self.classes_ = estimator.classes_
+        self.coef = np.ascontiguousarray(estimator.coef_[0], dtype=float)
+        self.intercept = float(estimator.intercept_[0])
+        self.n_features_in_ = len(self.coef)
+        self._coef_list = self.coef.tolist()
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=float) @ self.coef + self.intercept
+
+    def predict_proba(self, X):
+        z = self.decision_function(X)
+        with np.errstate(over='ignore'):
+            p = 1.0 / (1.0 + np.exp(-z))
+        return np.column_stack((1.0 - p, p))
+
+    def predict(self, X):
+        return np.where(self.predict_proba(X)[:, 1] > DECISION_THRESHOLD, self.classes_[1], self.classes_[0])
+
+    def proba_one(self, features):
+        # Single-row kernel in plain Python floats: no array allocation at all
+        z = self.intercept + sum(map(operator.mul, self._coef_list, features))
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+def _probe_matrix(n_rows=256, seed=0):
+    # Plausible patient rows used to check the compiled kernel against the estimator
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 3, n_rows), rng.integers(130, 210, n_rows), rng.uniform(40, 180, n_rows),
+        rng.integers(80, 220, n_rows), rng.integers(40, 140, n_rows), rng.integers(1, 4, n_rows),
+        rng.integers(1, 4, n_rows), rng.integers(0, 2, n_rows), rng.integers(0, 2, n_rows),
+        rng.integers(0, 2, n_rows), rng.integers(25, 80, n_rows)
+    ]).astype(float)
+
+def compile_model(model):
+    # Returns a CompiledLinearModel when the estimator is a binary logistic regression whose
+    # probabilities the kernel reproduces; otherwise returns the estimator unchanged.
+    if type(model).__name__ != "LogisticRegression":
+        return model
+    if getattr(model, "coef_", None) is None or model.coef_.shape[0] != 1 or len(model.classes_) != 2:
+        return model
+
+    compiled = CompiledLinearModel(model)
+    X = _probe_matrix()
+    if X.shape[1] != compiled.n_features_in_:
+        return model
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            expected = model.predict_proba(X)[:, 1]
+    except Exception as e:
+        print(f"Fast path disabled, estimator probe failed: {e}")
+        return model
+
+    drift = float(np.max(np.abs(compiled.predict_proba(X)[:, 1] - expected)))
+    row_drift = max(abs(compiled.proba_one(row) - p) for row, p in zip(X.tolist(), expected.tolist()))
+    if max(drift, row_drift) > COMPILE_TOLERANCE:
+        print(f"Fast path disabled, compiled kernel differs from sklearn by {max(drift, row_drift):.2e}")
+        return model
+    return compiled
+
+# Value domains of the categorical features, used as columns of the probability table
+DISCRETE_DOMAINS = {
+    'gender': (0, 1, 2), 'cholesterol': (1, 2, 3), 'gluc': (1, 2, 3),
+    'smoke': (0, 1), 'alco': (0, 1), 'active': (0, 1)
+}
+
+class ProbabilityTable:
+    # Memoizes model probabilities for quantized feature rows.
+    # Continuous features (height, weight, BP, age) are rounded to whole units and form the
+    # row key of a fixed-size float32 array, evicted LRU. Each row holds the probabilities of
+    # every categorical combination and is filled with one vectorized predict_proba call,
+    # so near-identical patients that differ only in categorical answers also hit.
+    def __init__(self, model, capacity=4096):
+        self.model = model
+        self.classes_ = model.classes_
+        self.capacity = capacity
+
+        self._disc_positions = [FEATURES.index(f) for f in DISCRETE_DOMAINS]
+        self._cont_positions = [i for i, f in enumerate(FEATURES) if f not in DISCRETE_DOMAINS]
+        self._disc_codes = [
+            (FEATURES.index(f), len(values), {v: code for code, v in enumerate(values)})
+            for f, values in DISCRETE_DOMAINS.items()
+        ]
+        self._disc_grid = np.array(list(itertools.product(*DISCRETE_DOMAINS.values())), dtype=float)
+
+        self._table = np.zeros((capacity, len(self._disc_grid)), dtype=np.float32)
+        self._slots = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def __getattr__(self, name):
+        # Anything not overridden (coef_, feature_names_in_, ...) comes from the wrapped model
+        if name == 'model':
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def predict_proba(self, X):
+        # Batches are already vectorized: send them straight to the model
+        return self.model.predict_proba(X)
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+    def _fill_row(self, cont_key):
+        X = np.empty((len(self._disc_grid), len(FEATURES)))
+        X[:, self._disc_positions] = self._disc_grid
+        X[:, self._cont_positions] = cont_key
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return self.model.predict_proba(X)[:, 1].astype(np.float32)
+
+    def proba_one(self, features):
+        try:
+            code = 0
+            for pos, radix, codes in self._disc_codes:
+                code = code * radix + codes[features[pos]]
+        except (KeyError, TypeError):
+            # Categorical value outside the table's domain: score it directly
+            with self._lock:
+                self.bypassed += 1
+            return score_one(self.model, features)[1]
+
+        cont_key = tuple(int(round(float(features[pos]))) for pos in self._cont_positions)
+        with self._lock:
+            slot = self._slots.get(cont_key)
+            if slot is not None:
+                self._slots.move_to_end(cont_key)
+                self.hits += 1
+                return float(self._table[slot, code])
+            self.misses += 1
+
+        row = self._fill_row(cont_key)
+        with self._lock:
+            slot = self._slots.get(cont_key)
+            if slot is None:
+                if len(self._slots) >= self.capacity:
+                    _, slot = self._slots.popitem(last=False)
+                else:
+                    slot = len(self._slots)
+                self._table[slot] = row
+                self._slots[cont_key] = slot
+        return float(row[code])
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._slots),
+            'capacity': self.capacity,
+            'memory_bytes': int(self._table.nbytes)
+        }
+
+def score_batch(model, X):
+    # Returns (labels, probabilities in [0, 1], threshold used) for a feature matrix
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+
+    if not hasattr(model, "predict_proba"):
+        # No probabilities available: fall back to hard labels
+        labels = np.asarray(model.predict(X)).astype(int)
+        return labels, np.zeros(len(X)), None
+
+    prob_matrix = np.asarray(model.predict_proba(X))
+    classes = np.asarray(getattr(model, "classes_", [0, 1]))
+    if prob_matrix.shape[1] > 1:
+        probabilities = prob_matrix[:, 1]
+        labels = np.where(probabilities > DECISION_THRESHOLD, classes[-1], classes[0]).astype(int)
+    else:
+        probabilities = prob_matrix[:, 0]
+        labels = np.full(len(X), classes[0]).astype(int)
+    return labels, probabilities, DECISION_THRESHOLD
+
+def score_one(model, features):
+    # Single-row convenience wrapper: returns (label, probability, threshold) as Python scalars
+    proba_one = getattr(model, "proba_one", None)
+    if proba_one is not None:
+        probability = proba_one(features)
+        classes = model.classes_
+        label = classes[1] if probability > DECISION_THRESHOLD else classes[0]
+        return int(label), probability, DECISION_THRESHOLD
+
+    labels, probabilities, threshold = score_batch(model, np.array([features], dtype=float))
+    return int(labels[0]), float(probabilities[0]), threshold
@@ -0,0 +1,174 @@
+# search.py
+# Hyperparameter search for the model families worth tuning (Gradient Boosting, Random Forest,
+# Logistic Regression). Candidates are raced with successive halving: every config is scored
+# on a small slice of the training rows, and only the best third moves on to three times as
+# many rows, so weak configs are dropped after a few cheap fits. Folds run in parallel.
+# The cleaned split and CV fold indices are built once per dataset version and cached as
+# .npy files next to the dataset cache, so repeated sweeps skip cleaning and splitting.
+# Winners are refit on the full training split, timed for serving cost and merged into
+# model_accuracies.json as "<family> (tuned)".
+# Usage: python search.py [--families gradient_boosting,random_forest] [--cv 5] [--jobs N] [--register]
+import os
+import json
+import time
+import argparse
+import shutil
+import warnings
+import joblib
+import numpy as np
+from dataset import DATA_CACHE_DIR, file_hash
+from train import (
+    MODEL_FAMILIES, RANDOM_STATE, clean_frame, load_raw, make_estimator, merge_accuracies,
+    register, split
+)
+
+# Grids per family; each is raced with successive halving, so they can be generous
+SEARCH_SPACES = {
+    'gradient_boosting': {
+        'n_estimators': [100, 200, 300],
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_depth': [2, 3, 4],
+    },
+    'random_forest': {
+        'n_estimators': [100, 200],
+        'max_depth': [8, 12, None],
+        'min_samples_leaf': [1, 5, 20],
+    },
+    'logistic_regression': {
+        'C': [0.001, 0.01, 0.1, 1.0, 10.0],
+    },
+}
+
+# Single-row latency is measured over this many calls
+LATENCY_CALLS = 200
+
+def prepared_split(data_path, cv, bp=False):
+    # Returns (X_train, X_test, y_train, y_test, folds) as arrays, building the cache on first use.
+    # The cache key covers everything that shapes the split: source bytes, cleaning and folds.
+    from sklearn.model_selection import StratifiedKFold
+    key = f"{file_hash(data_path)[:16]}-cv{cv}-rs{RANDOM_STATE}{'-bp' if bp else ''}"
+    cache_dir = os.path.join(DATA_CACHE_DIR, f"split-{key}")
+    names = ['X_train', 'X_test', 'y_train', 'y_test'] + [f"fold{i}" for i in range(cv)]
+    if all(os.path.exists(os.path.join(cache_dir, f"{n}.npy")) for n in names):
+        arrays = {n: np.load(os.path.join(cache_dir, f"{n}.npy"), mmap_mode='r') for n in names}
+        print(f"Using cached split and folds from {cache_dir}")
+    else:
+        X_train, X_test, y_train, y_test = split(clean_frame(load_raw(data_path), bp=bp))
+        arrays = {
+            'X_train': np.ascontiguousarray(X_train.to_numpy(dtype=float)),
+            'X_test': np.ascontiguousarray(X_test.to_numpy(dtype=float)),
+            'y_train': y_train.to_numpy(dtype=np.int8),
+            'y_test': y_test.to_numpy(dtype=np.int8),
+        }
+        # Each fold is stored as its validation mask's row indices
+        splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=RANDOM_STATE)
+        for i, (_, val_idx) in enumerate(splitter.split(arrays['X_train'], arrays['y_train'])):
+            arrays[f"fold{i}"] = val_idx.astype(np.int32)
+        tmp = f"{cache_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), values, allow_pickle=False)
+        try:
+            os.rename(tmp, cache_dir)
+        except OSError:
+            # A concurrent sweep published the same split first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    n = len(arrays['X_train'])
+    folds = []
+    for i in range(cv):
+        val_idx = np.asarray(arrays[f"fold{i}"])
+        mask = np.ones(n, dtype=bool)
+        mask[val_idx] = False
+        folds.append((np.flatnonzero(mask), val_idx))
+    return (np.asarray(arrays['X_train']), np.asarray(arrays['X_test']),
+            np.asarray(arrays['y_train']), np.asarray(arrays['y_test']), folds)
+
+def serving_cost(estimator, X_test):
+    # Batch cost per row over the test split, and median latency of a single-row predict_proba
+    started = time.perf_counter()
+    estimator.predict_proba(X_test)
+    batch_us = (time.perf_counter() - started) / len(X_test) * 1e6
+
+    row = X_test[:1]
+    samples = []
+    for _ in range(LATENCY_CALLS):
+        started = time.perf_counter()
+        estimator.predict_proba(row)
+        samples.append(time.perf_counter() - started)
+    return batch_us, float(np.median(samples)) * 1000
+
+def search_family(slug, X_train, X_test, y_train, y_test, folds, jobs, factor=3):
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV
+
+    grid = SEARCH_SPACES[slug]
+    started = time.perf_counter()
+    search = HalvingGridSearchCV(
+        make_estimator(slug), grid, factor=factor, cv=folds, scoring='accuracy',
+        n_jobs=jobs, random_state=RANDOM_STATE, refit=True
+    )
+    search.fit(X_train, y_train)
+    search_seconds = time.perf_counter() - started
+
+    best = search.best_estimator_
+    results = search.cv_results_
+    best_index = search.best_index_
+    accuracy = float((best.predict(X_test) == y_test).mean())
+    batch_us, single_ms = serving_cost(best, X_test)
+    return best, {
+        'Model': f"{MODEL_FAMILIES[slug]} (tuned)",
+        'Accuracy': accuracy,
+        'slug': f"{slug}_tuned",
+        'params': search.best_params_,
+        'cv_folds': len(folds),
+        'cv_mean': float(search.best_score_),
+        'cv_std': float(results['std_test_score'][best_index]),
+        'candidates': int(search.n_candidates_[0]),
+        'halving_rounds': int(search.n_iterations_),
+        'search_seconds': round(search_seconds, 3),
+        'fit_seconds': round(float(search.refit_time_), 3),
+        'predict_us_per_row': round(batch_us, 3),
+        'single_row_ms': round(single_ms, 4),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search for the tunable model families.")
+    parser.add_argument("--data", default="cardio_train.csv")
+    parser.add_argument("--families", help="comma-separated subset of: " + ", ".join(SEARCH_SPACES))
+    parser.add_argument("--bp", action="store_true", help="also drop implausible blood pressure readings")
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--factor", type=int, default=3, help="halving factor: keep 1/factor of candidates per round")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--artifact-dir", default="models")
+    parser.add_argument("--accuracies", default="model_accuracies.json")
+    parser.add_argument("--register", metavar="MANIFEST", nargs="?", const="models.json",
+                        help="add the tuned artifacts to the model registry manifest")
+    args = parser.parse_args()
+
+    families = args.families.split(",") if args.families else list(SEARCH_SPACES)
+    for slug in families:
+        if slug not in SEARCH_SPACES:
+            parser.error(f"no search space for '{slug}'")
+
+    warnings.filterwarnings("ignore")
+    started = time.perf_counter()
+    X_train, X_test, y_train, y_test, folds = prepared_split(args.data, args.cv, args.bp)
+    print(f"Split ready in {time.perf_counter() - started:.2f} s: {len(X_train)} train / {len(X_test)} test rows, {args.cv} folds")
+
+    os.makedirs(args.artifact_dir, exist_ok=True)
+    records = []
+    for slug in families:
+        best, record = search_family(slug, X_train, X_test, y_train, y_test, folds, args.jobs, args.factor)
+        record['artifact'] = os.path.join(args.artifact_dir, f"{record['slug']}.pkl")
+        joblib.dump(best, record['artifact'])
+        records.append(record)
+        print(f"  {record['Model']:32s} hold-out {record['Accuracy']:.4f}  cv {record['cv_mean']:.4f}  "
+              f"{record['candidates']} configs in {record['search_seconds']:.1f} s  "
+              f"single row {record['single_row_ms']:.3f} ms  best {json.dumps(record['params'])}")
+
+    merge_accuracies(args.accuracies, records)
+    if args.register:
+        register(records, args.register, time.strftime("%Y%m%d-%H%M%S"))
+    print(f"Merged {len(records)} result(s) into {args.accuracies}")
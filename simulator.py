@@ -0,0 +1,123 @@
+# simulator.py
+# "What-if" scenarios for one patient. An intervention grid (e.g. systolic BP -40..0, weight
+# -10..0 kg, quit smoking) is expanded into the full counterfactual feature matrix with NumPy
+# broadcasting, scored with a single predict_proba call and run through the vectorized heart-age
+# rules, so hundreds of scenarios cost about as much as one batch request.
+import numpy as np
+from scoring import FEATURES, score_batch
+from health_metrics import calculate_heart_age_batch
+from validation import SCHEMA, ValidationError
+
+SIMULATE_MAX_SCENARIOS = 5000
+COLUMN = {name: j for j, name in enumerate(FEATURES)}
+
+# Used when the request names no interventions: the changes patients ask about most
+DEFAULT_INTERVENTIONS = {
+    'ap_hi': {'delta': [-40, -30, -20, -10, 0]},
+    'weight': {'delta': [-10, -7.5, -5, -2.5, 0]},
+    'smoke': {'set': [0]},
+    'active': {'set': [1]},
+}
+
+def _error(field, message):
+    return ValidationError([{'row': None, 'field': field, 'value': None, 'message': message}])
+
+def parse_axes(patient, interventions):
+    # Returns [(feature, values)] with the patient's own value always on each axis, so every
+    # curve passes through the baseline. A spec is {"delta": [...]} or {"set": [...]}; a bare list
+    # means deltas for measurements and absolute values for the categorical fields.
+    axes = []
+    for name, spec in (interventions or DEFAULT_INTERVENTIONS).items():
+        if name not in COLUMN:
+            raise _error(name, f"Unknown feature '{name}'. Use one of: {', '.join(FEATURES)}.")
+        field = SCHEMA[COLUMN[name]]
+        if isinstance(spec, list):
+            spec = {'set': spec} if field.choices else {'delta': spec}
+        if not isinstance(spec, dict) or len(spec) != 1 or next(iter(spec)) not in ('delta', 'set'):
+            raise _error(name, f"Intervention for {field.label} must be a list or {{\"delta\": [...]}} / {{\"set\": [...]}}.")
+        kind, raw = next(iter(spec.items()))
+        try:
+            values = np.asarray(raw, dtype=float).ravel()
+        except (TypeError, ValueError):
+            raise _error(name, f"Intervention values for {field.label} must be numbers.")
+        if not np.isfinite(values).all():
+            raise _error(name, f"Intervention values for {field.label} must be finite.")
+        if kind == 'delta':
+            if field.choices:
+                raise _error(name, f"{field.label} is categorical; use \"set\" with one of {', '.join(map(str, field.choices))}.")
+            values = patient[COLUMN[name]] + values
+        elif field.choices and not np.isin(values, field.choices).all():
+            raise _error(name, f"{field.label} can only be set to {', '.join(map(str, field.choices))}.")
+        # Keep counterfactuals inside the range the schema (and the model's training data) allows
+        values = np.clip(values, field.low, field.high)
+        axes.append((name, np.unique(np.append(values, patient[COLUMN[name]]))))
+    return axes
+
+def scenario_matrix(patient, axes):
+    # Cartesian product of the axes over the patient's row: (n_scenarios, n_features), the grid
+    # position of every scenario on each axis (n_scenarios, n_axes) and the mask of scenarios
+    # whose diastolic BP was lowered to the systolic value
+    sizes = [len(values) for _, values in axes]
+    n = int(np.prod(sizes)) if sizes else 1
+    if n > SIMULATE_MAX_SCENARIOS:
+        raise _error(None, f"{n} scenarios requested; the limit is {SIMULATE_MAX_SCENARIOS}.")
+    X = np.tile(patient, (n, 1))
+    index = np.indices(sizes).reshape(len(sizes), -1).T if sizes else np.zeros((1, 0), dtype=np.intp)
+    for k, (name, values) in enumerate(axes):
+        X[:, COLUMN[name]] = values[index[:, k]]
+    # Lowering systolic BP must not leave diastolic above it
+    hi, lo = COLUMN['ap_hi'], COLUMN['ap_lo']
+    clamped = X[:, lo] > X[:, hi]
+    X[clamped, lo] = X[clamped, hi]
+    return X, index, clamped
+
+def simulate(model, features, interventions=None):
+    # features: validated patient row (FEATURES order). Returns (result dict, rows scored).
+    patient = np.asarray(features, dtype=float)
+    axes = parse_axes(patient, interventions)
+    X, index, clamped = scenario_matrix(patient, axes)
+
+    _, probabilities, threshold = score_batch(model, X)
+    cols = {f: X[:, i] for i, f in enumerate(FEATURES)}
+    heart_ages = calculate_heart_age_batch(
+        cols['Age_Year'], cols['ap_hi'], cols['ap_lo'], cols['weight'], cols['height'],
+        cols['cholesterol'], cols['gluc'], cols['smoke'], cols['active']
+    )
+    probabilities = probabilities * 100
+
+    # Grid positions, not feature values, select the baseline and the curves: a clamped diastolic
+    # BP no longer equals the patient's own and would drop its scenario from the ap_hi curve.
+    # The baseline is the scenario where every axis is at the patient's own value.
+    own = np.array([np.searchsorted(values, patient[COLUMN[name]]) for name, values in axes], dtype=np.intp)
+    base = int(np.argmax(np.all(index == own, axis=1)))
+
+    # One curve per axis: that axis varies, every other axis stays at the patient's value
+    curves = {}
+    for k, (name, values) in enumerate(axes):
+        others = [j for j in range(len(axes)) if j != k]
+        mask = np.all(index[:, others] == own[others], axis=1)
+        curves[name] = {
+            'values': values[index[mask, k]].tolist(),
+            'probability': probabilities[mask].tolist(),
+            'heart_age': heart_ages[mask].tolist()
+        }
+
+    best = int(np.argmin(probabilities))
+    return {
+        'baseline': {'probability': float(probabilities[base]), 'heart_age': int(heart_ages[base])},
+        'threshold': threshold,
+        'axes': {name: values.tolist() for name, values in axes},
+        'count': len(X),
+        # Scenarios scored with diastolic BP lowered to the systolic value (see scenarios)
+        'clamped': int(clamped.sum()),
+        # Column-oriented: scenario i is scenarios[axis][i] for every axis
+        'scenarios': {name: X[:, COLUMN[name]].tolist() for name, _ in axes},
+        'probability': probabilities.tolist(),
+        'heart_age': heart_ages.tolist(),
+        'curves': curves,
+        'best': {
+            'changes': {name: float(X[best, COLUMN[name]]) for name, _ in axes if X[best, COLUMN[name]] != patient[COLUMN[name]]},
+            'probability': float(probabilities[best]),
+            'heart_age': int(heart_ages[best])
+        }
+    }, len(X)
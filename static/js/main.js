@@ -161,6 +161,30 @@ document.addEventListener('DOMContentLoaded', () => {
                         </div>
                     `;
 
+                    // Risk Drivers: per-feature contributions, strongest first (absent for models without an explainer)
+                    const drivers = data.explanation ? data.explanation.contributions.filter(c => c.contribution !== 0).slice(0, 6) : [];
+                    const largestEffect = drivers.length ? Math.abs(drivers[0].contribution) : 1;
+                    const driverRows = drivers.map(c => `
+                        <tr>
+                            <td><span class="day-label">${c.label}</span></td>
+                            <td class="reboot-desc">${Number.isInteger(c.value) ? c.value : c.value.toFixed(1)}</td>
+                            <td>
+                                <div class="driver-bar ${c.contribution > 0 ? 'raises' : 'lowers'}" style="width: ${Math.max(4, Math.abs(c.contribution) / largestEffect * 100)}%"></div>
+                                <span class="driver-direction ${c.contribution > 0 ? 'raises' : 'lowers'}">${c.contribution > 0 ? 'Raises risk' : 'Lowers risk'}</span>
+                            </td>
+                        </tr>
+                    `).join('');
+
+                    const driversHtml = `
+                        <p class="reboot-desc" style="margin-bottom: 0.75rem;">Compared with the average patient the model was trained on, these factors moved your estimate the most.</p>
+                        <div class="reboot-scroll-zone">
+                            <table class="reboot-grid">
+                                <thead><tr><th>Factor</th><th>Your Value</th><th>Effect</th></tr></thead>
+                                <tbody>${driverRows}</tbody>
+                            </table>
+                        </div>
+                    `;
+
                     // Main Modal Assembly
                     modalBox.className = 'modal-content-premium'; // Upgrade to premium
                     modalBox.classList.add(data.prediction === 1 ? 'theme-high' : 'theme-low');
@@ -181,6 +205,7 @@ document.addEventListener('DOMContentLoaded', () => {
                         <div class="modal-tabs">
                             <button class="modal-tab active" data-tab="summary">Metrics Summary</button>
                             <button class="modal-tab" data-tab="reboot">7-Day Action Blueprint</button>
+                            ${drivers.length ? '<button class="modal-tab" data-tab="drivers">Risk Drivers</button>' : ''}
                         </div>
 
                         <div id="tab-summary" class="tab-pane active">
@@ -191,6 +216,10 @@ document.addEventListener('DOMContentLoaded', () => {
                         <div id="tab-reboot" class="tab-pane">
                             ${rebootPlanHtml}
                         </div>
+
+                        <div id="tab-drivers" class="tab-pane">
+                            ${driversHtml}
+                        </div>
                     `;
 
                     const finalAdvice = document.getElementById('finalAdvice');
@@ -225,6 +254,11 @@ document.addEventListener('DOMContentLoaded', () => {
                         `;
                     }
 
+                    // Peer comparison from the cohort statistics (same age band and gender)
+                    if (data.cohort && data.cohort.percentile !== null) {
+                        finalAdvice.innerHTML += `<br>Your risk estimate is higher than <strong>${Math.round(data.cohort.percentile)}%</strong> of ${{female: 'women', male: 'men'}[data.cohort.gender] || 'people'} aged ${data.cohort.age_band} in our reference data.`;
+                    }
+
                     // Re-trigger percentage animation
                     if (data.probability > 0) {
                         let currentStart = 0;
@@ -265,6 +299,10 @@ document.addEventListener('DOMContentLoaded', () => {
                             try {
                                 const currentForm = document.getElementById('predictionForm');
                                 const formData = new FormData(currentForm);
+                                // Lets the server render from the cached /predict result; it re-scores the form if the token has expired
+                                if (data.result_token) {
+                                    formData.append('result_token', data.result_token);
+                                }
                                 const response = await fetch('/generate_report', {
                                     method: 'POST',
                                     body: formData
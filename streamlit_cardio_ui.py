@@ -153,26 +153,23 @@ import os
 import numpy as np
 from sklearn.pipeline import Pipeline
 import pickle
+from scoring import FEATURES, score_one
+from validation import ValidationError, validate_one
+from model_registry import ModelRegistry
 
 st.set_page_config(page_title="Cardio Risk Predictor", layout="centered")
 st.title("Cardio Risk Predictor")
 
-FEATURES = ['gender','height','weight','ap_hi','ap_lo','cholesterol','gluc','smoke','alco','active','Age_Year']
-MODEL_PATH = "model1.pkl"   # <<---- STATIC MODEL NAME
+MODEL_PATH = "model1.pkl"   # served when there is no models.json
+MODEL_MANIFEST = os.environ.get("MODEL_MANIFEST", "models.json")
 
 # -------------------------------------------------------
 # Load model helpers
 # -------------------------------------------------------
 @st.cache_resource
-def load_model_from_path(path):
-    try:
-        return joblib.load(path)
-    except:
-        try:
-            with open(path, "rb") as f:
-                return pickle.load(f)
-        except:
-            return None
+def get_registry():
+    # Same registry (and hot reload) the Flask app uses
+    return ModelRegistry(MODEL_MANIFEST, default_path=MODEL_PATH)
 
 @st.cache_resource
 def load_model_from_bytes(b):
@@ -189,13 +186,15 @@ def load_model_from_bytes(b):
 # -------------------------------------------------------
 model = None
 
-# Auto load model1.pkl if exists
-if os.path.exists(MODEL_PATH):
-    model = load_model_from_path(MODEL_PATH)
-    if model is not None:
-        st.success("Auto-loaded model1.pkl from folder.")
-    else:
-        st.error("model1.pkl exists but cannot be loaded (corrupted or incompatible).")
+# Models from the registry manifest
+registry = get_registry()
+model_name = st.selectbox("Model", registry.names())
+entry = registry.select(model_name)
+if entry.model is not None:
+    model = entry.model
+    st.success(f"Loaded '{entry.name}' {entry.version} from {entry.path}.")
+else:
+    st.error(f"'{entry.name}' cannot be loaded: {entry.error}")
 
 # Upload model1.pkl manually
 st.markdown("### Upload Model File (`model1.pkl`)")
@@ -248,30 +247,21 @@ with col4:
 if st.button("Predict"):
     if model is None:
         st.error("❌ No model loaded. Place model1.pkl in the folder or upload it above.")
-    elif ap_lo > ap_hi:
-        st.error("❌ ap_lo cannot be greater than ap_hi.")
     else:
-        X = np.array([[gender, height, weight, ap_hi, ap_lo,
-                       cholesterol, gluc, smoke, alco, active, Age_Year]], dtype=float)
-
         try:
-            pred = model.predict(X)
-            proba = None
-
-            if hasattr(model, "predict_proba"):
-                try:
-                    proba = model.predict_proba(X)[0]
-                except:
-                    proba = None
-
-            label = int(pred[0])
+            # Same schema as the Flask routes: ranges, categories and ap_lo <= ap_hi
+            features = validate_one(dict(zip(FEATURES, [gender, height, weight, ap_hi, ap_lo,
+                                                        cholesterol, gluc, smoke, alco, active, Age_Year])))
+            label, p1, threshold = score_one(model, features)
             st.success(f"Predicted cardio: **{label}**  (0 = No, 1 = Yes)")
 
-            if proba is not None:
-                p1 = proba[1] if len(proba) > 1 else proba[0]
-                st.info(f"Probability cardio=1: **{p1:.3f}**")
+            if threshold is not None:
+                st.info(f"Probability cardio=1: **{p1:.3f}**  (decision threshold {threshold})")
                 st.progress(float(p1))
 
+        except ValidationError as e:
+            for error in e.errors:
+                st.error(f"❌ {error['message']}")
         except Exception as e:
             st.error(f"Prediction failed: {e}")
 
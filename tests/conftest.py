@@ -0,0 +1,38 @@
+# Shared fixtures. Tests run from the repo root modules (flat layout), against model1.pkl and
+# Cardio_cleaned.csv as shipped.
+import os
+import sys
+import warnings
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# No startup warm-up (model, fpdf2) when the tests import app
+os.environ.setdefault("WARMUP", "none")
+os.chdir(ROOT)
+warnings.filterwarnings("ignore", message=".*feature names.*")
+
+# A valid assessment form, as predict.html posts it
+FORM = {
+    'patient_name': 'Test Patient', 'gender': '1', 'Age_Year': '55', 'height': '170', 'weight': '80',
+    'ap_hi': '140', 'ap_lo': '90', 'cholesterol': '2', 'gluc': '1', 'smoke': '0', 'alco': '0', 'active': '1'
+}
+
+@pytest.fixture
+def form():
+    return dict(FORM)
+
+@pytest.fixture(scope="session")
+def model():
+    from model_registry import load_artifact
+    return load_artifact(os.path.join(ROOT, "model1.pkl"))
+
+@pytest.fixture(scope="session")
+def flask_app():
+    import app as app_module
+    app_module.app.config['TESTING'] = True
+    return app_module
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.app.test_client()
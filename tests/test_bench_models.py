@@ -0,0 +1,58 @@
+import json
+import joblib
+import numpy as np
+import pytest
+from sklearn.svm import SVC
+import bench_models
+
+def test_candidates_deduplicates_manifest_and_globs(tmp_path):
+    (tmp_path / "a.pkl").write_bytes(b"")
+    (tmp_path / "b.pkl").write_bytes(b"")
+    manifest = tmp_path / "models.json"
+    manifest.write_text(json.dumps({'models': [{'name': 'served', 'path': 'a.pkl'}]}))
+    found = bench_models.candidates(str(manifest), [str(tmp_path / "*.pkl")])
+    assert [name for name, _ in found] == ['served', 'b']
+
+def test_bench_one_times_every_batch_size(monkeypatch):
+    monkeypatch.setattr(bench_models, "CALLS", {1: 5, 64: 3, 4096: 2})
+    result = bench_models._bench_one("model1.pkl", True)
+    assert result['compiled'] and result['model_class'] == 'LogisticRegression'
+    assert set(result['batches']) == {'1', '64', '4096'}
+    assert all(b['p95_ms'] >= b['p50_ms'] > 0 for b in result['batches'].values())
+
+def test_bench_one_skips_label_only_models(tmp_path):
+    X = np.random.default_rng(0).normal(size=(40, 11))
+    path = str(tmp_path / "svc.pkl")
+    joblib.dump(SVC().fit(X, X[:, 0] > 0), path)
+    result = bench_models._bench_one(path, True)
+    assert result['model_class'] == 'SVC' and 'predict_proba' in result['skipped']
+    assert 'batches' not in result
+
+def test_bench_one_missing_artifact(tmp_path, monkeypatch):
+    monkeypatch.setattr(bench_models, "CALLS", {1: 1, 64: 1, 4096: 1})
+    with pytest.raises(OSError):
+        bench_models._bench_one(str(tmp_path / "missing.pkl"), True)
+
+def test_results_with_accuracy_render_on_accuracy_page(tmp_path, monkeypatch, flask_app, client):
+    accuracies = tmp_path / "model_accuracies.json"
+    accuracies.write_text(json.dumps([{'Model': 'Tuned LR', 'Accuracy': 0.73, 'slug': 'tuned'}]))
+    batches = {str(size): {'p50_ms': 0.01, 'p95_ms': 0.02, 'rows_per_second': 1e5} for size in bench_models.BATCH_SIZES}
+    results = [{'name': 'tuned', 'artifact': 'tuned.pkl', 'artifact_bytes': 1000, 'rss_bytes': 0,
+                'peak_rss_bytes': 0, 'load_seconds': 0.1, 'model_class': 'LogisticRegression',
+                'compiled': True, 'within_budget': True, 'batches': batches}]
+    bench_models.attach_accuracy(results, str(accuracies))
+    assert results[0]['accuracy'] == 0.73 and results[0]['Model'] == 'Tuned LR'
+
+    out = tmp_path / "model_benchmarks.json"
+    bench_models.write_results(str(out), results, 5.0)
+    payload = json.loads(out.read_text())
+    assert payload['budget_ms'] == 5.0 and payload['models'][0]['name'] == 'tuned'
+
+    monkeypatch.setattr(flask_app, "MODEL_BENCHMARKS", str(out))
+    page = client.get('/accuracy')
+    assert page.status_code == 200 and b"Tuned LR" in page.data
+
+def test_accuracy_page_without_benchmarks(tmp_path, monkeypatch, flask_app, client):
+    monkeypatch.setattr(flask_app, "MODEL_BENCHMARKS", str(tmp_path / "missing.json"))
+    page = client.get('/accuracy')
+    assert page.status_code == 200 and b"No inference benchmarks yet" in page.data
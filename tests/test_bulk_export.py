@@ -0,0 +1,63 @@
+import io
+import zipfile
+import pytest
+from bulk_export import RenderPool, iter_assessments, render_all, score_cohort, stream_zip
+from validation import ValidationError
+
+def patients(form, n):
+    return [dict(form, id=str(i), patient_name=f"Patient {i}") for i in range(n)]
+
+def test_stream_zip_has_summary_and_one_pdf_per_patient(model, form):
+    cohort = score_cohort(model, patients(form, 3), explain=False)
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream_zip(cohort))))
+    names = archive.namelist()
+    assert names[0] == 'summary.csv' and len(names) == 4
+    assert all(archive.read(name).startswith(b"%PDF") for name in names[1:])
+    assert cohort['inference_seconds'] >= 0
+
+def test_score_cohort_rejects_bad_row(model, form):
+    with pytest.raises(ValidationError):
+        score_cohort(model, patients(form, 2) + [dict(form, ap_hi='500')])
+
+def test_shared_pool_renders_in_order_and_survives_exports(model, form):
+    cohort = score_cohort(model, patients(form, 4), explain=False)
+    pool = RenderPool(2, max_exports=1)
+    try:
+        for _ in range(2):
+            order = [a['patient_name'] for a, pdf in render_all(iter_assessments(cohort), 2, pool)]
+            assert order == [f"Patient {i}" for i in range(4)]
+        executor = pool._executor
+        assert executor is not None
+        list(render_all(iter_assessments(cohort), 2, pool))
+        assert pool._executor is executor
+    finally:
+        pool.shutdown()
+
+def test_render_pool_caps_concurrent_exports():
+    pool = RenderPool(1, max_exports=1)
+    assert pool.acquire()
+    assert not pool.acquire()
+    pool.release()
+    assert pool.acquire()
+
+@pytest.fixture
+def bulk_app(flask_app, monkeypatch):
+    monkeypatch.setattr(flask_app, "BULK_WORKERS", 1)
+    monkeypatch.setattr(flask_app, "bulk_pool", RenderPool(1, max_exports=1))
+    return flask_app
+
+def test_bulk_reports_streams_zip_and_frees_slot(bulk_app, client, form):
+    response = client.post('/bulk_reports', json=patients(form, 2))
+    assert response.status_code == 200
+    assert len(zipfile.ZipFile(io.BytesIO(response.data)).namelist()) == 3
+    response.close()
+    assert bulk_app.bulk_pool.acquire()
+
+def test_bulk_reports_busy_and_invalid(bulk_app, client, form):
+    response = client.post('/bulk_reports', json=[dict(form, ap_hi='500')])
+    assert response.status_code == 400
+    # The failed export gave its slot back; now hold it as if an export were running
+    assert bulk_app.bulk_pool.acquire()
+    response = client.post('/bulk_reports', json=patients(form, 1))
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
@@ -0,0 +1,27 @@
+import chatbot
+from chatbot import KeywordMatcher
+
+GROUPS = [
+    ({'chest pain': 'PAIN', 'symptom': 'SYMPTOMS'}, True),
+    ({'hi': 'HELLO', 'bp': 'BP'}, False),
+]
+
+def test_priority_follows_group_order():
+    matcher = KeywordMatcher(GROUPS)
+    # "hi" comes first in the message but "symptom" has the higher priority
+    assert matcher.match("hi, what symptoms matter?") == 'SYMPTOMS'
+    assert matcher.match("my   chest pain started today") == 'PAIN'
+    assert matcher.match("hi there") == 'HELLO'
+
+def test_word_groups_need_whole_words():
+    matcher = KeywordMatcher(GROUPS)
+    assert matcher.match("this is nothing") is None
+    assert matcher.match("what about bp?") == 'BP'
+    assert matcher.match("bpm") is None
+
+def test_chat_route_uses_the_knowledge_base(client):
+    answer = client.post('/chat', json={'message': 'What are the symptoms?'}).get_json()['response']
+    assert answer == chatbot.STORE.current().matcher.match('symptom')
+    # No keyword at all: one of the fallbacks
+    assert client.post('/chat', json={'message': 'zzqx'}).get_json()['response'] in chatbot.STORE.current().fallbacks
+    assert client.post('/chat', data='not json').status_code == 200
@@ -0,0 +1,43 @@
+import os
+import json
+import pytest
+from chatbot import KnowledgeBase, KnowledgeBaseStore
+
+def write_kb(path, answer):
+    data = {'groups': [{'name': 'main', 'match': 'word', 'responses': {'heart': answer}}], 'fallbacks': ['?']}
+    path.write_text(json.dumps(data))
+    st = os.stat(path)
+    # Distinct mtimes even when the test writes twice within the clock resolution
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9 * len(answer)))
+
+def test_store_picks_up_edits(tmp_path):
+    path = tmp_path / "kb.json"
+    write_kb(path, "first")
+    store = KnowledgeBaseStore(str(path), check_interval=0)
+    assert store.current().respond("my heart") == "first"
+    write_kb(path, "second!")
+    assert store.current().respond("my heart") == "second!"
+    assert store.reloads == 1
+
+def test_broken_edit_keeps_last_good_snapshot(tmp_path):
+    path = tmp_path / "kb.json"
+    write_kb(path, "first")
+    store = KnowledgeBaseStore(str(path), check_interval=0)
+    path.write_text("{not json")
+    assert store.current().respond("heart") == "first"
+    path.write_text(json.dumps({'groups': [], 'fallbacks': ['?']}))
+    assert store.current().respond("heart") == "first"
+    assert store.reloads == 0
+
+@pytest.mark.parametrize("data", [
+    {'groups': [{'match': 'word', 'responses': {}}], 'fallbacks': ['?']},
+    {'groups': [{'match': 'word', 'responses': {'a': 'b'}}], 'fallbacks': []},
+    {'groups': [{'match': 'fuzzy', 'responses': {'a': 'b'}}], 'fallbacks': ['?']},
+])
+def test_invalid_knowledge_base_is_rejected(data):
+    with pytest.raises(ValueError):
+        KnowledgeBase(data)
+
+def test_shipped_knowledge_base_loads():
+    kb = KnowledgeBase.from_file("chat_knowledge.json")
+    assert kb.topics > 10 and kb.fallbacks
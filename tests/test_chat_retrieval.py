@@ -0,0 +1,24 @@
+import json
+from chatbot import KnowledgeBase, RetrievalIndex
+
+def test_search_ranks_by_similarity_and_dedupes_answers():
+    index = RetrievalIndex(
+        ["how do I lower my blood pressure", "ways to reduce blood pressure", "is coffee bad for the heart"],
+        ["BP", "BP", "COFFEE"]
+    )
+    hits = index.search("how can I reduce my blood pressure", k=3)
+    assert hits[0][1] == "BP"
+    assert [answer for _, answer in hits].count("BP") == 1
+    assert hits == sorted(hits, reverse=True)
+    assert index.search("zzqx") == []
+    assert index.memory_bytes() > 0
+
+def test_retrieval_mode_answers_faq_and_falls_back_to_keywords():
+    with open("chat_knowledge.json", encoding="utf-8") as f:
+        data = json.load(f)
+    kb = KnowledgeBase(data, retrieval=True)
+    faq = data['faq'][0]
+    assert kb.respond(faq['questions'][0]) == faq['answer']
+    # Nothing retrievable: keyword matching, then the fallbacks, still apply
+    assert kb.respond("zzqx") in kb.fallbacks
+    assert KnowledgeBase(data, retrieval=False).index is None
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+from cleaning import BloodPressurePlausibility, Bounds, CleaningPipeline, DropDuplicates, clean_file, default_stages
+
+def test_default_stages_reproduce_cardio_cleaned(tmp_path):
+    out = tmp_path / "cleaned.csv"
+    pipeline = clean_file("cardio_train.csv", str(out), chunksize=15000)
+    cleaned = pd.read_csv(out)
+    expected = pd.read_csv("Cardio_cleaned.csv")
+    assert len(cleaned) == len(expected) == pipeline.report()[-1]['rows_out']
+    assert cleaned['id'].tolist() == expected['id'].tolist()
+    assert cleaned['Age_Year'].tolist() == expected['Age_Year'].tolist()
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=['id', 'age', 'height', 'weight', 'ap_hi', 'ap_lo'])
+
+def test_duplicates_are_dropped_across_chunks():
+    pipeline = CleaningPipeline([DropDuplicates('id')])
+    chunks = [frame([(1, 20000, 170, 70, 120, 80), (1, 20000, 170, 70, 120, 80)]), frame([(1, 20000, 170, 70, 120, 80), (2, 20000, 170, 70, 120, 80)])]
+    out = pd.concat(pipeline.run(chunks))
+    assert out['id'].tolist() == [1, 2]
+    assert pipeline.report()[0]['dropped'] == 2
+
+def test_bounds_and_bp_stages():
+    data = frame([(1, 20000, 170, 70, 120, 80), (2, 20000, 90, 70, 120, 80), (3, 20000, 170, 70, 120, 1100), (4, 20000, 170, 70, 80, 120)])
+    assert CleaningPipeline([Bounds('height', 110, 210)]).clean_frame(data)['id'].tolist() == [1, 3, 4]
+    assert CleaningPipeline([BloodPressurePlausibility()]).clean_frame(data)['id'].tolist() == [1, 2]
+    assert len(default_stages(bp=True)) == len(default_stages()) + 1
+
+def test_everything_dropped_gives_empty_frame():
+    data = frame([(1, 20000, 300, 70, 120, 80)])
+    out = CleaningPipeline(default_stages()).clean_frame(data)
+    assert out.empty
+
+def test_missing_column_raises():
+    with pytest.raises(KeyError):
+        CleaningPipeline([Bounds('height', 110, 210)]).clean_frame(pd.DataFrame({'id': [1]}))
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from cohort import CohortStats, dataset_gender, load_or_build, read_columns
+
+@pytest.fixture(scope="module")
+def stats(model, tmp_path_factory):
+    return load_or_build(model, "Cardio_cleaned.csv", str(tmp_path_factory.mktemp("cohort")))
+
+def test_form_gender_maps_to_dataset_codes():
+    assert dataset_gender(0) == 1 and dataset_gender(1) == 2
+    assert dataset_gender(1, 'dataset') == 1
+    assert dataset_gender(np.array([0, 1, 2])).tolist() == [1, 2, 2]
+    with pytest.raises(ValueError):
+        dataset_gender(1, 'other')
+
+def test_patients_land_in_their_own_gender_stratum(stats):
+    female = stats.compare(40.0, 52, 0)
+    male = stats.compare(40.0, 52, 1)
+    assert female['gender'] == 'female' and male['gender'] == 'male'
+    assert female['age_band'] == male['age_band'] == '50-54'
+    assert stats.compare(40.0, 52, 1, 'dataset')['gender'] == 'female'
+    assert stats.compare(40.0, 52, 2, 'dataset')['gender'] == 'male'
+
+def test_batch_percentiles_match_compare(stats):
+    probabilities = np.array([0.12, 0.4, 0.4, 0.9])
+    ages = np.array([38, 52, 52, 63])
+    genders = np.array([0, 0, 1, 1])
+    sid, pct = stats.percentiles(probabilities, ages, genders)
+    for i in range(len(sid)):
+        single = stats.compare(probabilities[i] * 100, ages[i], genders[i])
+        assert single['percentile'] == round(pct[i], 1)
+        assert stats.stratum(sid[i])['gender'] == single['gender']
+
+def test_percentile_is_rank_within_stratum(stats):
+    sid = int(stats.strata_of([52], [0])[0])
+    scores = stats.keys[stats.offsets[sid]:stats.offsets[sid + 1]] - sid * 2
+    median = float(np.median(scores))
+    assert stats.compare(median * 100, 52, 0)['percentile'] == pytest.approx(50, abs=0.5)
+
+def test_build_leaves_out_invalid_rows(model, tmp_path):
+    path = tmp_path / "cohort.csv"
+    rows = ["id;age;gender;height;weight;ap_hi;ap_lo;cholesterol;gluc;smoke;alco;active;cardio"]
+    rows += [f"{i};{19000 + i};{1 + i % 2};165;70;120;80;1;1;0;0;1;{i % 2}" for i in range(120)]
+    rows.append("999;19000;1;165;70;120;1100;1;1;0;0;1;0")
+    rows.append("1000;19000;1;165;;120;80;1;1;0;0;1;0")
+    path.write_text("\n".join(rows) + "\n")
+    columns = read_columns(str(path))
+    assert columns['Age_Year'][0] == round(19000 / 365)
+    stats = CohortStats.build(model, columns, {'source': path.name})
+    assert stats.meta['rows'] == 120 and stats.meta['dropped'] == 2
+    assert stats.summary()['dropped'] == 2
+
+def test_read_columns_requires_model_features(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("id,gender,height\n1,1,160\n")
+    with pytest.raises(ValueError, match="weight"):
+        read_columns(str(path))
+
+def test_cohort_percentile_route(client):
+    response = client.get('/cohort/percentile?probability=40&Age_Year=52&gender=0')
+    assert response.status_code == 200
+    assert response.get_json()['gender'] == 'female'
+    response = client.get('/cohort/percentile?probability=40&Age_Year=52&gender=0&gender_coding=iso')
+    assert response.status_code == 400
@@ -0,0 +1,35 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from scoring import COMPILE_TOLERANCE, CompiledLinearModel, compile_model
+from validation import validate_batch
+
+@pytest.fixture(scope="module")
+def estimator():
+    return joblib.load("model1.pkl")
+
+def test_compiled_kernel_reproduces_sklearn(estimator, form):
+    compiled = compile_model(estimator)
+    assert isinstance(compiled, CompiledLinearModel)
+    X = validate_batch([form, dict(form, ap_hi='190', weight='130'), dict(form, Age_Year='25')])
+    expected = estimator.predict_proba(X)
+    assert np.abs(compiled.predict_proba(X) - expected).max() <= COMPILE_TOLERANCE
+    for row, p in zip(X.tolist(), expected[:, 1]):
+        assert compiled.proba_one(row) == pytest.approx(p, abs=COMPILE_TOLERANCE)
+    assert compiled.predict(X).tolist() == estimator.predict(X).tolist()
+
+def test_extreme_inputs_do_not_overflow(estimator):
+    compiled = compile_model(estimator)
+    assert compiled.proba_one([1e6] * compiled.n_features_in_) in (0.0, 1.0)
+    assert compiled.proba_one([-1e6] * compiled.n_features_in_) in (0.0, 1.0)
+
+def test_other_estimators_are_left_alone():
+    X = np.random.default_rng(0).normal(size=(40, 11))
+    y = (X[:, 0] > 0).astype(int)
+    tree = DecisionTreeClassifier(max_depth=2).fit(X, y)
+    assert compile_model(tree) is tree
+    # A logistic regression on another feature count fails the probe and is served as is
+    narrow = LogisticRegression().fit(X[:, :3], y)
+    assert compile_model(narrow) is narrow
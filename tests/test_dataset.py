@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+import dataset
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset, "DATA_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+def write_csv(path, rows):
+    path.write_text("id;gender;weight;cardio\n" + "".join(f"{i};{g};{w};{c}\n" for i, g, w, c in rows))
+
+def test_load_columns_caches_narrow_types(tmp_path, cache_dir):
+    path = tmp_path / "data.csv"
+    write_csv(path, [(0, 1, 62.0, 0), (1, 2, 85.5, 1)])
+    columns = dataset.load_columns(str(path))
+    assert columns['gender'].dtype == np.int8
+    assert columns['weight'].tolist() == [62.0, 85.5]
+    assert len(list(cache_dir.iterdir())) == 1
+    # Second load reads the memory-mapped cache
+    assert isinstance(dataset.load_columns(str(path))['gender'], np.memmap)
+
+def test_edited_csv_rebuilds_cache(tmp_path, cache_dir):
+    path = tmp_path / "data.csv"
+    write_csv(path, [(0, 1, 62.0, 0)])
+    dataset.load_columns(str(path))
+    write_csv(path, [(0, 2, 70.0, 1)])
+    assert dataset.load_columns(str(path))['gender'].tolist() == [2]
+    # The stale cache of the old contents is removed
+    assert len(list(cache_dir.iterdir())) == 1
+
+def test_load_frame_selects_columns(tmp_path, cache_dir):
+    path = tmp_path / "data.csv"
+    write_csv(path, [(0, 1, 62.0, 0), (1, 2, 85.5, 1)])
+    frame = dataset.load_frame(str(path), ['weight', 'cardio'])
+    assert list(frame.columns) == ['weight', 'cardio']
+    assert frame['cardio'].sum() == 1
+
+def test_missing_csv_raises(tmp_path, cache_dir):
+    with pytest.raises(FileNotFoundError):
+        dataset.load_columns(str(tmp_path / "missing.csv"))
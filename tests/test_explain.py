@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+import explain
+from scoring import FEATURES, _probe_matrix
+
+@pytest.fixture(scope="module")
+def training():
+    X = _probe_matrix(600, seed=1)
+    # A label the trees can learn from the BP, weight and age columns
+    y = ((X[:, 3] > 150) | (X[:, 2] > 130) | (X[:, 10] > 70)).astype(int)
+    return X, y
+
+def test_linear_contributions_add_up_to_log_odds(model):
+    X = _probe_matrix(50)
+    explainer, contributions = explain.explain_batch(model, X)
+    assert explainer.method == 'linear'
+    assert np.allclose(explainer.base_value + contributions.sum(axis=1), model.decision_function(X))
+    one = explain.explain_one(model, X[0].tolist())
+    assert [c['contribution'] for c in one['contributions']] == sorted(
+        (c['contribution'] for c in one['contributions']), key=lambda c: -abs(c))
+    assert sum(c['contribution'] for c in one['contributions']) == pytest.approx(contributions[0].sum())
+
+@pytest.mark.parametrize("estimator", [
+    DecisionTreeClassifier(max_depth=6, random_state=0),
+    RandomForestClassifier(n_estimators=10, max_depth=12, random_state=0),
+])
+def test_tree_contributions_add_up_to_probability(training, estimator):
+    X, y = training
+    fitted = estimator.fit(X, y)
+    explainer = explain.make_explainer(fitted)
+    assert explainer.method == 'tree_path' and explainer.space == 'probability'
+    contributions = explainer.explain_batch(X[:100])
+    assert np.allclose(explainer.base_value + contributions.sum(axis=1), fitted.predict_proba(X[:100])[:, 1])
+    # The single-row path agrees with the batch path
+    assert np.allclose(explainer.explain_one(X[0].tolist()), contributions[0])
+
+def test_boosting_contributions_add_up_to_log_odds(training):
+    X, y = training
+    fitted = GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=0).fit(X, y)
+    explainer = explain.make_explainer(fitted)
+    assert explainer.space == 'log_odds'
+    contributions = explainer.explain_batch(X[:100])
+    assert np.allclose(explainer.base_value + contributions.sum(axis=1), fitted.decision_function(X[:100]))
+
+def test_unsupported_model_has_no_explanation(training):
+    X, y = training
+    knn = KNeighborsClassifier(3).fit(X, y)
+    assert explain.explainer_for(knn) is None
+    assert explain.explain_one(knn, X[0].tolist()) is None
+    assert explain.explain_batch(knn, X[:2]) == (None, None)
+
+def test_predict_includes_explanation(client, form):
+    data = client.post('/predict', data=form).get_json()
+    explanation = data['explanation']
+    assert explanation['method'] == 'linear'
+    assert {c['feature'] for c in explanation['contributions']} == set(FEATURES)
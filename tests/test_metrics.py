@@ -0,0 +1,60 @@
+import json
+import os
+import metrics
+
+def test_counters_and_histograms_render():
+    m = metrics.Metrics(buckets=(0.1, 1.0))
+    m.describe('jobs_total', "Jobs.")
+    m.inc('jobs_total', (('route', 'a'),))
+    m.inc('jobs_total', (('route', 'a'),), 2)
+    m.observe('job_seconds', 0.05)
+    m.observe('job_seconds', 5.0)
+    text = m.render()
+    assert '# HELP jobs_total Jobs.' in text
+    assert 'jobs_total{route="a"} 3' in text
+    assert 'job_seconds_bucket{le="0.1"} 1' in text
+    assert 'job_seconds_bucket{le="+Inf"} 2' in text
+    assert 'job_seconds_count 2' in text and 'job_seconds_sum 5.05' in text
+
+def test_timed_records_the_stage_even_on_error():
+    m = metrics.Metrics()
+    try:
+        with m.timed('validate'):
+            raise ValueError
+    except ValueError:
+        pass
+    assert 'cardio_stage_seconds_count{stage="validate"} 1' in m.render()
+
+def test_snapshots_of_other_processes_are_summed(tmp_path):
+    m = metrics.Metrics(str(tmp_path))
+    m.inc('jobs_total', amount=2)
+    other = m.snapshot()
+    with open(tmp_path / "99999999.json", "w") as f:
+        json.dump(other, f)
+    # A corrupt or differently bucketed snapshot is ignored
+    (tmp_path / "1.json").write_text("{")
+    with open(tmp_path / "2.json", "w") as f:
+        json.dump(dict(other, buckets=[1]), f)
+    assert 'jobs_total 4' in m.render()
+
+    m.flush()
+    assert os.path.exists(tmp_path / f"{os.getpid()}.json")
+    metrics.clear_snapshots(str(tmp_path))
+    assert not os.listdir(tmp_path)
+
+def test_failing_collector_is_skipped(capsys):
+    m = metrics.Metrics()
+    m.add_collector(lambda: 1 / 0)
+    m.add_collector(lambda: [('hits_total', "Hits.", {'model': 'm'}, 7)])
+    assert 'hits_total{model="m"} 7' in m.render()
+    assert "Metrics collector failed" in capsys.readouterr().out
+
+def test_metrics_endpoint_counts_requests(client, form):
+    client.post('/predict', data=form)
+    client.post('/predict', data=dict(form, height='abc'))
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'cardio_http_requests_total{route="/predict",method="POST",status="200"}' in text
+    assert 'cardio_http_errors_total{route="/predict",status="400"}' in text
+    assert 'cardio_stage_seconds_count{stage="validate"}' in text
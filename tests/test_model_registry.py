@@ -0,0 +1,69 @@
+import os
+import json
+import shutil
+import threading
+import pytest
+from model_registry import ModelRegistry
+
+@pytest.fixture
+def manifest(tmp_path):
+    shutil.copy("model1.pkl", tmp_path / "a.pkl")
+    shutil.copy("model1.pkl", tmp_path / "b.pkl")
+    path = tmp_path / "models.json"
+    write_manifest(path, {'a': 1, 'b': 0})
+    return path
+
+def write_manifest(path, weights):
+    models = [{'name': name, 'path': f"{name}.pkl", 'version': '1', 'weight': w} for name, w in weights.items()]
+    path.write_text(json.dumps({'default': 'a', 'models': models}))
+
+def touch(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+def test_select_by_name_and_weight(manifest):
+    registry = ModelRegistry(str(manifest), check_interval=3600)
+    assert sorted(registry.names()) == ['a', 'b']
+    assert registry.select('b').name == 'b'
+    # b has no weight, so unnamed requests always go to a
+    assert {registry.select().name for _ in range(20)} == {'a'}
+    with pytest.raises(KeyError):
+        registry.select('c')
+
+def test_reload_warms_in_background_before_swap(manifest):
+    warmed, release = [], threading.Event()
+    def warm(model):
+        warmed.append(model)
+        if len(warmed) > 2:
+            release.wait(5)
+    registry = ModelRegistry(str(manifest), check_interval=3600, warm=warm)
+    assert len(warmed) == 2
+    old = registry.select('a')
+
+    touch(manifest.parent / "a.pkl")
+    registry._next_check = 0.0
+    thread = registry.maybe_reload()
+    assert thread is not None
+    # While the new model warms up, requests are served from the old snapshot
+    assert registry.select('a') is old
+    assert registry.maybe_reload() is None
+    release.set()
+    thread.join(5)
+    new = registry.select('a')
+    assert new is not old and new.model is warmed[-1]
+    assert registry.stats()['reloads'] == 1
+
+def test_broken_artifact_keeps_previous_model(manifest):
+    registry = ModelRegistry(str(manifest), check_interval=3600)
+    old = registry.select('a')
+    (manifest.parent / "a.pkl").write_bytes(b"not a model")
+    registry._next_check = 0.0
+    registry.maybe_reload().join(5)
+    assert registry.select('a').model is old.model
+
+def test_invalid_manifest_keeps_previous_snapshot(manifest):
+    registry = ModelRegistry(str(manifest), check_interval=3600)
+    manifest.write_text(json.dumps({'models': []}))
+    registry._next_check = 0.0
+    registry.maybe_reload().join(5)
+    assert sorted(registry.names()) == ['a', 'b']
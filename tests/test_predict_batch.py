@@ -0,0 +1,34 @@
+import pytest
+from scoring import records_from_csv, score_one
+from validation import validate_one
+
+def test_json_batch_matches_single_scoring(client, model, form):
+    records = [dict(form, id='a'), dict(form, id='b', ap_hi='160', Age_Year='63')]
+    response = client.post('/predict_batch', json={'records': records})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == 2 and [r['id'] for r in body['results']] == ['a', 'b']
+    for record, result in zip(records, body['results']):
+        label, probability, _ = score_one(model, validate_one(record))
+        assert result['prediction'] == label
+        assert result['probability'] == pytest.approx(probability * 100)
+        assert result['heart_age'] >= 18 and result['bmi'] > 0
+
+def test_csv_upload_in_the_raw_dataset_layout(client):
+    text = open("cardio_train.csv").read().splitlines()
+    csv_text = "\n".join(text[:6]) + "\n"
+    assert len(records_from_csv(csv_text)) == 5
+    response = client.post('/predict_batch', data=csv_text, content_type='text/csv')
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 5
+
+def test_empty_and_oversized_batches(client, flask_app, form, monkeypatch):
+    assert client.post('/predict_batch', json=[]).status_code == 400
+    monkeypatch.setattr(flask_app, "MAX_BATCH_ROWS", 2)
+    assert client.post('/predict_batch', json=[form] * 3).status_code == 413
+
+def test_bad_row_rejects_batch(client, form):
+    response = client.post('/predict_batch', json=[form, dict(form, cholesterol='9')])
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['errors'][0]['row'] == 2 and body['errors'][0]['field'] == 'cholesterol'
@@ -0,0 +1,42 @@
+import threading
+import pytest
+from scoring import ProbabilityTable, score_one
+from validation import validate_one
+
+def test_table_matches_model_on_whole_units(model, form):
+    table = ProbabilityTable(model, capacity=8)
+    features = validate_one(form)
+    expected = score_one(model, features)[1]
+    assert table.proba_one(features) == pytest.approx(expected, abs=1e-6)
+    # Same measurements, other categorical answers: served from the same row
+    assert table.proba_one(validate_one(dict(form, smoke='1', gender='0'))) == pytest.approx(
+        score_one(model, validate_one(dict(form, smoke='1', gender='0')))[1], abs=1e-6)
+    assert (table.misses, table.hits) == (1, 1)
+
+def test_table_evicts_least_recently_used(model, form):
+    table = ProbabilityTable(model, capacity=2)
+    for weight in ('60', '70', '80', '60'):
+        table.proba_one(validate_one(dict(form, weight=weight)))
+    assert table.stats()['entries'] == 2
+    assert table.misses == 4
+
+def test_out_of_domain_values_bypass_the_table(model, form):
+    table = ProbabilityTable(model, capacity=8)
+    features = validate_one(form)
+    features[0] = 7
+    assert table.proba_one(features) == pytest.approx(score_one(model, features)[1])
+    assert table.bypassed == 1 and table.stats()['entries'] == 0
+
+def test_counters_are_exact_under_threads(model, form):
+    table = ProbabilityTable(model, capacity=8)
+    bypass = validate_one(form)
+    bypass[0] = 7
+    def work():
+        for _ in range(200):
+            table.proba_one(bypass)
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert table.bypassed == 1600
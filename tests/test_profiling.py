@@ -0,0 +1,44 @@
+import io
+import zipfile
+import pytest
+import profiling
+from profiling import PROFILE_HEADER, RequestProfiler
+
+def test_downloads_need_a_configured_token():
+    assert not RequestProfiler(token="").authorized(None)
+    assert not RequestProfiler(token="").authorized("anything")
+    profiler = RequestProfiler(token="s3cret")
+    assert profiler.authorized("s3cret")
+    assert not profiler.authorized("wrong") and not profiler.authorized(None)
+
+def test_capture_summary_and_zip():
+    profiler = RequestProfiler(token="s3cret")
+    assert profiler.start(None) is None
+    profile = profiler.start("s3cret")
+    sum(range(1000))
+    record = profiler.stop(profile, '/predict', 'POST', 200)
+    assert profiler.get(record['id']) is record
+    assert profiling.summary(record).startswith("POST /predict -> 200")
+    names = zipfile.ZipFile(io.BytesIO(profiling.slowest_zip(profiler.slowest()))).namelist()
+    assert sorted(n.rsplit('.', 1)[1] for n in names) == ['prof', 'txt']
+
+@pytest.fixture
+def profiler(flask_app, monkeypatch):
+    def install(token):
+        profiler = RequestProfiler(token=token)
+        monkeypatch.setattr(flask_app, "PROFILER", profiler)
+        return profiler
+    return install
+
+def test_profiles_forbidden_without_token(client, profiler):
+    profiler("")
+    response = client.get('/profiles', headers={PROFILE_HEADER: ''})
+    assert response.status_code == 403
+    assert 'PROFILE_TOKEN' in response.get_json()['error']
+
+def test_profiles_with_token(client, profiler):
+    profiler("s3cret")
+    assert client.get('/profiles').status_code == 403
+    response = client.get('/profiles', headers={PROFILE_HEADER: 's3cret'})
+    assert response.status_code == 200
+    assert response.get_json()['buffered'] == 0
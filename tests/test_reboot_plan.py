@@ -0,0 +1,56 @@
+import json
+import pickle
+import numpy as np
+import pytest
+import health_metrics as hm
+
+def test_key_flags():
+    healthy = {'ap_hi': 120, 'ap_lo': 80, 'smoke': 0, 'active': 1, 'weight': 70, 'height': 175}
+    assert hm.reboot_plan_key(healthy) == 0
+    # Form values arrive as strings
+    risky = {'ap_hi': '150', 'ap_lo': '85', 'smoke': '1', 'active': '0', 'weight': '110', 'height': '170'}
+    assert hm.reboot_plan_key(risky) == hm.PLAN_BP_HIGH | hm.PLAN_SMOKER | hm.PLAN_INACTIVE | hm.PLAN_OBESE
+
+def test_vectorized_keys_match_scalar():
+    rng = np.random.default_rng(0)
+    n = 200
+    cols = {
+        'ap_hi': rng.integers(100, 180, n), 'ap_lo': rng.integers(60, 110, n), 'smoke': rng.integers(0, 2, n),
+        'active': rng.integers(0, 2, n), 'weight': rng.uniform(50, 130, n), 'height': rng.uniform(150, 200, n)
+    }
+    keys = hm.reboot_plan_keys(**cols)
+    expected = [hm.reboot_plan_key({k: v[i] for k, v in cols.items()}) for i in range(n)]
+    assert keys.tolist() == expected
+
+def test_variants_match_the_per_request_builder():
+    for key in range(hm.PLAN_VARIANTS):
+        plan = hm.reboot_plan(key)
+        assert plan == hm.build_reboot_plan(key, hm.PLAN_TEXT['en'])
+        assert json.loads(hm.reboot_plan_json(key)) == list(plan)
+        assert len(plan) == 7
+    smoker = hm.reboot_plan(hm.PLAN_SMOKER)
+    assert smoker[0]['activity'].endswith("Lung capacity breaths") and "Nicotine" not in smoker[1]['diet']
+
+def test_shared_variants_cannot_be_changed():
+    plan = hm.reboot_plan(hm.PLAN_SMOKER)
+    with pytest.raises(TypeError):
+        plan[0]['activity'] = "Marathon"
+    with pytest.raises(TypeError):
+        plan[0].update(diet="Anything")
+    with pytest.raises(TypeError):
+        del plan[0]['vital']
+    assert json.loads(hm.reboot_plan_json(hm.PLAN_SMOKER))[0] == plan[0]
+    # Assessments carrying a plan are pickled to the report and bulk-export process pools
+    copy = pickle.loads(pickle.dumps(plan))
+    assert copy == plan and isinstance(copy[0], hm.PlanDay)
+
+def test_unknown_locale_falls_back_and_bad_key_raises():
+    assert hm.plan_locale('xx') == hm.DEFAULT_PLAN_LOCALE
+    assert hm.reboot_plan(3, 'xx') is hm.reboot_plan(3)
+    with pytest.raises(KeyError):
+        hm.reboot_plan(hm.PLAN_VARIANTS)
+
+def test_predict_returns_the_shared_plan(client, form):
+    data = client.post('/predict', data=dict(form, smoke='1')).get_json()
+    key = hm.reboot_plan_key(dict(form, smoke='1'))
+    assert data['reboot_plan'] == json.loads(hm.reboot_plan_json(key))
@@ -0,0 +1,56 @@
+import time
+import threading
+import pytest
+import reports
+from reports import ReportJobQueue, ReportQueueFull
+
+def wait_for(queue, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, payload = queue.status(job_id)
+        if status != 'pending':
+            return status, payload
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still pending")
+
+@pytest.fixture
+def assessment(flask_app, form):
+    return flask_app.build_assessment(form)
+
+def test_job_renders_pdf(tmp_path, assessment):
+    queue = ReportJobQueue(workers=1, job_dir=str(tmp_path))
+    job_id = queue.submit(assessment)
+    status, path = wait_for(queue, job_id)
+    assert status == 'done'
+    assert open(path, 'rb').read(4) == b"%PDF"
+    assert queue.filename(job_id).endswith(".pdf")
+    assert queue.pending() == 0
+
+def test_failed_and_unknown_jobs(tmp_path):
+    queue = ReportJobQueue(workers=1, job_dir=str(tmp_path))
+    job_id = queue.submit({'patient_name': 'Broken'})
+    assert wait_for(queue, job_id)[0] == 'failed'
+    assert queue.status('0' * 32) == ('unknown', None)
+    assert queue.status('../etc/passwd') == ('unknown', None)
+
+def test_full_queue_refuses_work(tmp_path, assessment, monkeypatch):
+    release = threading.Event()
+    render = reports.render_heart_passport
+    monkeypatch.setattr(reports, "render_heart_passport", lambda a: release.wait(5) and render(a))
+    queue = ReportJobQueue(workers=1, max_pending=1, job_dir=str(tmp_path))
+    job_id = queue.submit(assessment)
+    with pytest.raises(ReportQueueFull):
+        queue.submit(assessment)
+    release.set()
+    assert wait_for(queue, job_id)[0] == 'done'
+
+def test_reports_routes(client, form):
+    response = client.post('/reports', data=form)
+    assert response.status_code == 202
+    url = response.get_json()['status_url']
+    deadline = time.monotonic() + 10
+    while (response := client.get(url)).status_code == 202 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert response.status_code == 200 and response.data[:4] == b"%PDF"
+    assert client.get('/reports/' + '0' * 32).status_code == 404
+    assert client.post('/reports', data=dict(form, ap_hi='abc')).status_code == 400
@@ -0,0 +1,59 @@
+import threading
+import fitz
+import pytest
+import reports
+from bench_reports import ASSESSMENT
+
+def page_texts(pdf_bytes):
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [page.get_text() for page in doc]
+
+@pytest.fixture
+def assessment(flask_app, form):
+    return flask_app.build_assessment(form)
+
+def test_cached_render_matches_uncached(assessment):
+    cached = page_texts(reports.render_heart_passport(assessment))
+    uncached = page_texts(reports.render_heart_passport_uncached(assessment))
+    assert len(cached) == len(uncached) == 2
+    assert cached == uncached
+    assert assessment['patient_name'] in cached[0]
+
+    # Words wider than their column are broken, and the plan table runs onto a third page
+    long_content = dict(ASSESSMENT, patient_name='X' * 120, reboot_plan=[
+        dict(day, activity=day['activity'] + " " + "Supercalifragilistic" * 4) for day in ASSESSMENT['reboot_plan']
+    ])
+    cached = page_texts(reports.render_heart_passport(long_content))
+    uncached = page_texts(reports.render_heart_passport_uncached(long_content))
+    assert len(cached) == len(uncached) == 3
+    assert cached == uncached
+
+def test_template_is_reused_and_renders_each_patient(assessment):
+    template = reports.HeartPassportTemplate()
+    first = page_texts(template.render(assessment))
+    other = page_texts(template.render(dict(assessment, patient_name='Second Patient', heart_age=70)))
+    assert 'Second Patient' in other[0] and 'Second Patient' not in first[0]
+    assert page_texts(template.render(assessment)) == first
+
+def test_incomplete_assessment_raises(assessment):
+    broken = dict(assessment)
+    del broken['probability']
+    with pytest.raises(KeyError):
+        reports.HeartPassportTemplate().render(broken)
+
+def test_concurrent_first_requests_build_one_template(assessment, monkeypatch):
+    built = []
+    template_class = reports.HeartPassportTemplate
+
+    def build():
+        built.append(1)
+        return template_class()
+
+    monkeypatch.setattr(reports, "_template", None)
+    monkeypatch.setattr(reports, "HeartPassportTemplate", build)
+    threads = [threading.Thread(target=reports.render_heart_passport, args=(assessment,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(built) == 1
@@ -0,0 +1,61 @@
+import os
+import time
+from result_cache import ResultCache
+
+def test_put_get_and_eviction():
+    cache = ResultCache(max_entries=2, ttl=60)
+    first = cache.put({'n': 1})
+    second = cache.put({'n': 2})
+    assert cache.get(first) == {'n': 1}
+    cache.put({'n': 3})
+    assert cache.get(first) is None and cache.get(second) == {'n': 2}
+    assert cache.get(None) is None
+    assert cache.stats()['evicted'] == 1 and cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1
+
+def test_expired_token_misses(monkeypatch):
+    cache = ResultCache(ttl=10)
+    token = cache.put({'n': 1})
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get(token) is None
+    assert cache.stats()['expired'] == 1 and cache.stats()['entries'] == 0
+
+def test_token_from_another_worker_is_found(tmp_path):
+    # Two workers: the token put by one is served by the other from the shared directory
+    first = ResultCache(ttl=60, store_dir=str(tmp_path))
+    second = ResultCache(ttl=60, store_dir=str(tmp_path))
+    assessment = {'probability': 82.53, 'reboot_plan': [{'day': 'Monday'}]}
+    token = first.put(assessment)
+    assert second.get(token) == assessment
+    assert second.get(token) == assessment
+    assert second.stats()['hits'] == 2 and second.stats()['shared_hits'] == 1
+
+def test_shared_file_expires_and_bad_tokens_miss(tmp_path):
+    first = ResultCache(ttl=10, store_dir=str(tmp_path))
+    second = ResultCache(ttl=10, store_dir=str(tmp_path))
+    token = first.put({'n': 1})
+    old = time.time() - 11
+    os.utime(tmp_path / f"{token}.json", (old, old))
+    assert second.get(token) is None and second.stats()['expired'] == 1
+    assert not (tmp_path / f"{token}.json").exists()
+    # Only token-shaped names are looked up on disk
+    (tmp_path / "secret.json").write_text('{"n": 2}')
+    assert second.get("../secret") is None and second.get("secret") is None
+    assert second.stats()['misses'] == 2
+
+def test_report_reuses_predict_result(client, flask_app, form):
+    predicted = client.post('/predict', data=form).get_json()
+    token = predicted['result_token']
+    hits = flask_app.result_cache.hits
+    # No form fields at all: the report comes from the cached assessment, under the edited name
+    response = client.post('/generate_report', data={'result_token': token, 'patient_name': 'Renamed'})
+    assert response.status_code == 200 and response.mimetype == 'application/pdf'
+    assert "renamed_Heart_Passport" in response.headers['Content-Disposition']
+    assert flask_app.result_cache.hits == hits + 1
+
+def test_unknown_token_scores_the_form(client, form):
+    response = client.post('/generate_report', data=dict(form, result_token='stale'))
+    assert response.status_code == 200 and response.data.startswith(b"%PDF")
+    # ... and a bad form behind an unknown token is still rejected
+    response = client.post('/generate_report', data=dict(form, result_token='stale', ap_hi='abc'))
+    assert response.status_code == 400 and response.get_json()['success'] is False
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from scoring import DECISION_THRESHOLD, score_batch, score_one
+from validation import validate_batch
+
+class CountingModel:
+    # Wraps an estimator and counts the calls the scoring path makes
+    def __init__(self, model):
+        self.model = model
+        self.classes_ = model.classes_
+        self.calls = []
+
+    def predict_proba(self, X):
+        self.calls.append('predict_proba')
+        return self.model.predict_proba(X)
+
+    def predict(self, X):
+        self.calls.append('predict')
+        return self.model.predict(X)
+
+class LabelsOnly:
+    classes_ = np.array([0, 1])
+
+    def predict(self, X):
+        return np.ones(len(X))
+
+def test_labels_come_from_the_same_probability_pass(model, form):
+    counting = CountingModel(model)
+    X = validate_batch([form, dict(form, ap_hi='180', Age_Year='64'), dict(form, Age_Year='30', ap_hi='100')])
+    labels, probabilities, threshold = score_batch(counting, X)
+    assert counting.calls == ['predict_proba']
+    assert threshold == DECISION_THRESHOLD
+    assert labels.tolist() == (probabilities > DECISION_THRESHOLD).astype(int).tolist()
+
+def test_score_one_agrees_with_score_batch(model, form):
+    X = validate_batch([form])
+    label, probability, _ = score_one(model, X[0].tolist())
+    labels, probabilities, _ = score_batch(model, X)
+    assert label == labels[0] and probability == pytest.approx(probabilities[0])
+    assert isinstance(label, int) and isinstance(probability, float)
+
+def test_model_without_probabilities_falls_back_to_labels(form):
+    labels, probabilities, threshold = score_batch(LabelsOnly(), validate_batch([form, form]))
+    assert labels.tolist() == [1, 1]
+    assert probabilities.tolist() == [0.0, 0.0] and threshold is None
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+import dataset
+import search
+
+@pytest.fixture
+def raw_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset, "DATA_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(search, "DATA_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "raw.csv"
+    with open("cardio_train.csv", encoding="utf-8") as f:
+        path.write_text("".join(next(f) for _ in range(1201)))
+    return str(path)
+
+def test_split_and_folds_are_cached(raw_csv, capsys):
+    X_train, X_test, y_train, y_test, folds = search.prepared_split(raw_csv, 3)
+    assert "cached" not in capsys.readouterr().out
+    again = search.prepared_split(raw_csv, 3)
+    assert "Using cached split" in capsys.readouterr().out
+    assert np.array_equal(again[0], X_train) and np.array_equal(again[3], y_test)
+    # The validation folds partition the training rows
+    assert sorted(np.concatenate([val for _, val in folds]).tolist()) == list(range(len(X_train)))
+    assert all(len(train) + len(val) == len(X_train) for train, val in folds)
+
+def test_search_family_reports_best_config(raw_csv, monkeypatch):
+    monkeypatch.setitem(search.SEARCH_SPACES, 'logistic_regression', {'C': [0.01, 1.0, 100.0]})
+    monkeypatch.setattr(search, "LATENCY_CALLS", 5)
+    split = search.prepared_split(raw_csv, 3)
+    best, record = search.search_family('logistic_regression', *split, jobs=1)
+    assert record['slug'] == 'logistic_regression_tuned'
+    assert record['params']['C'] in (0.01, 1.0, 100.0)
+    assert record['candidates'] == 3 and 0 <= record['Accuracy'] <= 1
+    assert best.predict_proba(split[1][:2]).shape == (2, 2)
+
+def test_family_without_search_space(raw_csv):
+    with pytest.raises(KeyError):
+        search.search_family('knn', *search.prepared_split(raw_csv, 3), jobs=1)
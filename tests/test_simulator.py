@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from scoring import score_batch
+from simulator import simulate
+from validation import ValidationError, validate_one
+
+def test_default_grid_matches_batch_scoring(model, form):
+    features = validate_one(form)
+    result, rows = simulate(model, features)
+    assert rows == result['count'] == len(result['probability'])
+    _, expected, _ = score_batch(model, np.array([features], dtype=float))
+    assert result['baseline']['probability'] == pytest.approx(expected[0] * 100)
+    assert result['best']['probability'] <= result['baseline']['probability']
+
+def test_clamped_diastolic_stays_on_the_systolic_curve(model, form):
+    features = validate_one(dict(form, ap_hi='130', ap_lo='100'))
+    result, _ = simulate(model, features, {'ap_hi': {'delta': [-40, -20]}, 'ap_lo': {'delta': [-10]}})
+    assert result['curves']['ap_hi']['values'] == [90.0, 110.0, 130.0]
+    assert result['curves']['ap_lo']['values'] == [90.0, 100.0]
+    assert result['clamped'] == 1
+    scenarios = result['scenarios']
+    assert all(lo <= hi for lo, hi in zip(scenarios['ap_lo'], scenarios['ap_hi']))
+
+def test_rejects_bad_interventions(model, form):
+    features = validate_one(form)
+    with pytest.raises(ValidationError):
+        simulate(model, features, {'cholesterol': {'delta': [-1]}})
+    with pytest.raises(ValidationError):
+        simulate(model, features, {'height': {'delta': list(range(-80, 80))}, 'weight': {'delta': list(range(-40, 40))}})
+
+def test_simulate_route(client, form):
+    response = client.post('/simulate', json={'patient': form, 'interventions': {'smoke': {'set': [0, 1]}}})
+    assert response.status_code == 200
+    assert response.get_json()['axes'] == {'smoke': [0.0, 1.0]}
+
+@pytest.mark.parametrize("payload", [{'patient': [1, 2, 3]}, {'patient': "x"}, [1, 2]])
+def test_simulate_route_rejects_non_object_patient(client, payload):
+    response = client.post('/simulate', json=payload)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
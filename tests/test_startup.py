@@ -0,0 +1,26 @@
+import os
+import sys
+import subprocess
+
+PROBE = "import sys, app; print(sorted(m for m in ('fpdf', 'sklearn', 'joblib') if m in sys.modules), app.registry is None)"
+
+def run_import(warmup):
+    env = dict(os.environ, WARMUP=warmup, PYTHONWARNINGS="ignore")
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+def test_no_warmup_defers_heavy_imports():
+    assert run_import("none") == "[] True"
+
+def test_model_warmup_loads_the_registry():
+    assert run_import("model").endswith("False")
+
+def test_warm_up_components(flask_app, capsys):
+    assert flask_app.warm_up("none") == []
+    assert flask_app.warm_up("model, bogus") == ["model"]
+    assert "Unknown WARMUP component 'bogus'" in capsys.readouterr().out
+
+def test_first_request_loads_lazily(client, form):
+    response = client.post('/predict', data=form)
+    assert response.status_code == 200
+    assert response.get_json()['success'] is True
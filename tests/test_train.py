@@ -0,0 +1,45 @@
+import json
+import joblib
+import pytest
+from dataset import load_frame
+from scoring import FEATURES
+import train
+
+@pytest.fixture(scope="module")
+def sample():
+    return load_frame("Cardio_cleaned.csv", FEATURES + [train.TARGET]).iloc[:1500]
+
+def test_train_is_reproducible_and_writes_artifacts(sample, tmp_path):
+    models = ['decision_tree', 'gaussian_nb']
+    first = train.train(sample, models, cv=2, jobs=2, artifact_dir=str(tmp_path / "a"))
+    second = train.train(sample, models, cv=2, jobs=1, artifact_dir=str(tmp_path / "b"))
+    assert [r['slug'] for r in first] == models
+    for a, b in zip(first, second):
+        assert a['Accuracy'] == b['Accuracy'] and a['cv_mean'] == b['cv_mean']
+        assert a['cv_folds'] == 2
+    estimator = joblib.load(first[0]['artifact'])
+    assert list(estimator.feature_names_in_) == FEATURES
+
+def test_every_family_serves_probabilities(sample):
+    X, y = sample[FEATURES].iloc[:300], sample[train.TARGET].iloc[:300]
+    for slug in train.MODEL_FAMILIES:
+        estimator = train.make_estimator(slug).fit(X, y)
+        assert estimator.predict_proba(X.iloc[:5]).shape == (5, 2), slug
+
+def test_unknown_model_family():
+    with pytest.raises(ValueError):
+        train.make_estimator('perceptron')
+
+def test_merge_accuracies_and_register(tmp_path):
+    accuracies = tmp_path / "acc.json"
+    accuracies.write_text(json.dumps([{'Model': "Decision Tree", 'Accuracy': 0.5}, {'Model': "SVC", 'Accuracy': 0.7}]))
+    record = {'Model': "Decision Tree", 'slug': 'decision_tree', 'Accuracy': 0.6, 'artifact': str(tmp_path / "dt.pkl")}
+    merged = train.merge_accuracies(str(accuracies), [record])
+    assert [r['Accuracy'] for r in merged] == [0.6, 0.7]
+
+    manifest = tmp_path / "models.json"
+    manifest.write_text(json.dumps({'models': [{'name': 'decision_tree', 'path': 'old.pkl', 'weight': 1}]}))
+    train.register([record, dict(record, slug='svc')], str(manifest), "2")
+    specs = {s['name']: s for s in json.loads(manifest.read_text())['models']}
+    assert specs['decision_tree'] == {'name': 'decision_tree', 'path': 'dt.pkl', 'weight': 1, 'version': '2'}
+    assert specs['svc']['weight'] == 0
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from scoring import FEATURES
+from validation import MAX_REPORTED_ERRORS, ValidationError, partition_batch, validate_batch, validate_one
+
+def test_validate_one_coerces_form_strings(form):
+    features = validate_one(form)
+    assert features == [1, 170.0, 80.0, 140.0, 90.0, 2, 1, 0, 0, 1, 55.0]
+    assert isinstance(features[FEATURES.index('cholesterol')], int)
+
+def test_validate_one_reports_field_without_row(form):
+    form['ap_hi'] = '500'
+    with pytest.raises(ValidationError) as e:
+        validate_one(form)
+    assert e.value.errors[0]['field'] == 'ap_hi'
+    assert e.value.errors[0]['row'] is None
+
+def test_validate_batch_returns_matrix(form):
+    X = validate_batch([form, dict(form, gender='0')])
+    assert X.shape == (2, len(FEATURES))
+    assert X[1, FEATURES.index('gender')] == 0
+
+def test_validate_batch_rejects_whole_batch_with_row_numbers(form):
+    records = [form, dict(form, ap_lo='150'), dict(form, weight='heavy')]
+    with pytest.raises(ValidationError) as e:
+        validate_batch(records)
+    assert e.value.total == 1
+    assert e.value.errors[0]['row'] == 3
+
+def test_cross_field_rule_is_checked(form):
+    with pytest.raises(ValidationError) as e:
+        validate_batch([form, dict(form, ap_lo='150')])
+    assert e.value.errors[0]['row'] == 2
+    assert 'ap_lo' in e.value.errors[0]['message']
+
+@pytest.mark.parametrize("record", [[1, 2, 3], "gender=1", 7, None])
+def test_non_object_record_is_a_validation_error(form, record):
+    with pytest.raises(ValidationError) as e:
+        validate_batch([form, record])
+    assert e.value.errors[0]['row'] == 2
+    assert 'object' in e.value.errors[0]['message']
+
+def test_error_list_is_capped(form):
+    with pytest.raises(ValidationError) as e:
+        validate_batch([dict(form, ap_hi='999')] * (MAX_REPORTED_ERRORS + 5))
+    assert e.value.total == MAX_REPORTED_ERRORS + 5
+    assert len(e.value.errors) == MAX_REPORTED_ERRORS
+
+def test_partition_keeps_valid_rows(form):
+    records = [[1], form, dict(form, ap_lo='x'), dict(form, ap_hi='500'), dict(form, ap_lo='150'), dict(form, gender='0')]
+    X, kept, errors, total = partition_batch(records)
+    assert kept.tolist() == [1, 5]
+    assert np.array_equal(X, validate_batch([records[1], records[5]]))
+    assert total == 4
+    assert [e['row'] for e in errors] == [1, 3, 4, 5]
+
+def test_partition_raises_when_no_row_is_valid(form):
+    with pytest.raises(ValidationError):
+        partition_batch([dict(form, ap_hi='500'), [1]])
+
+def test_predict_batch_rejects_list_record(client, form):
+    response = client.post('/predict_batch', json=[form, [1, 2, 3]])
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['errors'][0]['row'] == 2
+
+def test_predict_batch_skip_invalid_scores_valid_rows(client, form):
+    response = client.post('/predict_batch?skip_invalid=1', json=[dict(form, ap_hi='500'), form, [1]])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == 1 and body['skipped'] == 2
+    assert body['results'][0]['row'] == 2
+    assert [e['row'] for e in body['errors']] == [1, 3]
+
+def test_score_cohort_skip_invalid(model, form):
+    from bulk_export import score_cohort, summary_csv
+    records = [form, dict(form, ap_lo='150', id='b'), dict(form, id='c')]
+    with pytest.raises(ValidationError):
+        score_cohort(model, records, explain=False)
+    cohort = score_cohort(model, records, explain=False, skip_invalid=True)
+    assert cohort['rows'] == [1, 3] and cohort['skipped'] == 1
+    lines = summary_csv(cohort).splitlines()
+    assert lines[2].startswith('3,c,')
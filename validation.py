@@ -0,0 +1,221 @@
+# validation.py
+# Input schema for the 11 model features, shared by the Flask routes, the batch/bulk paths and the
+# Streamlit UI. The schema is declared once below and compiled into per-column NumPy vectors
+# (bounds, integer mask, allowed values, defaults), so a whole batch is coerced and checked with a
+# handful of array operations. Bad rows raise ValidationError before any inference or PDF work.
+# validate_batch is all-or-nothing: one bad row rejects the batch. partition_batch is the lenient
+# variant for cohort files with known bad rows: it keeps the valid rows and reports the rest.
+from collections.abc import Mapping
+import numpy as np
+from scoring import FEATURES, FEATURE_DEFAULTS
+
+# Errors listed per ValidationError; a bad CSV can have thousands of them
+MAX_REPORTED_ERRORS = 20
+
+class Field:
+    def __init__(self, name, kind, low=None, high=None, choices=None, label=None):
+        self.name = name
+        self.kind = kind  # "int" or "float"
+        self.choices = tuple(choices) if choices else None
+        self.low = min(self.choices) if self.choices else low
+        self.high = max(self.choices) if self.choices else high
+        self.label = label or name
+        self.default = FEATURE_DEFAULTS[name]
+
+# In FEATURES order. Ranges are the widest the input forms accept (app and Streamlit). Gender
+# takes the form coding (0/1) as well as the dataset's (1/2).
+SCHEMA = (
+    Field('gender', 'int', choices=(0, 1, 2), label="Gender"),
+    Field('height', 'float', 50, 250, label="Height (cm)"),
+    Field('weight', 'float', 10, 300, label="Weight (kg)"),
+    Field('ap_hi', 'float', 50, 300, label="Systolic BP"),
+    Field('ap_lo', 'float', 30, 200, label="Diastolic BP"),
+    Field('cholesterol', 'int', choices=(1, 2, 3), label="Cholesterol"),
+    Field('gluc', 'int', choices=(1, 2, 3), label="Glucose"),
+    Field('smoke', 'int', choices=(0, 1), label="Smoking"),
+    Field('alco', 'int', choices=(0, 1), label="Alcohol"),
+    Field('active', 'int', choices=(0, 1), label="Physical activity"),
+    Field('Age_Year', 'float', 1, 120, label="Age (years)"),
+)
+
+# Cross-field rules: (column that must be <=, column it is compared to, message)
+ORDER_RULES = (
+    ('ap_lo', 'ap_hi', "Diastolic BP (ap_lo) cannot be greater than systolic BP (ap_hi)."),
+)
+
+class ValidationError(ValueError):
+    # errors: [{'row': 1-based row or None, 'field': name, 'value': raw value, 'message': text}]
+    def __init__(self, errors, total=None):
+        self.errors = errors
+        self.total = total if total is not None else len(errors)
+        first = errors[0]
+        where = f"Row {first['row']}: " if first['row'] is not None else ""
+        more = f" ({self.total - 1} more error(s))" if self.total > 1 else ""
+        super().__init__(f"{where}{first['message']}{more}")
+
+class CompiledSchema:
+    def __init__(self, fields, order_rules=()):
+        names = [f.name for f in fields]
+        if names != FEATURES:
+            raise ValueError(f"Schema columns {names} do not match FEATURES {FEATURES}")
+        self.fields = fields
+        self.low = np.array([f.low for f in fields], dtype=float)
+        self.high = np.array([f.high for f in fields], dtype=float)
+        self.is_int = np.array([f.kind == 'int' for f in fields])
+        # Allowed values as a lookup table per categorical column: allowed[j][value] is True
+        self.choice_columns = [j for j, f in enumerate(fields) if f.choices]
+        self.allowed = {}
+        for j in self.choice_columns:
+            table = np.zeros(int(self.high[j]) + 1, dtype=bool)
+            table[list(fields[j].choices)] = True
+            self.allowed[j] = table
+        index = {name: j for j, name in enumerate(names)}
+        self.order_rules = [(index[a], index[b], message) for a, b, message in order_rules]
+
+    def _column(self, records, j):
+        # Absent fields take the form default; blank or null values are errors, as before.
+        # Returns the column with NaN in the cells that do not parse, and their errors.
+        field = self.fields[j]
+        values = [rec.get(field.name, field.default) if rec is not None else np.nan for rec in records]
+        try:
+            return np.array(values, dtype=float), []
+        except (TypeError, ValueError):
+            pass
+        # Slow path, only for a column that does not parse: find the offending cells
+        column = np.empty(len(values))
+        errors = []
+        for i, value in enumerate(values):
+            try:
+                column[i] = float(value)
+            except (TypeError, ValueError):
+                column[i] = np.nan
+                blank = value is None or not str(value).strip()
+                message = f"{field.label} is missing." if blank else f"{field.label} must be a number, got '{value}'."
+                errors.append({'row': i + 1, 'field': field.name, 'value': value, 'message': message})
+        return column, errors
+
+    def _matrix(self, records):
+        # (float matrix rows x FEATURES, parse errors). A record that is not a mapping (e.g. a
+        # JSON list) is one error for its row, and its cells are NaN.
+        errors = []
+        if not all(isinstance(rec, Mapping) for rec in records):
+            rows = []
+            for i, rec in enumerate(records):
+                if isinstance(rec, Mapping):
+                    rows.append(rec)
+                else:
+                    rows.append(None)
+                    errors.append({'row': i + 1, 'field': None, 'value': None,
+                                   'message': f"Record must be an object with named fields, got {type(rec).__name__}."})
+            records = rows
+        X = np.empty((len(records), len(self.fields)))
+        for j in range(len(self.fields)):
+            X[:, j], column_errors = self._column(records, j)
+            errors.extend(column_errors)
+        errors.sort(key=lambda e: e['row'])
+        return X, errors
+
+    def validate(self, records):
+        # Returns a float matrix (rows x FEATURES) or raises ValidationError
+        X, errors = self._matrix(records)
+        if errors:
+            raise ValidationError(errors[:MAX_REPORTED_ERRORS], len(errors))
+        self.check(X)
+        return X
+
+    def partition(self, records):
+        # Lenient validate: (matrix of the valid rows, their 0-based indices, errors, total errors)
+        X, errors = self._matrix(records)
+        unparsed = np.zeros(len(X), dtype=bool)
+        unparsed[[e['row'] - 1 for e in errors]] = True
+        bad, cross = self._flags(X)
+        # Cells that did not parse are already reported once
+        bad[unparsed] = False
+        cross = [(mask & ~unparsed, message) for mask, message in cross]
+        total = len(errors) + int(bad.sum()) + sum(int(mask.sum()) for mask, _ in cross)
+        errors = sorted(errors[:MAX_REPORTED_ERRORS] + self._report(X, bad, cross), key=lambda e: e['row'])
+        invalid = unparsed | bad.any(axis=1)
+        for mask, _ in cross:
+            invalid |= mask
+        keep = np.flatnonzero(~invalid)
+        return X[keep], keep, errors[:MAX_REPORTED_ERRORS], total
+
+    def valid_rows(self, X):
+        # Boolean mask of the rows of a numeric matrix that pass every check
+        bad, cross = self._flags(X)
+        ok = ~bad.any(axis=1)
+        for mask, _ in cross:
+            ok &= ~mask
+        return ok
+
+    def _flags(self, X):
+        # (bad cells mask, [(row mask, message) per cross-field rule])
+        with np.errstate(invalid='ignore'):
+            bad = ~np.isfinite(X) | (X < self.low) | (X > self.high)
+            bad |= self.is_int & (X != np.round(X))
+            for j in self.choice_columns:
+                col = X[:, j]
+                ok = ~bad[:, j]
+                bad[ok, j] = ~self.allowed[j][col[ok].astype(int)]
+            cross = [(X[:, a] > X[:, b], message) for a, b, message in self.order_rules]
+        return bad, cross
+
+    def _report(self, X, bad, cross):
+        # Error dicts for the first MAX_REPORTED_ERRORS flagged cells, then cross-field rows
+        errors = []
+        for i, j in zip(*np.nonzero(bad)):
+            if len(errors) >= MAX_REPORTED_ERRORS:
+                break
+            errors.append({'row': int(i) + 1, 'field': self.fields[j].name, 'value': float(X[i, j]),
+                           'message': self.describe(j, X[i, j])})
+        for (a, _, _), (mask, message) in zip(self.order_rules, cross):
+            for i in np.flatnonzero(mask)[:max(MAX_REPORTED_ERRORS - len(errors), 0)]:
+                errors.append({'row': int(i) + 1, 'field': self.fields[a].name, 'value': float(X[i, a]), 'message': message})
+        errors.sort(key=lambda e: e['row'])
+        return errors
+
+    def check(self, X):
+        # Vectorized checks over the whole matrix; raises ValidationError listing the bad cells
+        bad, cross = self._flags(X)
+        total = int(bad.sum()) + sum(int(mask.sum()) for mask, _ in cross)
+        if total:
+            raise ValidationError(self._report(X, bad, cross), total)
+
+    def describe(self, j, value):
+        field = self.fields[j]
+        if field.choices:
+            return f"{field.label} must be one of {', '.join(map(str, field.choices))}, got {value:g}."
+        if not np.isfinite(value):
+            return f"{field.label} is missing."
+        return f"{field.label} must be between {field.low:g} and {field.high:g}, got {value:g}."
+
+COMPILED = CompiledSchema(SCHEMA, ORDER_RULES)
+
+def validate_batch(records):
+    # records: list of dicts (JSON body or CSV rows). Returns the feature matrix, or raises
+    # ValidationError if any row is bad.
+    if not records:
+        return np.empty((0, len(FEATURES)))
+    return COMPILED.validate(records)
+
+def partition_batch(records):
+    # Keeps going past bad rows: returns (matrix of the valid rows, their 0-based indices into
+    # records, first MAX_REPORTED_ERRORS errors, total error count). Raises ValidationError only
+    # when no row is valid.
+    if not records:
+        return np.empty((0, len(FEATURES))), np.empty(0, dtype=np.intp), [], 0
+    X, kept, errors, total = COMPILED.partition(records)
+    if not len(kept):
+        raise ValidationError(errors, total)
+    return X, kept, errors, total
+
+def validate_one(data):
+    # data: form or dict. Returns the features as Python numbers in FEATURES order (ints for the
+    # categorical columns), ready for score_one. Errors carry no row number.
+    try:
+        X = COMPILED.validate([data])
+    except ValidationError as e:
+        for error in e.errors:
+            error['row'] = None
+        raise ValidationError(e.errors, e.total)
+    return [int(v) if is_int else v for v, is_int in zip(X[0].tolist(), COMPILED.is_int.tolist())]